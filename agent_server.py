@@ -0,0 +1,381 @@
+"""Local job server that runs queries on pooled, reusable agent configurations.
+
+    python agent_server.py --port 8765            # or: --socket .cache/agents.sock
+    curl -X POST localhost:8765/agents/travel-coordinator/jobs -d '{"query": "...", "approve": true}'
+    curl localhost:8765/jobs/<id>?wait=1
+    curl localhost:8765/metrics
+    curl localhost:8765/rate-limits
+
+Each configuration (the t8 controlled analyst, the t12 travel coordinator) is built once
+into a template agent, with its model clients, tools, caches and requirements; every job
+runs on a clone of the template with its own empty memory. Jobs wait in a bounded queue per
+configuration and are taken by a fixed number of workers. When the queue is full, new jobs
+are rejected with 429 and a Retry-After estimate instead of piling up. Every job reports how
+long it was queued and how long it ran; /metrics has the percentiles per configuration.
+
+Jobs can't prompt anyone: approval requests (ApprovalRequirement) are answered with the
+job's `approve` flag, which defaults to false. Model and tool requests of a job share the
+process-wide rate limiter in the job's `priority` class: "interactive" for jobs a client waits
+for (`wait`), "batch" otherwise, unless the job asks for one.
+
+Travel coordinator jobs are checkpointed after every agent step under the job's `checkpoint`
+id, which defaults to the job id. A job that failed or timed out, also in a server that has
+since been restarted, is resumed by submitting it again with `"checkpoint": "<its id>"`.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import logging
+import math
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal
+
+from aiohttp import web
+
+from approvals import setup_session
+from checkpoints import setup_checkpoint
+from beeai_framework.agents.experimental import RequirementAgent
+from beeai_framework.backend import ChatModelParameters
+from beeai_framework.logger import Logger
+from beeai_framework.utils.io import setup_io_context
+from model_registry import chat_model
+from rate_limiter import Priority, setup_priority, shared_limiter
+from t8 import create_controlled_agent
+from t12 import create_travel_coordinator
+from trace_recorder import LatencyHistogram, TraceRecorder
+from weather_cache import CachedOpenMeteoTool
+
+logger = Logger(__name__)
+
+# Builds a template agent; resources it starts are released through the exit stack
+AgentFactory = Callable[[TraceRecorder, contextlib.AsyncExitStack], RequirementAgent]
+
+
+def _controlled_analyst(trace_recorder: TraceRecorder, stack: contextlib.AsyncExitStack) -> RequirementAgent:
+    return create_controlled_agent(trace_recorder)
+
+
+def _travel_coordinator(trace_recorder: TraceRecorder, stack: contextlib.AsyncExitStack) -> RequirementAgent:
+    llm = chat_model(
+        "watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True)
+    )
+    weather_tool = CachedOpenMeteoTool()
+    weather_tool.start_prefetching(["Tokyo", "Osaka"])
+    stack.callback(weather_tool.stop_prefetching)
+    return create_travel_coordinator(llm, trace_recorder, weather_tool)
+
+
+AGENT_CONFIGS: dict[str, AgentFactory] = {
+    "controlled-analyst": _controlled_analyst,
+    "travel-coordinator": _travel_coordinator,
+}
+
+
+@dataclass
+class Job:
+    agent: str
+    query: str
+    approve: bool = False
+    priority: Priority = "interactive"
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    checkpoint: str = ""  # defaults to the id
+    status: Literal["queued", "running", "succeeded", "failed"] = "queued"
+    answer: str | None = None
+    error: str | None = None
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    def __post_init__(self) -> None:
+        self.checkpoint = self.checkpoint or self.id
+
+    def to_dict(self) -> dict[str, Any]:
+        started_at = self.started_at or self.finished_at
+        return {
+            "id": self.id,
+            "agent": self.agent,
+            "priority": self.priority,
+            "checkpoint": self.checkpoint,
+            "status": self.status,
+            "answer": self.answer,
+            "error": self.error,
+            "queue_seconds": started_at - self.submitted_at if started_at else None,
+            "run_seconds": self.finished_at - self.started_at if self.finished_at and self.started_at else None,
+            "total_seconds": self.finished_at - self.submitted_at if self.finished_at else None,
+        }
+
+
+class AgentPool:
+    """Workers running the jobs of one configuration on clones of a template agent."""
+
+    def __init__(
+        self, name: str, factory: AgentFactory, *, workers: int = 2, queue_size: int = 16, timeout: float = 600.0
+    ) -> None:
+        if workers < 1 or queue_size < 1:
+            raise ValueError("'workers' and 'queue_size' must be at least 1")
+        self.name = name
+        self.workers = workers
+        self.timeout = timeout
+        self._factory = factory
+        self._queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=queue_size)
+        self._stack = contextlib.AsyncExitStack()
+        self._trace_recorder = TraceRecorder()
+        self._template: RequirementAgent | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+        self.queue_latency = LatencyHistogram()
+        self.run_latency = LatencyHistogram()
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        self._template = self._factory(self._trace_recorder, self._stack)
+        self._stack.push_async_callback(self._trace_recorder.close)
+        self._tasks = [asyncio.create_task(self._work(), name=f"{self.name}-{n}") for n in range(self.workers)]
+
+    def submit(self, job: Job) -> None:
+        """Queue the job; raises asyncio.QueueFull when the pool is saturated."""
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise
+
+    def retry_after(self) -> int:
+        """Seconds until a queue slot is likely to free up."""
+        return max(1, math.ceil(self.run_latency.mean * self._queue.qsize() / self.workers))
+
+    async def _work(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        assert self._template is not None
+        job.status, job.started_at = "running", time.time()
+        self.queue_latency.record(job.started_at - job.submitted_at)
+        self.running += 1
+
+        async def answer_prompt(prompt: str) -> str:
+            return "yes" if job.approve else "no"
+
+        reset_io = setup_io_context(read=answer_prompt)
+        reset_approvals = setup_session()  # approvals are remembered per job, not across clients
+        reset_priority = setup_priority(job.priority)
+        reset_checkpoint = setup_checkpoint(job.checkpoint)
+        try:
+            agent = await self._template.clone()  # shares tools and clients, but has its own memory
+            response = await asyncio.wait_for(agent.run(job.query), self.timeout)  # type: ignore[arg-type]
+            job.answer, job.status = response.answer.text, "succeeded"
+            self.succeeded += 1
+        except Exception as e:
+            logger.warning(f"Job {job.id} ({self.name}) failed: {e}")
+            job.error, job.status = str(e) or type(e).__name__, "failed"
+            self.failed += 1
+        finally:
+            reset_io()
+            reset_approvals()
+            reset_priority()
+            reset_checkpoint()
+            self.running -= 1
+            job.finished_at = time.time()
+            self.run_latency.record(job.finished_at - job.started_at)
+            job.done.set()
+
+    def metrics(self) -> dict[str, Any]:
+        def summary(histogram: LatencyHistogram) -> dict[str, float]:
+            return {
+                "count": histogram.count,
+                "mean": round(histogram.mean, 3),
+                "p50": round(histogram.quantile(0.5), 3),
+                "p95": round(histogram.quantile(0.95), 3),
+                "max": round(histogram.max, 3),
+            }
+
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "queue_size": self._queue.maxsize,
+            "running": self.running,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "queue_seconds": summary(self.queue_latency),
+            "run_seconds": summary(self.run_latency),
+            "steps": {f"{kind}:{name}": summary(h) for (kind, name), h in self._trace_recorder.histograms.items()},
+        }
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._stack.aclose()
+
+
+class JobServer:
+    """HTTP API over one AgentPool per configuration."""
+
+    def __init__(
+        self,
+        configs: dict[str, AgentFactory] | None = None,
+        *,
+        workers: int = 2,
+        queue_size: int = 16,
+        timeout: float = 600.0,
+        history: int = 1000,
+    ) -> None:
+        self.pools = {
+            name: AgentPool(name, factory, workers=workers, queue_size=queue_size, timeout=timeout)
+            for name, factory in (configs or AGENT_CONFIGS).items()
+        }
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._history = history
+
+    async def start(self) -> None:
+        for pool in self.pools.values():
+            await pool.start()
+
+    async def close(self) -> None:
+        for pool in self.pools.values():
+            await pool.close()
+
+    def submit(
+        self,
+        agent: str,
+        query: str,
+        *,
+        approve: bool = False,
+        priority: Priority = "interactive",
+        checkpoint: str | None = None,
+    ) -> Job:
+        """Queue a job; raises KeyError for unknown configurations and asyncio.QueueFull when saturated."""
+        pool = self.pools[agent]
+        job = Job(agent=agent, query=query, approve=approve, priority=priority, checkpoint=checkpoint or "")
+        pool.submit(job)
+        self._jobs[job.id] = job
+        while len(self._jobs) > self._history:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.done.is_set():
+                break
+            self._jobs.popitem(last=False)
+        return job
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes(
+            [
+                web.get("/agents", self._list_agents),
+                web.post("/agents/{agent}/jobs", self._create_job),
+                web.get("/jobs/{id}", self._get_job),
+                web.get("/metrics", self._metrics),
+                web.get("/rate-limits", self._rate_limits),
+            ]
+        )
+
+        async def lifecycle(_: web.Application) -> Any:
+            await self.start()
+            yield
+            await self.close()
+
+        app.cleanup_ctx.append(lifecycle)
+        return app
+
+    @staticmethod
+    def _wants_wait(request: web.Request, body: dict[str, Any] | None = None) -> bool:
+        if body is not None and "wait" in body:
+            return bool(body["wait"])
+        return request.query.get("wait", "").lower() in ("1", "true", "yes")
+
+    async def _list_agents(self, request: web.Request) -> web.Response:
+        return web.json_response(sorted(self.pools))
+
+    async def _create_job(self, request: web.Request) -> web.Response:
+        try:
+            body = await request.json()
+        except ValueError:
+            raise web.HTTPBadRequest(reason="The body must be a JSON object") from None
+        if not isinstance(body, dict) or not isinstance(body.get("query"), str) or not body["query"].strip():
+            raise web.HTTPBadRequest(reason="'query' must be a non-empty string")
+
+        wait = self._wants_wait(request, body)
+        priority = body.get("priority") or ("interactive" if wait else "batch")
+        if priority not in ("interactive", "batch"):
+            raise web.HTTPBadRequest(reason="'priority' must be \"interactive\" or \"batch\"")
+        checkpoint = body.get("checkpoint")
+        if checkpoint is not None and (not isinstance(checkpoint, str) or not checkpoint.strip()):
+            raise web.HTTPBadRequest(reason="'checkpoint' must be a non-empty string")
+        if checkpoint is not None and any(
+            job.checkpoint == checkpoint and not job.done.is_set() for job in self._jobs.values()
+        ):
+            raise web.HTTPConflict(reason=f"A job is already running checkpoint '{checkpoint}'")
+
+        agent = request.match_info["agent"]
+        try:
+            job = self.submit(
+                agent,
+                body["query"],
+                approve=bool(body.get("approve", False)),
+                priority=priority,
+                checkpoint=checkpoint,
+            )
+        except KeyError:
+            raise web.HTTPNotFound(reason=f"Unknown agent '{agent}'") from None
+        except asyncio.QueueFull:
+            return web.json_response(
+                {"error": f"The '{agent}' queue is full"},
+                status=429,
+                headers={"Retry-After": str(self.pools[agent].retry_after())},
+            )
+
+        if wait:
+            await job.done.wait()
+            return web.json_response(job.to_dict())
+        return web.json_response(job.to_dict(), status=202, headers={"Location": f"/jobs/{job.id}"})
+
+    async def _get_job(self, request: web.Request) -> web.Response:
+        job = self._jobs.get(request.match_info["id"])
+        if job is None:
+            raise web.HTTPNotFound(reason="Unknown job")
+        if self._wants_wait(request):
+            await job.done.wait()
+        return web.json_response(job.to_dict())
+
+    async def _metrics(self, request: web.Request) -> web.Response:
+        return web.json_response({name: pool.metrics() for name, pool in self.pools.items()})
+
+    async def _rate_limits(self, request: web.Request) -> web.Response:
+        return web.json_response(shared_limiter.stats())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the example agents over a local HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", type=Path, help="Listen on this Unix socket instead of a TCP port.")
+    parser.add_argument("--workers", type=int, default=2, help="Concurrent jobs per agent configuration.")
+    parser.add_argument("--queue-size", type=int, default=16, help="Queued jobs per configuration before 429s.")
+    parser.add_argument("--timeout", type=float, default=600.0, help="Seconds before a job is failed.")
+    args = parser.parse_args()
+
+    logging.getLogger("asyncio").setLevel(logging.CRITICAL)
+    server = JobServer(workers=args.workers, queue_size=args.queue_size, timeout=args.timeout)
+    if args.socket is not None:
+        args.socket.parent.mkdir(parents=True, exist_ok=True)
+        web.run_app(server.app(), path=str(args.socket))
+    else:
+        web.run_app(server.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
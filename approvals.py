@@ -0,0 +1,344 @@
+"""Tool approvals from a policy file, remembered per session and asked for in batches.
+
+    agent = RequirementAgent(..., requirements=[ApprovalRequirement(WikipediaTool, policy=ApprovalPolicy.load())])
+
+A drop-in for AskPermissionRequirement that keeps the user off the agent's critical path:
+
+- approvals.toml allows or denies tools declaratively; only tools it leaves on "ask" reach the user.
+- The user's answer is remembered per session and tool. A session is process-wide by default;
+  servers give each job its own with `setup_session()`.
+- Calls that wait for an answer at the same time, from parallel tool calls or concurrent
+  agents, are asked about in one prompt.
+- If no answer arrives within `defer_after` seconds, the call returns a note that approval is
+  pending and the agent continues with other work. When it calls the tool again, the call waits
+  for the answer and then runs (or is refused). The deferred call is recorded as a failed step,
+  so it doesn't count as an invocation, and the agent can't finish until it has come back for it.
+  The note asks for the other work first, because RequirementAgent takes a call repeated right
+  away as a cycle and drops it.
+"""
+
+import asyncio
+import fnmatch
+import os
+import re
+import tomllib
+from collections.abc import Callable, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Literal, Self
+
+from typing_extensions import override
+
+from beeai_framework.agents.experimental.events import RequirementAgentSuccessEvent
+from beeai_framework.agents.experimental.requirements._utils import (
+    MultiTargetType,
+    _assert_all_rules_found,
+    _extract_targets,
+    _target_seen_in,
+)
+from beeai_framework.agents.experimental.requirements.requirement import Requirement, Rule, run_with_context
+from beeai_framework.agents.experimental.types import RequirementAgentRunState
+from beeai_framework.agents.experimental.utils._tool import FinalAnswerTool
+from beeai_framework.context import RunContext, RunContextStartEvent, RunMiddlewareType
+from beeai_framework.emitter import EmitterOptions, EventMeta
+from beeai_framework.emitter.utils import create_internal_event_matcher
+from beeai_framework.logger import Logger
+from beeai_framework.tools import AnyTool, StringToolOutput, ToolError
+from beeai_framework.utils import MaybeAsync
+from beeai_framework.utils.asynchronous import ensure_async
+from beeai_framework.utils.io import io_read
+from beeai_framework.utils.strings import to_json
+from checkpoints import is_replayed
+
+logger = Logger(__name__)
+
+DEFAULT_POLICY_PATH = Path(os.environ.get("APPROVAL_POLICY", Path(__file__).with_name("approvals.toml")))
+
+Decision = Literal["allow", "deny", "ask"]
+
+_DENIED = "This tool is not allowed to be used."
+
+
+@dataclass(frozen=True)
+class ApprovalPolicy:
+    """Per-tool decisions; keys are tool names or fnmatch patterns, checked after the exact names."""
+
+    default: Decision = "ask"
+    tools: dict[str, Decision] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        decisions = {"default": self.default, **self.tools}
+        invalid = {name: value for name, value in decisions.items() if value not in ("allow", "deny", "ask")}
+        if invalid:
+            raise ValueError(f"Approval decisions must be 'allow', 'deny' or 'ask', got: {invalid}")
+
+    @classmethod
+    def load(cls, path: str | Path = DEFAULT_POLICY_PATH) -> Self:
+        """Read a policy file; a missing file asks about every tool."""
+        try:
+            with open(path, "rb") as f:
+                data = tomllib.load(f)
+        except FileNotFoundError:
+            logger.debug(f"No approval policy at {path}, asking about every tool")
+            return cls()
+        return cls(default=data.get("default", "ask"), tools=dict(data.get("tools", {})))
+
+    def decide(self, tool: str) -> bool | None:
+        """True to allow, False to deny, None to ask the user."""
+        decision = self.tools.get(tool)
+        if decision is None:
+            pattern = next((key for key in self.tools if fnmatch.fnmatchcase(tool, key)), None)
+            decision = self.tools[pattern] if pattern is not None else self.default
+        return None if decision == "ask" else decision == "allow"
+
+
+@dataclass
+class ApprovalRequest:
+    """The pending calls of one tool; the answer applies to all of them."""
+
+    tool: str
+    inputs: list[Any]
+    future: asyncio.Future[bool] = field(repr=False)
+
+
+AskBatchHandler = MaybeAsync[[list[ApprovalRequest]], list[bool]]
+
+
+def _parse_answer(answer: str, count: int) -> list[bool]:
+    """"yes" or "all" approves everything, numbers approve those requests, anything else nothing."""
+    answer = answer.strip().casefold()
+    if answer.startswith(("y", "all")) and not re.search(r"\d", answer):
+        return [True] * count
+    chosen = {int(number) for number in re.findall(r"\d+", answer)}
+    return [n in chosen for n in range(1, count + 1)]
+
+
+async def _default_handler(requests: list[ApprovalRequest]) -> list[bool]:
+    lines = []
+    for n, request in enumerate(requests, start=1):
+        inputs = "; ".join(to_json(input, sort_keys=False) for input in request.inputs)
+        lines.append(f"  {n}. {request.tool}: {inputs}")
+    question = (
+        "Do you allow it? (yes/no): "
+        if len(requests) == 1
+        else 'Do you allow them? (yes = all, no = none, or the numbers to allow, e.g. "1 3"): '
+    )
+    response = await io_read("The agent wants to use:\n" + "\n".join(lines) + f"\n{question}")
+    return _parse_answer(response, len(requests))
+
+
+class ApprovalSession:
+    """The user's decisions in one session, and the prompt that asks for the missing ones in batches."""
+
+    def __init__(self, *, handler: AskBatchHandler | None = None, batch_window: float = 0.05) -> None:
+        self._handler = ensure_async(handler) if handler else None
+        self._batch_window = batch_window
+        self._decisions: dict[str, bool] = {}
+        self._pending: dict[str, ApprovalRequest] = {}
+        self._asking: dict[str, ApprovalRequest] = {}  # the requests in the open prompt
+        self._prompting: asyncio.Task[None] | None = None
+
+    def decision(self, tool: str) -> bool | None:
+        return self._decisions.get(tool)
+
+    def request(self, tool: str, input: Any) -> asyncio.Future[bool]:
+        """The user's answer for `tool`, asked for together with the other requests pending at the same time."""
+        future: asyncio.Future[bool] = asyncio.get_running_loop().create_future()
+        if tool in self._decisions:
+            future.set_result(self._decisions[tool])
+            return future
+
+        request = self._asking.get(tool) or self._pending.get(tool)
+        if request is None:
+            request = self._pending[tool] = ApprovalRequest(tool, [], future)
+        request.inputs.append(input)
+        if self._prompting is None or self._prompting.done():
+            self._prompting = asyncio.create_task(self._prompt_pending(), name="approval-prompt")
+        return request.future
+
+    async def _prompt_pending(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self._batch_window)  # lets calls made at the same time join the prompt
+            batch = list(self._pending.values())
+            self._pending, self._asking = {}, self._pending
+            try:
+                answers = await (self._handler or _default_handler)(batch)
+                if len(answers) != len(batch):
+                    raise ValueError(f"expected {len(batch)} answers, got {len(answers)}")
+            except Exception as e:
+                logger.warning(f"Asking for approval failed, denying {', '.join(r.tool for r in batch)}: {e}")
+                answers = [False] * len(batch)
+            for request, allowed in zip(batch, answers, strict=True):
+                self._decisions[request.tool] = allowed
+                if not request.future.done():
+                    request.future.set_result(allowed)
+            self._asking = {}
+
+
+shared_session = ApprovalSession()
+
+_current_session: ContextVar[ApprovalSession] = ContextVar("approval_session")
+
+
+def current_session() -> ApprovalSession:
+    return _current_session.get(None) or shared_session
+
+
+def setup_session(session: ApprovalSession | None = None) -> Callable[[], None]:
+    """Use `session` (a new one by default) in the current context; returns a function restoring the previous one."""
+    token = _current_session.set(session or ApprovalSession())
+    return lambda: _current_session.reset(token)
+
+
+@dataclass
+class _RunApprovals:
+    tools: list[AnyTool]
+    deferred: set[str] = field(default_factory=set)  # tools the agent still has to come back to
+    notes: set[int] = field(default_factory=set)  # id() of the "approval pending" outputs
+
+
+class ApprovalRequirement(Requirement[RequirementAgentRunState]):
+    name = "approval"
+    description = "Use to ask the user for approval"
+
+    def __init__(
+        self,
+        include: MultiTargetType | None = None,
+        *,
+        policy: ApprovalPolicy | None = None,
+        exclude: MultiTargetType | None = None,
+        hide_disallowed: bool = False,
+        defer_after: float | None = 1.0,
+        middlewares: Sequence[RunMiddlewareType] | None = None,
+    ) -> None:
+        """Requires approval for the included tools (all of them by default).
+
+        Args:
+            include: Tools that need approval.
+            policy: Declarative decisions; defaults to asking about every tool.
+            exclude: Tools that never need approval.
+            hide_disallowed: Hide denied tools from the model instead of just disallowing them.
+            defer_after: Seconds to wait for an answer before the agent continues without the call;
+                None waits for the answer, like AskPermissionRequirement.
+        """
+        super().__init__()
+        self.priority += 1
+        self.middlewares.extend(middlewares or [])
+        self._include = _extract_targets(include)
+        self._exclude = _extract_targets(exclude)
+        self._exclude.add(FinalAnswerTool)
+        self._policy = policy or ApprovalPolicy()
+        self._hide_disallowed = hide_disallowed
+        self._defer_after = defer_after
+        self._runs: dict[str, _RunApprovals] = {}
+
+    def _decide(self, tool: str) -> bool | None:
+        decision = self._policy.decide(tool)
+        return decision if decision is not None else current_session().decision(tool)
+
+    @override
+    async def init(self, *, tools: list[AnyTool], ctx: RunContext) -> None:
+        await super().init(tools=tools, ctx=ctx)
+
+        _assert_all_rules_found(self._include, tools)
+        _assert_all_rules_found(self._exclude, tools)
+
+        # The requirement is shared by the agent's clones, so what belongs to a run is kept per run
+        run = self._runs[ctx.run_id] = _RunApprovals(
+            [
+                tool
+                for tool in tools
+                if not _target_seen_in(tool, self._exclude)
+                and (not self._include or _target_seen_in(tool, self._include))
+            ]
+        )
+
+        def setup_tool(tool: AnyTool) -> None:
+            async def handler(data: Any, meta: EventMeta) -> None:
+                if not is_replayed(meta):  # it was approved in the run that made the checkpoint
+                    await self._approve(run, tool, data)
+
+            ctx.emitter.match(
+                create_internal_event_matcher("start", tool, parent_run_id=ctx.run_id),
+                handler,
+                EmitterOptions(is_blocking=True, persistent=True, match_nested=True),
+            )
+
+        for tool in run.tools:
+            setup_tool(tool)
+
+        async def on_success(data: Any, meta: EventMeta) -> None:
+            if isinstance(data, RequirementAgentSuccessEvent) and run.notes:
+                for step in data.state.steps:
+                    if step.iteration == data.state.iteration and id(step.output) in run.notes:
+                        step.error = ToolError(step.output.get_text_content())
+                run.notes.clear()
+
+        async def on_finish(data: Any, meta: EventMeta) -> None:
+            self._runs.pop(ctx.run_id, None)
+
+        ctx.emitter.on("success", on_success)
+        ctx.emitter.match(
+            lambda event: event.name == "finish" and event.creator is ctx,
+            on_finish,
+            EmitterOptions(match_nested=True),
+        )
+
+    async def _approve(self, run: _RunApprovals, tool: AnyTool, data: RunContextStartEvent) -> None:
+        allowed = self._decide(tool.name)
+        if allowed is None:
+            input = data.input.get("input") if isinstance(data.input, dict) else data.input  # without run options
+            answer = current_session().request(tool.name, input)
+            if tool.name in run.deferred or self._defer_after is None:
+                allowed = await answer  # nothing left to do but wait
+            else:
+                try:
+                    allowed = await asyncio.wait_for(asyncio.shield(answer), self._defer_after)
+                except TimeoutError:
+                    run.deferred.add(tool.name)
+                    data.output = StringToolOutput(
+                        f"Waiting for the user to approve '{tool.name}'. Continue with the work that doesn't need it "
+                        f"and call '{tool.name}' again afterwards; it will run once approved."
+                    )
+                    run.notes.add(id(data.output))
+                    return
+            run.deferred.discard(tool.name)
+
+        if not allowed:
+            data.output = StringToolOutput(_DENIED)
+
+    @run_with_context
+    async def run(self, state: RequirementAgentRunState, context: RunContext) -> list[Rule]:
+        run = self._runs.get(context.parent_id or "")  # the requirement runs inside the agent's run
+        if run is None:
+            return []
+
+        rules: list[Rule] = []
+        for tool in run.tools:
+            allowed = self._decide(tool.name)
+            if allowed is False:
+                run.deferred.discard(tool.name)
+                rules.append(
+                    Rule(
+                        target=tool.name,
+                        allowed=False,
+                        hidden=self._hide_disallowed,
+                        prevent_stop=False,
+                        forced=False,
+                    )
+                )
+            elif tool.name in run.deferred:
+                rules.append(Rule(target=tool.name, allowed=True, hidden=False, prevent_stop=True, forced=False))
+        return rules
+
+    async def clone(self) -> Self:
+        instance: Self = await super().clone()
+        instance.middlewares = self.middlewares.copy()
+        instance._include = self._include.copy()
+        instance._exclude = self._exclude.copy()
+        instance._policy = self._policy
+        instance._hide_disallowed = self._hide_disallowed
+        instance._defer_after = self._defer_after
+        instance._runs = {}
+        return instance
@@ -0,0 +1,438 @@
+"""Deterministic offline benchmark for the t2-t12 examples.
+
+Every example's entry point runs against ScriptedChatModel, a local stand-in that answers with
+scripted tool calls after a configurable simulated latency. Wikipedia and Open-Meteo
+return canned outputs, so no network or credentials are needed and the call, step and
+token counts are the same on every run:
+
+    python benchmark.py run -o benchmarks/baseline.json
+    python benchmark.py run t5 t6 t7 --latency 0.1 -o benchmarks/current.json
+    python benchmark.py compare benchmarks/baseline.json benchmarks/current.json
+
+`compare` exits with status 1 when an example got slower than the threshold or any of its
+counts changed.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from dataclasses import asdict, dataclass, field
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+from pydantic import BaseModel
+
+from beeai_framework.agents.experimental.events import RequirementAgentStartEvent
+from beeai_framework.agents.experimental.utils._tool import FinalAnswerTool
+from beeai_framework.backend import AnyMessage, AssistantMessage, ChatModel, ChatModelParameters, UserMessage
+from beeai_framework.backend.constants import ProviderName
+from beeai_framework.backend.message import MessageToolCallContent
+from beeai_framework.backend.types import (
+    ChatModelInput,
+    ChatModelOutput,
+    ChatModelStructureInput,
+    ChatModelStructureOutput,
+    ChatModelUsage,
+)
+from beeai_framework.context import RunContext
+from beeai_framework.emitter import Emitter, EmitterOptions, EventMeta
+from beeai_framework.tools import AnyTool, JSONToolOutput
+from beeai_framework.tools.events import ToolStartEvent
+from beeai_framework.tools.search.wikipedia.wikipedia import (
+    WikipediaTool,
+    WikipediaToolInput,
+    WikipediaToolOutput,
+    WikipediaToolResult,
+)
+from beeai_framework.tools.weather import OpenMeteoTool
+from beeai_framework.tools.weather.openmeteo import OpenMeteoToolInput
+
+import approvals
+import model_registry
+import weather_cache
+import wikipedia_cache
+import wikipedia_index
+from bounded_memory import estimate_tokens
+from launcher import EXAMPLES, load_entry_point
+from model_registry import shared_models
+
+# Arguments the scripted model sends to known tools; other tools get values derived from their schema
+CANNED_TOOL_ARGS: dict[str, dict[str, Any]] = {
+    "think": {"thoughts": "Break the request into parts and research each one.", "next_step": ["Research"]},
+    "Wikipedia": {"query": "Tokyo"},
+    "OpenMeteoTool": {"location_name": "Tokyo"},
+    "SimpleCalculator": {"expression": "144 / 12"},
+}
+
+# Characters per chunk when the scripted model streams
+STREAM_CHUNK_CHARS = 8
+
+CANNED_ARTICLE = (
+    "Tokyo is the capital of Japan and one of the most populous metropolitan areas in the world. "
+    "It is a major center of finance, culture and technology."
+)
+
+CANNED_FORECAST = {
+    "latitude": 35.7,
+    "longitude": 139.7,
+    "current": {"temperature_2m": 18.5, "rain": 0.0, "relative_humidity_2m": 60, "wind_speed_10m": 9.4},
+    "daily": {"temperature_2m_max": [21.0], "temperature_2m_min": [14.2], "rain_sum": [0.4]},
+}
+
+
+@dataclass
+class BenchmarkCounters:
+    llm_calls: int = 0
+    tool_calls: int = 0
+    steps: int = 0
+    prompt_tokens: int = 0
+
+
+@dataclass
+class BenchmarkResult:
+    example: str
+    wall_time: float
+    llm_calls: int
+    tool_calls: int
+    steps: int
+    prompt_tokens: int
+    runs: list[float] = field(default_factory=list)
+    error: str | None = None
+
+
+def _sample_value(schema: dict[str, Any], name: str, defs: dict[str, Any]) -> Any:
+    """Deterministic placeholder value for a JSON schema node."""
+    if "$ref" in schema:
+        return _sample_value(defs[schema["$ref"].split("/")[-1]], name, defs)
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "default" in schema and schema["default"] is not None:
+        return schema["default"]
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        return _sample_value(options[0], name, defs) if options else None
+
+    kind = schema.get("type")
+    if kind == "object":
+        properties = schema.get("properties", {})
+        return {key: _sample_value(value, key, defs) for key, value in properties.items()}
+    if kind == "array":
+        item = _sample_value(schema.get("items", {"type": "string"}), name, defs)
+        return [item] * max(1, schema.get("minItems", 1))
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return False
+    return f"Scripted {name.replace('_', ' ')}"
+
+
+def sample_object(schema: dict[str, Any]) -> dict[str, Any]:
+    value = _sample_value(schema, "value", schema.get("$defs", {}))
+    return value if isinstance(value, dict) else {}
+
+
+def _json_schema(schema: type[BaseModel] | dict[str, Any]) -> dict[str, Any]:
+    return schema if isinstance(schema, dict) else schema.model_json_schema()
+
+
+class ScriptedChatModel(ChatModel):
+    """Offline ChatModel that calls each offered tool once, then answers.
+
+    A forced tool choice is always followed. Every call waits `latency` seconds plus
+    `token_latency` per prompt token before it returns.
+    """
+
+    def __init__(
+        self,
+        counters: BenchmarkCounters,
+        *,
+        latency: float = 0.0,
+        token_latency: float = 0.0,
+        parameters: ChatModelParameters | None = None,
+    ) -> None:
+        super().__init__(parameters=parameters or ChatModelParameters())
+        self._counters = counters
+        self._latency = latency
+        self._token_latency = token_latency
+
+    @property
+    def model_id(self) -> str:
+        return "scripted"
+
+    @property
+    def provider_id(self) -> ProviderName:
+        return "ollama"
+
+    async def _simulate_call(self, messages: list[AnyMessage], tools: list[AnyTool] | None) -> int:
+        tokens = sum(estimate_tokens(message) for message in messages)
+        tokens += sum(len(json.dumps(tool.input_schema.model_json_schema())) // 4 for tool in tools or [])
+        self._counters.llm_calls += 1
+        self._counters.prompt_tokens += tokens
+        await asyncio.sleep(self._latency + tokens * self._token_latency)
+        return tokens
+
+    def _choose_tool(self, input: ChatModelInput) -> AnyTool | None:
+        tools = input.tools or []
+        if not tools:
+            return None
+        if input.tool_choice not in (None, "auto", "required", "none"):
+            return input.tool_choice  # type: ignore[return-value]
+
+        # Only the current turn counts, so every new user question gets the full tool sequence
+        turn_start = max((i for i, message in enumerate(input.messages) if isinstance(message, UserMessage)), default=0)
+        called = {
+            call.tool_name
+            for message in input.messages[turn_start:]
+            if isinstance(message, AssistantMessage)
+            for call in message.get_tool_calls()
+        }
+        pending = [tool for tool in tools if tool.name != "final_answer" and tool.name not in called]
+        final_answer = next((tool for tool in tools if tool.name == "final_answer"), None)
+        return pending[0] if pending else final_answer or tools[0]
+
+    async def _create(self, input: ChatModelInput, run: RunContext) -> ChatModelOutput:
+        tokens = await self._simulate_call(input.messages, input.tools)
+        usage = ChatModelUsage(prompt_tokens=tokens, completion_tokens=20, total_tokens=tokens + 20)
+
+        if isinstance(input.response_format, dict) and input.response_format.get("type") == "json_schema":
+            text = json.dumps(sample_object(input.response_format["json_schema"]["schema"]))
+            return ChatModelOutput(messages=[AssistantMessage(text)], usage=usage)
+
+        tool = self._choose_tool(input)
+        if tool is None:
+            return ChatModelOutput(messages=[AssistantMessage("Scripted response.")], usage=usage)
+
+        args = CANNED_TOOL_ARGS.get(tool.name) or sample_object(_json_schema(tool.input_schema))
+        call = MessageToolCallContent(
+            id=f"call_{self._counters.llm_calls}", tool_name=tool.name, args=json.dumps(args)
+        )
+        return ChatModelOutput(messages=[AssistantMessage(call)], usage=usage)
+
+    async def _create_stream(self, input: ChatModelInput, run: RunContext) -> Any:
+        # Deliver the scripted output in small pieces, the way providers stream tokens
+        output = await self._create(input, run)
+        message_id = f"msg_{self._counters.llm_calls}"
+        for content in output.messages[0].content:
+            if isinstance(content, MessageToolCallContent):
+                for start in range(0, max(len(content.args), 1), STREAM_CHUNK_CHARS):
+                    piece = content.args[start : start + STREAM_CHUNK_CHARS]
+                    call = MessageToolCallContent(id=content.id, tool_name=content.tool_name, args=piece)
+                    yield ChatModelOutput(messages=[AssistantMessage(call, id=message_id)])
+            else:
+                text = content.text  # type: ignore[union-attr]
+                for start in range(0, len(text), STREAM_CHUNK_CHARS):
+                    piece = text[start : start + STREAM_CHUNK_CHARS]
+                    yield ChatModelOutput(messages=[AssistantMessage(piece, id=message_id)])
+        yield ChatModelOutput(messages=[], usage=output.usage, finish_reason="stop")
+
+    async def _create_structure(
+        self, input: ChatModelStructureInput[Any], run: RunContext
+    ) -> ChatModelStructureOutput:
+        await self._simulate_call(input.messages, None)
+        return ChatModelStructureOutput(object=sample_object(_json_schema(input.input_schema)))
+
+    async def clone(self) -> "ScriptedChatModel":
+        return ScriptedChatModel(
+            self._counters,
+            latency=self._latency,
+            token_latency=self._token_latency,
+            parameters=self.parameters.model_copy(),
+        )
+
+
+@contextmanager
+def offline_environment(
+    counters: BenchmarkCounters, *, latency: float, token_latency: float = 0.0, tool_latency: float = 0.0
+) -> Iterator[None]:
+    """Swap the model, network-backed tools, permission prompts and shared caches for offline ones."""
+
+    def from_name(name: str, options: ChatModelParameters | None = None, /, **kwargs: Any) -> ScriptedChatModel:
+        # The example's parameters are kept, so e.g. `stream=True` makes the scripted model stream
+        parameters = options if isinstance(options, ChatModelParameters) else None
+        return ScriptedChatModel(counters, latency=latency, token_latency=token_latency, parameters=parameters)
+
+    def fetch_article(self: wikipedia_cache.CachedWikipediaTool, input: WikipediaToolInput) -> WikipediaToolOutput:
+        time.sleep(tool_latency)
+        return WikipediaToolOutput([WikipediaToolResult(title=input.query, description=CANNED_ARTICLE, url="")])
+
+    async def run_wikipedia(self: WikipediaTool, input: WikipediaToolInput, *args: Any) -> WikipediaToolOutput:
+        return await asyncio.to_thread(fetch_article, self, input)  # type: ignore[arg-type]
+
+    async def geocode(self: OpenMeteoTool, input: OpenMeteoToolInput) -> dict[str, Any]:
+        await asyncio.sleep(tool_latency)
+        return {"latitude": CANNED_FORECAST["latitude"], "longitude": CANNED_FORECAST["longitude"]}
+
+    async def forecast(self: OpenMeteoTool, *args: Any) -> JSONToolOutput[dict[str, Any]]:
+        await asyncio.sleep(tool_latency)
+        return JSONToolOutput(CANNED_FORECAST)
+
+    async def allow(requests: list[approvals.ApprovalRequest]) -> list[bool]:
+        return [True] * len(requests)
+
+    def count(data: Any, meta: EventMeta) -> None:
+        if isinstance(data, RequirementAgentStartEvent):
+            counters.steps += 1
+        elif isinstance(data, ToolStartEvent) and not isinstance(meta.creator, FinalAnswerTool):
+            counters.tool_calls += 1
+
+    with ExitStack() as stack, tempfile.TemporaryDirectory() as workdir:
+        stack.enter_context(patch.object(ChatModel, "from_name", from_name))
+        stack.enter_context(patch.object(wikipedia_cache.CachedWikipediaTool, "_fetch", fetch_article))
+        stack.enter_context(patch.object(WikipediaTool, "_run", run_wikipedia))
+        stack.enter_context(patch.object(OpenMeteoTool, "_geocode", geocode))
+        stack.enter_context(patch.object(OpenMeteoTool, "_run", forecast))
+        stack.enter_context(patch.object(approvals, "_default_handler", allow))
+        stack.enter_context(patch.object(approvals, "shared_session", approvals.ApprovalSession()))
+        stack.enter_context(patch.object(model_registry, "use_cached_watsonx_token", lambda **kwargs: None))
+        # Fresh shared caches, and a scratch working directory for the on-disk ones
+        stack.enter_context(
+            patch.object(wikipedia_cache, "shared_wikipedia_cache", wikipedia_cache.SingleFlightCache())
+        )
+        stack.enter_context(
+            patch.object(wikipedia_index, "indexed_lookup_cache", wikipedia_cache.SingleFlightCache())
+        )
+        stack.enter_context(patch.object(weather_cache, "shared_forecast_cache", weather_cache.ForecastCache()))
+        # Registered models from an earlier run would bypass the patched ChatModel.from_name
+        shared_models.reset()
+        stack.callback(shared_models.reset)
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        stack.callback(os.chdir, cwd)
+        stop_counting = Emitter.root().match(
+            lambda event: event.name == "start", count, EmitterOptions(match_nested=True)
+        )
+        stack.callback(stop_counting)
+        yield
+
+
+def run_example(
+    name: str, *, latency: float, token_latency: float, tool_latency: float, repeat: int
+) -> BenchmarkResult:
+    entry_point = load_entry_point(name)
+    runs: list[float] = []
+    counters = BenchmarkCounters()
+    for _ in range(repeat):
+        counters = BenchmarkCounters()
+        with offline_environment(counters, latency=latency, token_latency=token_latency, tool_latency=tool_latency):
+            start = time.perf_counter()
+            try:
+                with redirect_stdout(io.StringIO()):
+                    asyncio.run(entry_point())
+            except Exception as e:
+                return BenchmarkResult(name, 0.0, **asdict(counters), error=f"{type(e).__name__}: {e}")
+            runs.append(time.perf_counter() - start)
+    return BenchmarkResult(name, statistics.median(runs), **asdict(counters), runs=runs)
+
+
+def run_benchmarks(args: argparse.Namespace) -> None:
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    logging.getLogger("asyncio").setLevel(logging.CRITICAL)
+
+    results = {}
+    print(f"{'example':<8} {'wall (s)':>9} {'llm':>5} {'tools':>6} {'steps':>6} {'prompt tok':>11}")
+    for name in args.examples or EXAMPLES:
+        result = run_example(
+            name,
+            latency=args.latency,
+            token_latency=args.token_latency,
+            tool_latency=args.tool_latency,
+            repeat=args.repeat,
+        )
+        results[name] = asdict(result)
+        if result.error:
+            print(f"{name:<8} failed: {result.error}")
+            continue
+        print(
+            f"{name:<8} {result.wall_time:>9.3f} {result.llm_calls:>5} {result.tool_calls:>6}"
+            f" {result.steps:>6} {result.prompt_tokens:>11}"
+        )
+
+    if args.output:
+        report = {
+            "created_at": datetime.now(tz=UTC).isoformat(),
+            "settings": {
+                "latency": args.latency,
+                "token_latency": args.token_latency,
+                "tool_latency": args.tool_latency,
+                "repeat": args.repeat,
+            },
+            "results": results,
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2))
+        print(f"\nResults written to {args.output}")
+
+
+def compare_benchmarks(args: argparse.Namespace) -> int:
+    baseline = json.loads(args.baseline.read_text())
+    current = json.loads(args.current.read_text())
+    if baseline["settings"] != current["settings"]:
+        print(f"Warning: settings differ (baseline {baseline['settings']}, current {current['settings']})\n")
+
+    regressions = 0
+    print(f"{'example':<8} {'wall (s)':>22} {'llm':>9} {'tools':>9} {'steps':>9} {'prompt tok':>15}")
+    for name, new in current["results"].items():
+        old = baseline["results"].get(name)
+        if old is None or old["error"] or new["error"]:
+            print(f"{name:<8} {'(no baseline)' if old is None else old['error'] or new['error']}")
+            regressions += bool(old is not None and new["error"] and not old["error"])
+            continue
+
+        change = (new["wall_time"] - old["wall_time"]) / old["wall_time"] if old["wall_time"] else 0.0
+        counts = ["llm_calls", "tool_calls", "steps", "prompt_tokens"]
+        slower = change > args.threshold
+        changed = [key for key in counts if new[key] != old[key]]
+        regressions += slower or bool(changed)
+
+        cells = [f"{old[key]}->{new[key]}" if key in changed else str(new[key]) for key in counts]
+        flag = " REGRESSION" if slower or changed else ""
+        print(
+            f"{name:<8} {old['wall_time']:>7.3f} -> {new['wall_time']:>6.3f} ({change:+.0%})"
+            f" {cells[0]:>9} {cells[1]:>9} {cells[2]:>9} {cells[3]:>15}{flag}"
+        )
+
+    print(f"\n{regressions} regression(s) (wall time threshold {args.threshold:.0%})")
+    return 1 if regressions else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmark for the example agents.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the examples and report their metrics.")
+    run_parser.add_argument("examples", nargs="*", help=f"Examples to run (default: {' '.join(EXAMPLES)}).")
+    run_parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per LLM call.")
+    run_parser.add_argument(
+        "--token-latency", type=float, default=0.0, help="Extra simulated seconds per prompt token."
+    )
+    run_parser.add_argument("--tool-latency", type=float, default=0.02, help="Simulated seconds per network tool call.")
+    run_parser.add_argument("--repeat", type=int, default=3, help="Runs per example; the median wall time is kept.")
+    run_parser.add_argument("-o", "--output", type=Path, help="Write the results as JSON to this file.")
+
+    compare_parser = commands.add_parser("compare", help="Diff two JSON result files.")
+    compare_parser.add_argument("baseline", type=Path)
+    compare_parser.add_argument("current", type=Path)
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="Allowed wall time increase (0.1 = 10%%).")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        run_benchmarks(args)
+    else:
+        sys.exit(compare_benchmarks(args))
+
+
+if __name__ == "__main__":
+    main()
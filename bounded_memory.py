@@ -0,0 +1,214 @@
+"""Token-budgeted drop-in replacement for UnconstrainedMemory in long-running agents.
+
+    agent = RequirementAgent(llm=llm, memory=TokenBudgetMemory(max_tokens=4000), ...)
+
+System messages and the current turn (the last user message and everything after it) are
+always kept. When the budget is exceeded, older tool results are compacted first and then the
+oldest turns are dropped as a whole; within the most recent turns, tool results are compacted
+before a turn is dropped. A question is never separated from its answer, nor a tool call from
+its result.
+"""
+
+from collections.abc import Callable
+from math import ceil
+
+from beeai_framework.backend.message import (
+    AnyMessage,
+    AssistantMessage,
+    MessageToolResultContent,
+    SystemMessage,
+    ToolMessage,
+    UserMessage,
+)
+from beeai_framework.memory.base_memory import BaseMemory
+from beeai_framework.memory.errors import ResourceError
+
+TokenEstimator = Callable[[AnyMessage], int]
+
+
+def estimate_tokens(message: AnyMessage) -> int:
+    """Cheap token estimate (~4 characters per token) that also counts tool calls and tool results."""
+    chars = len(message.text)
+    if isinstance(message, AssistantMessage):
+        chars += sum(len(call.tool_name) + len(call.args) for call in message.get_tool_calls())
+    elif isinstance(message, ToolMessage):
+        chars += sum(len(str(result.result)) for result in message.get_tool_results())
+    return ceil(chars / 4) + 4  # per-message overhead for role and separators
+
+
+class TokenBudgetMemory(BaseMemory):
+    """Sliding-window memory with a hard token budget and an incrementally maintained token count."""
+
+    def __init__(
+        self,
+        max_tokens: int = 8000,
+        *,
+        keep_recent_turns: int = 2,
+        compacted_result_chars: int = 200,
+        estimate: TokenEstimator | None = None,
+    ) -> None:
+        if max_tokens <= 0:
+            raise ValueError("'max_tokens' must be a positive integer")
+        if keep_recent_turns < 1:
+            raise ValueError("'keep_recent_turns' must be at least 1")
+
+        self._messages: list[AnyMessage] = []
+        self._tokens: list[int] = []
+        self._total = 0
+        self._max_tokens = max_tokens
+        self._keep_recent_turns = keep_recent_turns
+        self._compacted_result_chars = compacted_result_chars
+        self._estimate = estimate or estimate_tokens
+        # Every message before this index has already been considered for compaction
+        self._compact_cursor = 0
+
+    @property
+    def messages(self) -> list[AnyMessage]:
+        return self._messages
+
+    @property
+    def max_tokens(self) -> int:
+        return self._max_tokens
+
+    @property
+    def tokens_used(self) -> int:
+        return self._total
+
+    async def add(self, message: AnyMessage, index: int | None = None) -> None:
+        index = len(self._messages) if index is None else max(0, min(index, len(self._messages)))
+        tokens = self._estimate(message)
+        self._messages.insert(index, message)
+        self._tokens.insert(index, tokens)
+        self._total += tokens
+        self._compact_cursor = min(self._compact_cursor, index)
+
+        if self._total > self._max_tokens:
+            self._trim(protected=message)
+
+    async def delete(self, message: AnyMessage) -> bool:
+        for index, existing in enumerate(self._messages):
+            if existing is message:
+                self._remove(index, index + 1)
+                return True
+        return False
+
+    def reset(self) -> None:
+        self._messages.clear()
+        self._tokens.clear()
+        self._total = 0
+        self._compact_cursor = 0
+
+    async def clone(self) -> "TokenBudgetMemory":
+        cloned = TokenBudgetMemory(
+            self._max_tokens,
+            keep_recent_turns=self._keep_recent_turns,
+            compacted_result_chars=self._compacted_result_chars,
+            estimate=self._estimate,
+        )
+        cloned._messages = self._messages.copy()
+        cloned._tokens = self._tokens.copy()
+        cloned._total = self._total
+        cloned._compact_cursor = self._compact_cursor
+        return cloned
+
+    def _remove(self, start: int, end: int) -> None:
+        self._total -= sum(self._tokens[start:end])
+        del self._messages[start:end]
+        del self._tokens[start:end]
+        if self._compact_cursor > start:
+            self._compact_cursor = max(start, self._compact_cursor - (end - start))
+
+    def _recent_window_start(self) -> int:
+        """Index of the first message of the most recent `keep_recent_turns` turns."""
+        remaining = self._keep_recent_turns
+        for index in range(len(self._messages) - 1, -1, -1):
+            if isinstance(self._messages[index], UserMessage):
+                remaining -= 1
+                if remaining == 0:
+                    return index
+        return 0
+
+    def _current_turn_start(self) -> int:
+        """Index of the last user message (the newest message if there is none)."""
+        for index in range(len(self._messages) - 1, -1, -1):
+            if isinstance(self._messages[index], UserMessage):
+                return index
+        return len(self._messages) - 1
+
+    def _compact(self, index: int) -> None:
+        message = self._messages[index]
+        if not isinstance(message, ToolMessage) or message.meta.get("compacted"):
+            return
+
+        limit = self._compacted_result_chars
+        compacted = ToolMessage(
+            [
+                MessageToolResultContent(
+                    tool_name=result.tool_name,
+                    tool_call_id=result.tool_call_id,
+                    result=text if len(text := str(result.result)) <= limit else f"{text[:limit]}... [compacted]",
+                )
+                for result in message.get_tool_results()
+            ],
+            meta={**message.meta, "compacted": True},
+        )
+        compacted.id = message.id
+        tokens = self._estimate(compacted)
+        self._messages[index] = compacted
+        self._total += tokens - self._tokens[index]
+        self._tokens[index] = tokens
+
+    def _unit_end(self, start: int) -> int:
+        """End of the smallest block starting at `start` that can be dropped without orphaning messages."""
+        message = self._messages[start]
+        end = start + 1
+        if isinstance(message, UserMessage):
+            # A whole turn: everything up to the next user message
+            while end < len(self._messages) and not isinstance(self._messages[end], UserMessage):
+                end += 1
+        elif isinstance(message, AssistantMessage) and message.get_tool_calls():
+            call_ids = {call.id for call in message.get_tool_calls()}
+            while (
+                end < len(self._messages)
+                and isinstance(self._messages[end], ToolMessage)
+                and any(r.tool_call_id in call_ids for r in self._messages[end].get_tool_results())
+            ):
+                end += 1
+        return end
+
+    def _trim(self, protected: AnyMessage) -> None:
+        # 1. Compact tool results that are older than the recent window
+        window_start = self._recent_window_start()
+        while self._total > self._max_tokens and self._compact_cursor < window_start:
+            self._compact(self._compact_cursor)
+            self._compact_cursor += 1
+
+        # 2. Drop the oldest blocks (whole turns first), never system messages or the current turn
+        start = 0
+        while self._total > self._max_tokens:
+            while start < len(self._messages) and isinstance(self._messages[start], SystemMessage):
+                start += 1
+            if start >= len(self._messages):
+                break
+
+            window_start = self._recent_window_start()
+            if start >= window_start:
+                # Inside the recent window: compact before dropping anything
+                for index in range(start, len(self._messages)):
+                    if self._total <= self._max_tokens:
+                        return
+                    self._compact(index)
+                if self._total <= self._max_tokens:
+                    return
+
+            if start >= self._current_turn_start():
+                break
+            end = self._unit_end(start)
+            if any(message is protected for message in self._messages[start:end]):
+                break
+            self._remove(start, end)
+
+        if self._total > self._max_tokens:
+            raise ResourceError(
+                f"Memory token budget exceeded: {self._total} tokens used, the budget is {self._max_tokens}."
+            )
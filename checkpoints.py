@@ -0,0 +1,417 @@
+"""Step-level checkpoints for agent runs, so a run that dies can be resumed without redoing its work.
+
+    checkpoints = Checkpointer()
+    agent = RequirementAgent(..., middlewares=[trace_recorder, checkpoints])   # and on its experts
+
+    reset = setup_checkpoint("trip-42")
+    try:
+        await agent.run(query)   # after a crash, the same call with the same id resumes
+    finally:
+        reset()
+
+While a checkpoint id is set, every model response and tool result of a checkpointed agent is
+written to a local SQLite store as soon as it arrives, and after each step the run's state is
+saved: its memory, how often each tool was used (what the requirements count) and the handoffs
+still running. Handoff experts are checkpointed under the call that started them, so an expert
+that finished is skipped as a whole and one that was interrupted resumes at its own last step.
+
+A run under an id that has a checkpoint resumes it: the agent loop runs again, but model calls
+and tool calls that were completed are answered from the checkpoint in the same order, which
+rebuilds the memory, the requirement state and the tool call checks exactly as they were; the
+first call that wasn't completed runs for real. A model call is only replayed if the messages
+it is sent are the ones the recorded response was made for, so a run that goes another way
+(a different query, a tool that answers differently) continues live from that point on. Tool
+calls that were answered without running (denied or deferred approvals, rejected concurrent
+calls) aren't recorded and are decided again.
+
+The checkpoint is deleted when the outermost checkpointed run succeeds.
+`python checkpoints.py list` shows the checkpoints of runs that didn't finish.
+"""
+
+import argparse
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel
+
+from beeai_framework.agents.experimental.events import RequirementAgentStartEvent, RequirementAgentSuccessEvent
+from beeai_framework.agents.experimental.types import RequirementAgentRunState
+from beeai_framework.backend import ChatModel, MessageToolCallContent, SystemMessage
+from beeai_framework.context import RunContext, RunContextFinishEvent, RunContextStartEvent, RunMiddlewareProtocol
+from beeai_framework.emitter import EmitterOptions, EventMeta
+from beeai_framework.logger import Logger
+from beeai_framework.tools import Tool
+
+logger = Logger(__name__)
+
+DEFAULT_CHECKPOINT_PATH = Path(".cache") / "checkpoints.sqlite3"
+
+# Where in the run tree a run is, e.g. "RequirementAgent/call_1/DestinationResearch"; nested runs inherit it
+_PATH_KEY = "checkpoint_path"
+
+_current_checkpoint: ContextVar[str | None] = ContextVar("current_checkpoint", default=None)
+
+# Tool calls that will be answered from a checkpoint, by (agent run id, tool call id), so other
+# listeners of the call's start event (e.g. ApprovalRequirement) can leave them alone
+_replayed_calls: set[tuple[str, str]] = set()
+
+
+def current_checkpoint() -> str | None:
+    return _current_checkpoint.get()
+
+
+def setup_checkpoint(checkpoint_id: str | None) -> Callable[[], None]:
+    """Checkpoint the runs started in the current context under `checkpoint_id`; returns a function undoing it."""
+    token = _current_checkpoint.set(checkpoint_id)
+    return lambda: _current_checkpoint.reset(token)
+
+
+def is_replayed(meta: EventMeta) -> bool:
+    """Whether the tool call starting with this event is answered from a checkpoint."""
+    call = meta.context.get("tool_call_msg")
+    trace = meta.trace
+    return (
+        isinstance(call, MessageToolCallContent)
+        and trace is not None
+        and (trace.parent_run_id or "", call.id) in _replayed_calls
+    )
+
+
+class StepCheckpoint(BaseModel):
+    """A run's state after its last step, and the expert runs it is waiting for."""
+
+    path: str
+    iteration: int
+    messages: list[dict[str, Any]]  # the run's memory
+    invocations: dict[str, int]  # successful calls per tool
+    failures: dict[str, int]  # failed calls per tool
+    handoffs: list[str]  # paths of the expert runs started by this run that haven't finished
+    answered: bool
+    saved_at: float
+
+
+class CheckpointStore:
+    """SQLite file holding the checkpoints, one row per recorded call or step state.
+
+    Rows are written one at a time as the run makes progress, so a crash loses at most the
+    call that was in flight.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_CHECKPOINT_PATH) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS checkpoints ("
+            " checkpoint_id TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, saved_at REAL NOT NULL,"
+            " PRIMARY KEY (checkpoint_id, key))"
+        )
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def save(self, checkpoint_id: str, key: str, value: Any) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO checkpoints (checkpoint_id, key, value, saved_at) VALUES (?, ?, ?, ?)",
+                (checkpoint_id, key, blob, time.time()),
+            )
+
+    def load(self, checkpoint_id: str) -> dict[str, bytes]:
+        """The checkpoint's rows, still pickled."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,)
+            ).fetchall()
+        return dict(rows)
+
+    def steps(self, checkpoint_id: str) -> list[StepCheckpoint]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT value FROM checkpoints WHERE checkpoint_id = ? AND key LIKE 'state:%' ORDER BY key",
+                (checkpoint_id,),
+            ).fetchall()
+        return [pickle.loads(value) for (value,) in rows]
+
+    def delete(self, checkpoint_id: str) -> int:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM checkpoints WHERE checkpoint_id = ?", (checkpoint_id,))
+        return cursor.rowcount
+
+    def list(self) -> list[tuple[str, int, float]]:
+        """(checkpoint id, rows, last saved) of every checkpoint, most recent first."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT checkpoint_id, COUNT(*), MAX(saved_at) FROM checkpoints"
+                " GROUP BY checkpoint_id ORDER BY MAX(saved_at) DESC"
+            ).fetchall()
+        return [(checkpoint_id, count, saved_at) for checkpoint_id, count, saved_at in rows]
+
+
+def _digest(run_params: dict[str, Any]) -> str:
+    """What a model call's response depends on; the system prompt is left out as it may contain the date."""
+    messages = [
+        message.to_plain() for message in run_params.get("messages", []) if not isinstance(message, SystemMessage)
+    ]
+    tools = sorted(tool.name for tool in run_params.get("tools") or [])
+    serialized = json.dumps({"messages": messages, "tools": tools}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _succeeded(event: RunContextFinishEvent) -> bool:
+    # Runs stopped by a BaseException (cancelled, interrupted) finish without an error, but also without an output
+    return event.error is None and event.output is not None
+
+
+@dataclass
+class _Checkpoint:
+    """A checkpoint in use by a run of this process."""
+
+    id: str
+    rows: dict[str, bytes]
+    paths: Counter[str] = field(default_factory=Counter)  # runs started per path, to tell repeated runs apart
+    running: dict[str, set[str]] = field(default_factory=dict)  # run path -> paths of its running expert runs
+    runs: dict[str, "_RunCheckpoint"] = field(default_factory=dict)  # by path
+
+
+class _RunCheckpoint:
+    """Checkpointer's state for one agent run."""
+
+    def __init__(self, checkpointer: "Checkpointer", checkpoint: _Checkpoint, ctx: RunContext, path: str) -> None:
+        self._checkpointer = checkpointer
+        self._checkpoint = checkpoint
+        self._ctx = ctx
+        self.path = path
+        self._iteration = 0
+        self._live = False  # set once the run has gone past (or away from) what was recorded
+        self._replayed: dict[str, Any] = {}  # tool call id -> recorded output
+        self._tool_starts: dict[str, RunContextStartEvent] = {}  # tool run id -> its start event
+        self._state: RequirementAgentRunState | None = None
+
+    def _save(self, key: str, value: Any) -> None:
+        try:
+            self._checkpointer.store.save(self._checkpoint.id, key, value)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logger.warning(f"Can't checkpoint {key}, it will run again on resume: {e}")
+
+    def _recorded(self, key: str) -> Any | None:
+        blob = self._checkpoint.rows.get(key)
+        return pickle.loads(blob) if blob is not None and not self._live else None
+
+    async def on_agent_start(self, data: Any, meta: EventMeta) -> None:
+        if isinstance(data, RequirementAgentStartEvent):
+            self._state = data.state
+            self._iteration = data.state.iteration
+
+    async def on_llm_event(self, data: Any, meta: EventMeta) -> None:
+        key = f"llm:{self.path}:{self._iteration}"
+        if isinstance(data, RunContextFinishEvent):
+            if self._live and _succeeded(data):
+                self._save(key, (_digest(data.input), data.output))
+            return
+
+        recorded = self._recorded(key)
+        if recorded is None or not isinstance(data, RunContextStartEvent):
+            self._live = True
+            return
+        digest, output = recorded
+        if digest != _digest(data.input):
+            logger.info(f"Checkpoint '{self._checkpoint.id}' diverges at {self.path}, step {self._iteration}")
+            self._live = True
+            return
+
+        data.output = output
+        self._checkpointer.replayed["llm"] += 1
+        for call in output.get_tool_calls():
+            tool_output = self._recorded(f"tool:{self.path}:{call.id}")
+            if tool_output is not None:
+                self._replayed[call.id] = tool_output
+                _replayed_calls.add((self._ctx.run_id, call.id))
+
+    async def on_tool_event(self, data: Any, meta: EventMeta) -> None:
+        assert meta.trace is not None
+        call = meta.context.get("tool_call_msg")
+        if not isinstance(call, MessageToolCallContent):
+            return
+
+        if isinstance(data, RunContextStartEvent):
+            # The call stays marked as replayed until it finishes, as the order in which the start
+            # event's listeners run is undefined
+            if call.id in self._replayed:
+                data.output = self._replayed.pop(call.id)
+                self._checkpointer.replayed["tool"] += 1
+            self._tool_starts[meta.trace.run_id] = data
+        elif isinstance(data, RunContextFinishEvent):
+            _replayed_calls.discard((self._ctx.run_id, call.id))
+            start = self._tool_starts.pop(meta.trace.run_id, None)
+            # Calls answered without running the tool (replayed, denied, ...) got their output at the start
+            if start is not None and start.output is None and _succeeded(data):
+                self._save(f"tool:{self.path}:{call.id}", data.output)
+
+    async def on_agent_success(self, data: Any, meta: EventMeta) -> None:
+        if isinstance(data, RequirementAgentSuccessEvent):
+            self._state = data.state
+            self.save_state()
+
+    def save_state(self) -> None:
+        """Save the run's state; done after every step, and when one of its expert runs starts or finishes."""
+        state = self._state
+        if state is None:
+            return
+        invocations = Counter(step.tool.name for step in state.steps if step.tool is not None and step.error is None)
+        failures = Counter(step.tool.name for step in state.steps if step.tool is not None and step.error is not None)
+        step = StepCheckpoint(
+            path=self.path,
+            iteration=state.iteration,
+            messages=[message.to_plain() for message in state.memory.messages],
+            invocations=dict(invocations),
+            failures=dict(failures),
+            handoffs=sorted(self._checkpoint.running.get(self.path, ())),
+            answered=state.answer is not None,
+            saved_at=time.time(),
+        )
+        self._save(f"state:{self.path}", step)
+
+    def is_own_run(self, kind: type) -> Callable[[EventMeta], bool]:
+        """Matches the start and finish events of the runs of `kind` (model or tool) this agent makes."""
+
+        def matcher(event: EventMeta) -> bool:
+            return (
+                event.name in ("start", "finish")
+                and isinstance(event.creator, RunContext)
+                and isinstance(event.creator.instance, kind)
+                and event.trace is not None
+                and event.trace.parent_run_id == self._ctx.run_id
+            )
+
+        return matcher
+
+
+class Checkpointer(RunMiddlewareProtocol):
+    """Middleware that checkpoints agent runs while a checkpoint id is set, and resumes them from it.
+
+    Like TraceRecorder, one instance should be shared by an agent and its handoff experts.
+    """
+
+    def __init__(self, store: CheckpointStore | None = None) -> None:
+        super().__init__()
+        self._store = store
+        self._checkpoints: dict[str, _Checkpoint] = {}
+        self.replayed: Counter[str] = Counter()  # calls answered from checkpoints, "llm" and "tool"
+
+    @property
+    def store(self) -> CheckpointStore:
+        if self._store is None:
+            self._store = CheckpointStore()  # opened on first use, so unused checkpointers cost nothing
+        return self._store
+
+    @staticmethod
+    def _save_parent(checkpoint: _Checkpoint, parent_path: str) -> None:
+        parent = checkpoint.runs.get(parent_path)
+        if parent is not None:
+            parent.save_state()
+
+    def bind(self, ctx: RunContext) -> None:
+        checkpoint_id = current_checkpoint()
+        if checkpoint_id is None:
+            return
+
+        parent_path = ctx.context.get(_PATH_KEY)
+        if parent_path is None:
+            # The outermost checkpointed run picks up what an earlier process left
+            checkpoint = self._checkpoints[checkpoint_id] = _Checkpoint(checkpoint_id, self.store.load(checkpoint_id))
+            path = ctx.instance.meta.name
+            if checkpoint.rows:
+                logger.info(f"Resuming checkpoint '{checkpoint_id}' ({len(checkpoint.rows)} records)")
+        else:
+            checkpoint = self._checkpoints.get(checkpoint_id)
+            if checkpoint is None:
+                return
+            # An expert run is placed under the tool call (and the handoff tool) that started it
+            call = ctx.context.get("tool_call_msg")
+            try:
+                caller = RunContext.get().instance
+            except RuntimeError:
+                caller = ctx.instance
+            name = caller.name if isinstance(caller, Tool) else caller.meta.name
+            path = f"{parent_path}/{call.id if isinstance(call, MessageToolCallContent) else '-'}/{name}"
+
+        checkpoint.paths[path] += 1
+        if checkpoint.paths[path] > 1:
+            path = f"{path}#{checkpoint.paths[path]}"
+        ctx.context[_PATH_KEY] = path
+        run = checkpoint.runs[path] = _RunCheckpoint(self, checkpoint, ctx, path)
+        if parent_path is not None:
+            checkpoint.running.setdefault(parent_path, set()).add(path)
+            self._save_parent(checkpoint, parent_path)
+        ctx.emitter.on("start", run.on_agent_start)
+        ctx.emitter.on("success", run.on_agent_success)
+        ctx.emitter.match(run.is_own_run(ChatModel), run.on_llm_event, EmitterOptions(match_nested=True))
+        ctx.emitter.match(run.is_own_run(Tool), run.on_tool_event, EmitterOptions(match_nested=True))
+
+        async def on_finish(data: Any, meta: EventMeta) -> None:
+            _replayed_calls.difference_update([key for key in _replayed_calls if key[0] == ctx.run_id])
+            checkpoint.runs.pop(path, None)
+            interrupted = isinstance(data, RunContextFinishEvent) and data.error is None and data.output is None
+            if parent_path is not None:
+                if not interrupted:  # an interrupted expert is still pending in the checkpoint
+                    checkpoint.running.get(parent_path, set()).discard(path)
+                    self._save_parent(checkpoint, parent_path)
+            else:
+                self._checkpoints.pop(checkpoint_id, None)
+                if isinstance(data, RunContextFinishEvent) and _succeeded(data):
+                    self.store.delete(checkpoint_id)
+
+        ctx.emitter.match(
+            lambda event: event.name == "finish" and event.creator is ctx,
+            on_finish,
+            EmitterOptions(match_nested=True),
+        )
+
+
+# Shared by the t12 agents and agent_server; it does nothing until a checkpoint id is set
+shared_checkpointer = Checkpointer()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Inspect the checkpoints of agent runs that didn't finish.")
+    parser.add_argument("--path", type=Path, default=DEFAULT_CHECKPOINT_PATH, help="Checkpoint store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="List the checkpoints.")
+    show_parser = commands.add_parser("show", help="Show the last step of every run in a checkpoint.")
+    show_parser.add_argument("checkpoint_id")
+    delete_parser = commands.add_parser("delete", help="Delete a checkpoint, so its next run starts over.")
+    delete_parser.add_argument("checkpoint_id")
+    args = parser.parse_args()
+
+    store = CheckpointStore(args.path)
+    if args.command == "list":
+        for checkpoint_id, count, saved_at in store.list():
+            print(f"{checkpoint_id:<40} {count:>5} records, last saved {time.ctime(saved_at)}")
+    elif args.command == "show":
+        for step in store.steps(args.checkpoint_id):
+            used = ", ".join(f"{tool} x{count}" for tool, count in step.invocations.items()) or "no tools"
+            status = "answered" if step.answered else f"{len(step.messages)} messages"
+            print(f"{step.path}: step {step.iteration}, {status}, {used}")
+            for handoff in step.handoffs:
+                print(f"  running: {handoff}")
+    else:
+        print(f"Deleted {store.delete(args.checkpoint_id)} records")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""ConditionalRequirement rule sets compiled into a state machine when the agent is built.
+
+    tools = [ThinkTool(), wikipedia_tool()]
+    agent = RequirementAgent(llm=llm, tools=tools, requirements=compile_requirements(tools, [
+        ConditionalRequirement(ThinkTool, force_at_step=1, consecutive_allowed=False),
+        ConditionalRequirement(WikipediaTool, only_after=[ThinkTool], min_invocations=1),
+    ]))
+
+At every step RequirementAgent asks each ConditionalRequirement for its rule, and each one
+matches its targets against the tools again, rescans the steps and runs in a RunContext of its
+own. Compiling resolves the targets once into tool indices and bitmasks. A run's state is
+the step number, the last tool, the invocation counts and the set of tools seen so far,
+derived in one pass over the steps. Each rule's allowed and forced flags are then a few
+integer operations. One compiled requirement replaces all ConditionalRequirements of the same
+priority and returns the same rules they would.
+
+Rule sets that can never be satisfied raise RequirementConflictError when they are compiled,
+before any LLM call is made. Examples are a tool forced after one that is limited to zero
+invocations, or two tools that each have to run after the other. A tool forced after several,
+only some of which can never run, is logged as a warning.
+"""
+
+from collections import defaultdict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+from typing import Any, Self
+
+from beeai_framework.agents.experimental.requirements._utils import _target_seen_in
+from beeai_framework.agents.experimental.requirements.conditional import ConditionalRequirement
+from beeai_framework.agents.experimental.requirements.requirement import (
+    Requirement,
+    RequirementError,
+    Rule,
+    run_with_context,
+)
+from beeai_framework.agents.experimental.types import RequirementAgentRunState
+from beeai_framework.context import RunContext
+from beeai_framework.logger import Logger
+from beeai_framework.tools import AnyTool
+
+logger = Logger(__name__)
+
+
+class RequirementConflictError(ValueError):
+    """The compiled rules contradict each other or can't be satisfied."""
+
+    def __init__(self, problems: list[str]) -> None:
+        self.problems = problems
+        super().__init__("Contradictory requirements:\n" + "\n".join(f"- {problem}" for problem in problems))
+
+
+@dataclass(frozen=True)
+class CompiledRule:
+    """A ConditionalRequirement with its targets resolved to bitmasks of tool indices.
+
+    A target can match several tools (e.g. a tool class); `after` has one mask per target,
+    each of which needs one of its tools to have been used. (ConditionalRequirement lets a
+    step count for only one of several targets it matches, whichever its set yields first.)
+    """
+
+    name: str
+    tool: int
+    after: tuple[int, ...]
+    before: int
+    force_after: int
+    min_invocations: int
+    max_invocations: float
+    force_at_step: int | None
+    only_success_invocations: bool
+    consecutive_allowed: bool
+    force_prevent_stop: bool
+    priority: int
+    custom_checks: tuple[Callable[[Any], bool], ...] = ()
+
+
+@dataclass(frozen=True)
+class _RunState:
+    step: int  # the step being decided, starting at 1
+    last: int  # index of the previous step's tool, -1 for none
+    counts: tuple[int, ...]
+    seen: int
+
+
+def _mask(indices: Sequence[int]) -> int:
+    mask = 0
+    for index in indices:
+        mask |= 1 << index
+    return mask
+
+
+def _union(masks: Sequence[int]) -> int:
+    union = 0
+    for mask in masks:
+        union |= mask
+    return union
+
+
+def _names(mask: int, tool_names: Sequence[str]) -> str:
+    return ", ".join(name for index, name in enumerate(tool_names) if mask >> index & 1)
+
+
+def _resolve(
+    requirement: ConditionalRequirement[Any], tools: Sequence[AnyTool], problems: list[str]
+) -> CompiledRule | None:
+    def masks(targets: set[Any]) -> list[int]:
+        found = []
+        for target in targets:
+            mask = _mask([index for index, tool in enumerate(tools) if _target_seen_in(tool, target)])
+            if not mask:
+                problems.append(f"{requirement.name} references '{target}', which is not one of the agent's tools.")
+            else:
+                found.append(mask)
+        return found
+
+    # ConditionalRequirement keeps its options private; they are read once, here
+    source = masks({requirement.source})
+    after = masks(requirement._after)
+    before = masks(requirement._before)
+    force_after = masks(requirement._force_after)
+    if not source:
+        return None
+    if source[0].bit_count() > 1:
+        problems.append(f"{requirement.name} matches more than one tool: {_names(source[0], [t.name for t in tools])}.")
+        return None
+    if requirement._consecutive_allowed and _union(force_after) & source[0]:
+        problems.append(f"{requirement.name} forces its tool after itself; set 'consecutive_allowed' to False.")
+    return CompiledRule(
+        name=requirement.name,
+        tool=source[0].bit_length() - 1,
+        after=tuple(after),
+        before=_union(before),
+        force_after=_union(force_after),
+        min_invocations=requirement._min_invocations,
+        max_invocations=requirement._max_invocations,
+        force_at_step=requirement._force_at_step,
+        only_success_invocations=requirement._only_success_invocations,
+        consecutive_allowed=requirement._consecutive_allowed,
+        force_prevent_stop=requirement._force_prevent_stop,
+        priority=requirement.priority,
+        custom_checks=tuple(requirement._custom_checks),
+    )
+
+
+def _validate(rules: Sequence[CompiledRule], tool_names: Sequence[str]) -> list[str]:
+    problems: list[str] = []
+    by_tool: defaultdict[int, list[CompiledRule]] = defaultdict(list)
+    for rule in rules:
+        by_tool[rule.tool].append(rule)
+
+    lowest_max = {tool: min(rule.max_invocations for rule in tool_rules) for tool, tool_rules in by_tool.items()}
+    highest_min = {tool: max(rule.min_invocations for rule in tool_rules) for tool, tool_rules in by_tool.items()}
+    for tool, minimum in highest_min.items():
+        if 0 < lowest_max[tool] < minimum:  # with a maximum of 0 it's reported as a tool that can't run below
+            problems.append(
+                f"'{tool_names[tool]}' needs at least {minimum} invocations but at most {lowest_max[tool]} are allowed."
+            )
+
+    # Tools that have to be used before each tool can run, following only_after transitively
+    predecessors: dict[int, int] = {}
+    for tool, tool_rules in by_tool.items():
+        predecessors[tool] = 0
+        for rule in tool_rules:
+            for mask in rule.after:
+                if mask.bit_count() == 1:  # a target matching several tools needs just one of them
+                    predecessors[tool] |= mask
+    changed = True
+    while changed:
+        changed = False
+        for tool, mask in predecessors.items():
+            expanded = mask
+            for other, other_mask in predecessors.items():
+                if mask >> other & 1:
+                    expanded |= other_mask
+            if expanded != mask:
+                predecessors[tool], changed = expanded, True
+
+    # Tools that can run at some point: allowed at least once, with all predecessors able to run first
+    reasons: dict[int, str] = {}
+    for tool, tool_rules in by_tool.items():
+        if lowest_max[tool] == 0:
+            reasons[tool] = "it is limited to zero invocations"
+        elif predecessors[tool] >> tool & 1:
+            reasons[tool] = "its 'only_after' rules form a cycle"
+        else:
+            for rule in tool_rules:
+                if rule.after and rule.before & predecessors[tool]:
+                    reasons[tool] = (
+                        f"it has to run after {_names(predecessors[tool], tool_names)}"
+                        f" but before {_names(rule.before & predecessors[tool], tool_names)}"
+                    )
+                    break
+    changed = True
+    while changed:
+        changed = False
+        for tool, tool_rules in by_tool.items():
+            if tool in reasons:
+                continue
+            blocked = _union([1 << other for other in reasons])
+            for rule in tool_rules:
+                mask = next((mask for mask in rule.after if mask & ~blocked == 0), None)
+                if mask is not None:
+                    reasons[tool] = f"it has to run after {_names(mask, tool_names)}, which can never run"
+                    changed = True
+                    break
+
+    blocked = _union([1 << tool for tool in reasons])
+    forced_at: defaultdict[tuple[int, int], set[int]] = defaultdict(set)
+    for rule in rules:
+        name = tool_names[rule.tool]
+        if rule.tool in reasons:
+            if rule.min_invocations:
+                problems.append(f"'{name}' needs {rule.min_invocations} invocation(s), but {reasons[rule.tool]}.")
+            if rule.force_at_step is not None:
+                problems.append(f"'{name}' is forced at step {rule.force_at_step}, but {reasons[rule.tool]}.")
+            if rule.force_after:
+                problems.append(
+                    f"'{name}' is forced after {_names(rule.force_after, tool_names)}, but {reasons[rule.tool]}."
+                )
+            continue
+        if rule.force_after & blocked:
+            never = _names(rule.force_after & blocked, tool_names)
+            if rule.force_after & ~blocked == 0:
+                problems.append(f"'{name}' is forced after {never}, which can never run.")
+            else:  # still forced after the other targets
+                logger.warning(f"'{name}' is forced after {never}, which can never run.")
+        if rule.force_at_step is not None:
+            earliest = predecessors[rule.tool].bit_count() + 1
+            if rule.force_at_step < earliest:
+                problems.append(
+                    f"'{name}' is forced at step {rule.force_at_step}, but it has to run after"
+                    f" {_names(predecessors[rule.tool], tool_names)}, so step {earliest} is the earliest possible."
+                )
+            forced_at[(rule.force_at_step, rule.priority)].add(rule.tool)
+            if not rule.consecutive_allowed and any(
+                other.force_at_step == rule.force_at_step + 1 for other in by_tool[rule.tool]
+            ):
+                problems.append(
+                    f"'{name}' is forced at steps {rule.force_at_step} and {rule.force_at_step + 1}"
+                    " but may not run twice in a row."
+                )
+
+    for (step, _), tools in sorted(forced_at.items()):
+        if len(tools) > 1:
+            problems.append(f"{_names(_mask(sorted(tools)), tool_names)} are all forced at step {step}.")
+    return problems
+
+
+class CompiledRequirements(Requirement[RequirementAgentRunState]):
+    """Evaluates precompiled ConditionalRequirement rules; see `compile_requirements`."""
+
+    def __init__(self, rules: Sequence[CompiledRule], tool_names: Sequence[str], *, priority: int = 10) -> None:
+        super().__init__()
+        self.name = "CompiledRequirements"
+        self.priority = priority
+        self._rules = tuple(rules)
+        self._tool_names = tuple(tool_names)
+        self._index = {name: index for index, name in enumerate(tool_names)}
+        self._needs_all_steps = any(not rule.only_success_invocations for rule in rules)
+
+    @property
+    def rules(self) -> tuple[CompiledRule, ...]:
+        return self._rules
+
+    @property
+    def tool_names(self) -> tuple[str, ...]:
+        """Names of the tools the rules' indices refer to."""
+        return self._tool_names
+
+    async def init(self, *, tools: list[AnyTool], ctx: RunContext) -> None:
+        await super().init(tools=tools, ctx=ctx)
+        names = {tool.name for tool in tools}
+        missing = [name for name in self._tool_names if name not in names]
+        if missing:
+            raise ValueError(f"The requirements were compiled for tools the agent doesn't have: {', '.join(missing)}")
+
+    def _run_state(self, steps: Sequence[Any]) -> _RunState:
+        counts = [0] * len(self._tool_names)
+        seen = 0
+        last = -1
+        for step in steps:
+            index = self._index.get(step.tool.name, -1) if step.tool is not None else -1
+            if index >= 0:
+                counts[index] += 1
+                seen |= 1 << index
+            last = index
+        return _RunState(step=len(steps) + 1, last=last, counts=tuple(counts), seen=seen)
+
+    @run_with_context
+    async def run(self, state: RequirementAgentRunState, context: RunContext) -> list[Rule]:
+        successful = self._run_state([step for step in state.steps if not step.error])
+        everything = self._run_state(state.steps) if self._needs_all_steps else successful
+
+        rules: list[Rule] = []
+        for rule in self._rules:
+            run = successful if rule.only_success_invocations else everything
+            invocations = run.counts[rule.tool]
+            allowed = (
+                (rule.consecutive_allowed or run.last != rule.tool)
+                and invocations < rule.max_invocations
+                and (not rule.after or (not run.seen & rule.before and all(run.seen & mask for mask in rule.after)))
+                and all(check(state) for check in rule.custom_checks)
+            )
+            if not allowed and rule.force_at_step == run.step:
+                raise RequirementError(
+                    f"Tool '{self._tool_names[rule.tool]}' cannot be executed at step {rule.force_at_step} "
+                    f"because it has not met all requirements.",
+                    requirement=self,
+                )
+
+            forced = allowed and (
+                (run.last >= 0 and bool(rule.force_after >> run.last & 1)) or rule.force_at_step == run.step
+            )
+            rules.append(
+                Rule(
+                    target=self._tool_names[rule.tool],
+                    allowed=allowed,
+                    forced=forced,
+                    hidden=False,
+                    prevent_stop=rule.min_invocations > invocations or (forced and rule.force_prevent_stop),
+                )
+            )
+        return rules
+
+    async def clone(self) -> Self:
+        instance: Self = await super().clone()
+        instance._rules = self._rules
+        instance._tool_names = self._tool_names
+        instance._index = self._index
+        instance._needs_all_steps = self._needs_all_steps
+        instance.middlewares = self.middlewares.copy()
+        return instance
+
+
+def compile_requirements(
+    tools: Sequence[AnyTool], requirements: Sequence[Requirement[Any]]
+) -> list[Requirement[Any]]:
+    """Replace the enabled ConditionalRequirements with compiled ones (one per priority).
+
+    Other requirements are returned as they are. Raises RequirementConflictError when the
+    rules reference unknown tools or can never be satisfied.
+    """
+    problems: list[str] = []
+    compiled: list[CompiledRule] = []
+    others: list[Requirement[Any]] = []
+    for requirement in requirements:
+        if type(requirement) is ConditionalRequirement and requirement.enabled:
+            rule = _resolve(requirement, tools, problems)
+            if rule is not None:
+                compiled.append(rule)
+        else:
+            others.append(requirement)
+
+    tool_names = [tool.name for tool in tools]
+    problems.extend(_validate(compiled, tool_names))
+    if problems:
+        raise RequirementConflictError(problems)
+
+    by_priority: defaultdict[int, list[CompiledRule]] = defaultdict(list)
+    for rule in compiled:
+        by_priority[rule.priority].append(rule)
+    return [
+        *(CompiledRequirements(rules, tool_names, priority=priority) for priority, rules in by_priority.items()),
+        *others,
+    ]
+
+
+def named_rules(tools: Sequence[AnyTool], requirements: Sequence[Requirement[Any]]) -> list[tuple[str, CompiledRule]]:
+    """The rules of the enabled ConditionalRequirements, compiled or not, with the name of the tool each one governs.
+
+    Other requirements, and ConditionalRequirements that don't resolve against `tools`, are skipped.
+    """
+    rules: list[tuple[str, CompiledRule]] = []
+    for requirement in requirements:
+        if not requirement.enabled:
+            continue
+        if isinstance(requirement, CompiledRequirements):
+            rules.extend((requirement.tool_names[rule.tool], rule) for rule in requirement.rules)
+        elif type(requirement) is ConditionalRequirement:
+            rule = _resolve(requirement, tools, [])
+            if rule is not None:
+                rules.append((tools[rule.tool].name, rule))
+    return rules
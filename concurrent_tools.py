@@ -0,0 +1,247 @@
+"""Concurrent execution of the tool calls a model makes in one agent step.
+
+    llm = chat_model("watsonx:...", ChatModelParameters(temperature=0), allow_parallel_tool_calls=True)
+    agent = RequirementAgent(llm=llm, ..., middlewares=[trace_recorder, ConcurrentToolCalls(max_concurrency=4)])
+
+Models only make several tool calls in one turn when the request allows parallel calls, which
+ChatModel doesn't by default, hence `allow_parallel_tool_calls=True`. RequirementAgent starts all
+calls of a step at once and adds their results to memory in the order the model made them.
+ConcurrentToolCalls limits how many tool calls run at the same time, across all runs it is bound
+to: concurrent jobs of an agent (see agent_server.py) and agents sharing the instance get one
+limit between them. Agents nested in one of the calls (e.g. a handoff expert sharing the instance)
+run their calls under that call's slot instead of waiting for another one, which might never come.
+
+ConcurrentToolCalls also applies the requirements' `max_invocations` and `consecutive_allowed`
+within the step: the calls are checked in the order the model made them, as if each one ran after
+the previous one. A call that would break a limit isn't run; its result tells the model why, and
+it is recorded as a failed step, so it doesn't count as an invocation. The other conditions
+(only_after, custom checks, ...) are evaluated once per step by the agent, as before.
+
+When the step ends, the time each call waited for a slot and ran is emitted as a "tool_batch"
+event, which TraceRecorder adds to the trace, so the summed tool time can be compared with the
+step's wall time.
+"""
+
+import asyncio
+import time
+import weakref
+from collections.abc import Callable, Sequence
+from typing import Any
+
+from pydantic import BaseModel
+
+from beeai_framework.agents.experimental.events import RequirementAgentStartEvent, RequirementAgentSuccessEvent
+from beeai_framework.agents.experimental.types import RequirementAgentRunState, RequirementAgentRunStateStep
+from beeai_framework.backend import AssistantMessage, MessageToolCallContent
+from beeai_framework.context import RunContext, RunContextFinishEvent, RunContextStartEvent, RunMiddlewareProtocol
+from beeai_framework.emitter import EmitterOptions, EventMeta
+from beeai_framework.tools import StringToolOutput, Tool, ToolError
+from compiled_requirements import CompiledRule, named_rules
+
+# Set in the context of a tool run holding a slot: ids of the ConcurrentToolCalls it holds one of.
+# Nested runs inherit it
+_HOLDING_SLOTS_KEY = "concurrent_tool_calls_slots"
+
+
+class ToolCallTiming(BaseModel):
+    index: int  # position among the step's calls, in the order the model made them
+    tool: str
+    waited: float = 0.0  # seconds spent waiting for a free slot
+    duration: float = 0.0
+    error: str | None = None
+
+
+class ToolBatchEvent(BaseModel):
+    iteration: int
+    calls: list[ToolCallTiming]
+    wall_time: float  # from the first call getting a slot to the last one finishing
+
+    @property
+    def tool_time(self) -> float:
+        """How long the calls would have taken one after another."""
+        return sum(call.duration for call in self.calls)
+
+
+def _check_calls(
+    calls: Sequence[MessageToolCallContent],
+    steps: Sequence[RequirementAgentRunStateStep],
+    rules: Sequence[tuple[str, CompiledRule]],
+) -> dict[str, str | None]:
+    """Why each call breaks a rule (None if it doesn't), checking them in order as if each ran after the previous one.
+
+    Calls that pass are assumed to succeed, calls that don't become failed steps.
+    """
+    decisions: dict[str, str | None] = {}
+    made: list[tuple[str, bool]] = []  # the step's earlier calls: tool name, whether it runs
+    for call in calls:
+        reason = None
+        for name, rule in rules:
+            if name != call.tool_name:
+                continue
+            history = [
+                step.tool.name if step.tool is not None else None
+                for step in steps
+                if not (rule.only_success_invocations and step.error)
+            ]
+            history.extend(tool for tool, runs in made if runs or not rule.only_success_invocations)
+            if history.count(name) >= rule.max_invocations:
+                times = "once" if rule.max_invocations == 1 else f"{rule.max_invocations:g} times"
+                reason = f"'{name}' can be used at most {times}, so this call was not run."
+            elif not rule.consecutive_allowed and history and history[-1] == name:
+                reason = f"'{name}' can't be used twice in a row, so this call was not run."
+            if reason is not None:
+                break
+        decisions[call.id] = reason
+        made.append((call.tool_name, reason is None))
+    return decisions
+
+
+class _RunScheduler:
+    """ConcurrentToolCalls' state for one agent run."""
+
+    def __init__(self, ctx: RunContext, slots: Callable[[], asyncio.Semaphore] | None, owner: int) -> None:
+        self._ctx = ctx
+        self._get_slots = slots  # None when the run is nested in a call holding a slot already
+        self._slots: asyncio.Semaphore | None = None
+        self._owner = owner
+        self._rules: list[tuple[str, CompiledRule]] | None = None
+        self._state: RequirementAgentRunState | None = None
+        self._decisions: dict[str, str | None] | None = None
+        self._order: dict[str, int] = {}
+        self._timings: list[ToolCallTiming] = []
+        self._rejected: dict[int, str] = {}  # id() of the output given instead of running -> reason
+        self._running: dict[str, tuple[ToolCallTiming, float]] = {}  # tool run id -> timing, start
+        self._first_start: float | None = None
+        self._last_finish = 0.0
+
+    def _step_calls(self) -> list[MessageToolCallContent]:
+        # The model's response is the last thing in memory until the step's tool results are added
+        assert self._state is not None
+        calls: list[MessageToolCallContent] = []
+        for message in reversed(self._state.memory.messages):
+            if not isinstance(message, AssistantMessage):
+                break
+            calls[:0] = message.get_tool_calls()
+        return calls
+
+    async def on_agent_start(self, data: Any, meta: EventMeta) -> None:
+        if isinstance(data, RequirementAgentStartEvent):
+            self._state = data.state
+            self._decisions, self._order, self._timings, self._rejected = None, {}, [], {}
+            self._first_start, self._last_finish = None, 0.0
+
+    async def on_tool_start(self, data: Any, meta: EventMeta) -> None:
+        assert meta.trace is not None
+        call = meta.context.get("tool_call_msg")
+        if self._state is None or not isinstance(call, MessageToolCallContent):
+            return
+
+        if self._decisions is None:
+            if self._rules is None:
+                # RequirementAgent keeps its requirements private
+                agent = self._ctx.instance
+                self._rules = named_rules(agent.meta.tools, getattr(agent, "_requirements", []))
+            calls = self._step_calls()
+            self._decisions = _check_calls(calls, self._state.steps, self._rules)
+            self._order = {step_call.id: index for index, step_call in enumerate(calls)}
+
+        timing = ToolCallTiming(index=self._order.get(call.id, len(self._order)), tool=call.tool_name)
+        self._timings.append(timing)
+        reason = self._decisions.get(call.id)
+        if reason is not None and isinstance(data, RunContextStartEvent):
+            # Raising here would abort the whole run, so the call is answered without running the tool
+            data.output = StringToolOutput(reason)
+            self._rejected[id(data.output)] = reason
+            timing.error = reason
+            return
+
+        requested = time.perf_counter()
+        if self._get_slots is not None:
+            if self._slots is None:
+                self._slots = self._get_slots()
+            await self._slots.acquire()
+            if isinstance(meta.creator, RunContext):
+                tool_context = meta.creator.context
+                tool_context[_HOLDING_SLOTS_KEY] = {*tool_context.get(_HOLDING_SLOTS_KEY, ()), self._owner}
+        started = time.perf_counter()
+        timing.waited = started - requested
+        self._running[meta.trace.run_id] = (timing, started)
+        if self._first_start is None:
+            self._first_start = started
+
+    async def on_tool_finish(self, data: Any, meta: EventMeta) -> None:
+        assert meta.trace is not None
+        timing, started = self._running.pop(meta.trace.run_id)
+        if self._slots is not None:
+            self._slots.release()
+        self._last_finish = time.perf_counter()
+        timing.duration = self._last_finish - started
+        if isinstance(data, RunContextFinishEvent) and data.error is not None:
+            timing.error = type(data.error).__name__
+
+    async def on_agent_success(self, data: Any, meta: EventMeta) -> None:
+        if not isinstance(data, RequirementAgentSuccessEvent) or not self._timings:
+            return
+        for step in data.state.steps:
+            if step.iteration == data.state.iteration and id(step.output) in self._rejected:
+                step.error = ToolError(self._rejected[id(step.output)])
+
+        wall_time = self._last_finish - self._first_start if self._first_start is not None else 0.0
+        event = ToolBatchEvent(
+            iteration=data.state.iteration,
+            calls=sorted(self._timings, key=lambda timing: timing.index),
+            wall_time=max(wall_time, 0.0),
+        )
+        self._timings, self._rejected = [], {}
+        await self._ctx.emitter.emit("tool_batch", event)
+
+    def is_own_call(self, event: EventMeta) -> bool:
+        """Whether the event starts one of this agent's tool calls (not a nested agent's)."""
+        return (
+            event.name == "start"
+            and isinstance(event.creator, RunContext)
+            and isinstance(event.creator.instance, Tool)
+            and event.trace is not None
+            and event.trace.parent_run_id == self._ctx.run_id
+        )
+
+    def is_running_call(self, event: EventMeta) -> bool:
+        return (
+            event.name == "finish"
+            and isinstance(event.creator, RunContext)
+            and event.trace is not None
+            and event.trace.run_id in self._running
+        )
+
+
+class ConcurrentToolCalls(RunMiddlewareProtocol):
+    """Middleware that runs at most `max_concurrency` tool calls at a time over all the runs it is bound to.
+
+    The calls of a step are also checked against the requirements.
+    """
+
+    def __init__(self, max_concurrency: int = 4) -> None:
+        super().__init__()
+        if max_concurrency < 1:
+            raise ValueError("'max_concurrency' must be at least 1")
+        self.max_concurrency = max_concurrency
+        self._slots: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # One per event loop, as a semaphore can't be shared between loops; looked up once a call
+        # starts, since bind() may run outside the loop
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        return slots
+
+    def bind(self, ctx: RunContext) -> None:
+        nested = id(self) in ctx.context.get(_HOLDING_SLOTS_KEY, ())
+        scheduler = _RunScheduler(ctx, None if nested else self._semaphore, id(self))
+        ctx.emitter.on("start", scheduler.on_agent_start)
+        ctx.emitter.on("success", scheduler.on_agent_success)
+        ctx.emitter.match(scheduler.is_own_call, scheduler.on_tool_start, EmitterOptions(match_nested=True))
+        ctx.emitter.match(scheduler.is_running_call, scheduler.on_tool_finish, EmitterOptions(match_nested=True))
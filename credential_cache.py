@@ -0,0 +1,227 @@
+"""Provider access tokens cached in a locked local file, shared by concurrently running processes.
+
+Every new process would otherwise exchange the watsonx API key for an IAM access token
+before its first call. With the cache, the first process fetches the token and stores it
+with its expiry; later (and concurrent) processes reuse it until shortly before it expires.
+
+    use_cached_watsonx_token()   # sets WATSONX_TOKEN and keeps it refreshed in the background
+
+Child processes inherit the token and take over refreshing it; a WATSONX_TOKEN set by the
+user is left alone.
+
+The file holds tokens only, keyed by a hash of the API key, and is readable by its owner only.
+"""
+
+import contextlib
+import fcntl
+import functools
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+import httpx
+
+# The standard library logger keeps this module importable before beeai_framework (e.g. from t1.py)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CREDENTIALS_PATH = Path(".cache") / "credentials.json"
+
+# Tokens are refreshed this many seconds before they expire
+REFRESH_MARGIN = 5 * 60
+
+# Set next to WATSONX_TOKEN by WatsonxTokenProvider, so child processes that inherit the token
+# can tell it from one the user set and keep refreshing it
+_TOKEN_SOURCE_ENV = "WATSONX_TOKEN_SOURCE"
+
+
+@dataclass
+class AccessToken:
+    token: str
+    expires_at: float  # UNIX timestamp
+
+    def is_fresh(self, margin: float = REFRESH_MARGIN) -> bool:
+        return time.time() < self.expires_at - margin
+
+
+class CredentialCache:
+    """Access tokens with their expiry in a JSON file guarded by an advisory file lock."""
+
+    def __init__(self, path: str | Path = DEFAULT_CREDENTIALS_PATH, *, refresh_margin: float = REFRESH_MARGIN) -> None:
+        self._path = Path(path)
+        self._lock_path = self._path.with_name(f"{self._path.name}.lock")
+        self.refresh_margin = refresh_margin
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    @contextlib.contextmanager
+    def _locked(self, *, exclusive: bool) -> Iterator[None]:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+        finally:
+            os.close(fd)  # also releases the lock
+
+    def _read(self) -> dict[str, AccessToken]:
+        try:
+            entries = json.loads(self._path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+        return {key: AccessToken(**value) for key, value in entries.items()}
+
+    def _write(self, entries: dict[str, AccessToken]) -> None:
+        now = time.time()
+        data = {key: vars(token) for key, token in entries.items() if token.expires_at > now}
+        tmp_path = self._path.with_name(f"{self._path.name}.{os.getpid()}.tmp")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._path)
+
+    def peek(self, key: str) -> AccessToken | None:
+        """The cached token for `key` if it isn't due for a refresh yet."""
+        with self._locked(exclusive=False):
+            token = self._read().get(key)
+        return token if token is not None and token.is_fresh(self.refresh_margin) else None
+
+    def get(self, key: str, fetch: Callable[[], AccessToken], *, force: bool = False) -> AccessToken:
+        """The cached token for `key`, fetching (and storing) a new one when it's due for a refresh.
+
+        Concurrent callers, in this or other processes, wait for a single fetch and share its result.
+        """
+        if not force and (token := self.peek(key)) is not None:
+            return token
+
+        with self._locked(exclusive=True):
+            entries = self._read()
+            token = entries.get(key)
+            if force or token is None or not token.is_fresh(self.refresh_margin):
+                token = fetch()
+                entries[key] = token
+                self._write(entries)
+        return token
+
+
+def watsonx_iam_url() -> str:
+    return os.environ.get("WATSONX_IAM_URL", "https://iam.cloud.ibm.com/identity/token")
+
+
+def watsonx_api_key() -> str | None:
+    for name in ("WX_API_KEY", "WATSONX_API_KEY", "WATSONX_APIKEY"):
+        if os.environ.get(name):
+            return os.environ[name]
+    return None
+
+
+def fetch_watsonx_token(api_key: str) -> AccessToken:
+    response = httpx.post(
+        watsonx_iam_url(),
+        data={"grant_type": "urn:ibm:params:oauth:grant-type:apikey", "apikey": api_key},
+        headers={"Accept": "application/json"},
+        timeout=30,
+    )
+    response.raise_for_status()
+    data = response.json()
+    expires_at = data.get("expiration") or time.time() + data["expires_in"]
+    return AccessToken(token=data["access_token"], expires_at=float(expires_at))
+
+
+def _token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()[:16]
+
+
+def _user_set_watsonx_token() -> bool:
+    """Whether WATSONX_TOKEN is set, other than by a WatsonxTokenProvider (of this or a parent process)."""
+    token = os.environ.get("WATSONX_TOKEN")
+    return bool(token) and os.environ.get(_TOKEN_SOURCE_ENV) != _token_digest(token)
+
+
+class WatsonxTokenProvider:
+    """Keeps `WATSONX_TOKEN` set to a cached IAM token and refreshes it before it expires.
+
+    LiteLLM sends `WATSONX_TOKEN` as the bearer token when it is set, so no model call
+    has to wait for the API key exchange.
+    """
+
+    def __init__(self, api_key: str, cache: CredentialCache | None = None) -> None:
+        self._api_key = api_key
+        self._cache = cache if cache is not None else CredentialCache()
+        self._key = "watsonx:" + hashlib.sha256(f"{watsonx_iam_url()}|{api_key}".encode()).hexdigest()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.token: AccessToken | None = None
+
+    def _install(self, token: AccessToken) -> AccessToken:
+        self.token = token
+        os.environ["WATSONX_TOKEN"] = token.token
+        os.environ[_TOKEN_SOURCE_ENV] = _token_digest(token.token)
+        return token
+
+    def load(self) -> bool:
+        """Use a still-fresh token from the cache file, without any network call."""
+        token = self._cache.peek(self._key)
+        if token is not None:
+            self._install(token)
+        return token is not None
+
+    def refresh(self, *, force: bool = False) -> AccessToken:
+        return self._install(self._cache.get(self._key, lambda: fetch_watsonx_token(self._api_key), force=force))
+
+    def start(self) -> None:
+        """Refresh the token in a daemon thread, shortly before each expiry."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run() -> None:
+            while not self._stop.is_set():
+                try:
+                    token = self.refresh()
+                    delay = token.expires_at - self._cache.refresh_margin - time.time()
+                except Exception as e:
+                    logger.warning(f"Refreshing the watsonx access token failed: {e}")
+                    delay = 30.0
+                self._stop.wait(max(delay, 1.0))
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="watsonx-token-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+
+@functools.cache
+def validate_watsonx_config() -> tuple[str, ...]:
+    """Problems with the watsonx settings in the environment (checked once per process)."""
+    problems: list[str] = []
+    if not os.environ.get("WATSONX_PROJECT_ID") and not os.environ.get("WATSONX_SPACE_ID"):
+        problems.append("Set WATSONX_PROJECT_ID (or WATSONX_SPACE_ID).")
+    if not (watsonx_api_key() or os.environ.get("WATSONX_TOKEN") or os.environ.get("WATSONX_ZENAPIKEY")):
+        problems.append("Set WATSONX_API_KEY (or WATSONX_TOKEN / WATSONX_ZENAPIKEY).")
+    url = os.environ.get("WATSONX_URL")
+    if url and not url.startswith(("https://", "http://")):
+        problems.append(f"WATSONX_URL must be an http(s) URL, got {url!r}.")
+    return tuple(problems)
+
+
+@functools.cache
+def use_cached_watsonx_token(*, refresh_in_background: bool = True) -> WatsonxTokenProvider | None:
+    """Set up the cached watsonx token for this process (once); None when no API key is configured."""
+    api_key = watsonx_api_key()
+    if api_key is None or _user_set_watsonx_token() or os.environ.get("WATSONX_ZENAPIKEY"):
+        return None  # nothing to exchange, or the credentials are managed elsewhere
+
+    provider = WatsonxTokenProvider(api_key)
+    provider.load()
+    if refresh_in_background:
+        provider.start()
+    return provider
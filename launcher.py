@@ -0,0 +1,239 @@
+"""One entry point for the t2-t12 examples, with an optional warm daemon.
+
+    python launcher.py run t6                   # run one example
+    python launcher.py run t6 --import-times    # ... and show which packages start-up time went to
+    python launcher.py daemon &                 # import everything once, then serve jobs over a socket
+    python launcher.py run t6 t7 --daemon       # run in the daemon (locally if none is running)
+    python launcher.py stop
+
+Nothing but the standard library is imported until an example is chosen, so the client
+side of `--daemon` starts in milliseconds. The daemon keeps the imported modules and the
+shared model clients (connections, access tokens) of model_registry warm between jobs.
+Jobs run concurrently in the daemon's event loop; each job's output and permission prompts
+are routed to the client that submitted it.
+"""
+
+import argparse
+import asyncio
+import contextvars
+import importlib
+import io
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any, TextIO
+
+EXAMPLES = ["t2", "t3", "t4", "t5", "t6", "t7", "t8", "t9", "t10", "t11", "t12"]
+
+# Examples whose entry point isn't main()
+ENTRY_POINTS = {"t2": "basic_chat_example"}
+
+DEFAULT_SOCKET_PATH = Path(os.environ.get("LAUNCHER_SOCKET", Path(".cache") / "launcher.sock"))
+
+_IMPORT_TIME_PATTERN = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)")
+
+
+def load_entry_point(name: str) -> Callable[[], Awaitable[Any]]:
+    if name not in EXAMPLES:
+        raise ValueError(f"Unknown example '{name}', choose from: {', '.join(EXAMPLES)}")
+    module = importlib.import_module(name)
+    return getattr(module, ENTRY_POINTS.get(name, "main"))  # type: ignore[no-any-return]
+
+
+def run_local(name: str) -> int:
+    entry_point = load_entry_point(name)
+    asyncio.run(entry_point())
+    return 0
+
+
+def import_time_report(stderr: str, *, top: int = 12) -> str:
+    """Summarize `python -X importtime` output as self time per top-level package."""
+    per_package: defaultdict[str, int] = defaultdict(int)
+    total = 0
+    for line in stderr.splitlines():
+        match = _IMPORT_TIME_PATTERN.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        per_package[module.split(".")[0]] += int(self_us)
+        if not indent:
+            total += int(cumulative_us)
+
+    lines = [f"{'package':<30} {'self (s)':>9} {'share':>7}"]
+    for package, micros in sorted(per_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        lines.append(f"{package:<30} {micros / 1e6:>9.3f} {micros / max(total, 1):>7.1%}")
+    lines.append(f"{'total':<30} {total / 1e6:>9.3f}")
+    return "\n".join(lines)
+
+
+def run_with_import_times(name: str) -> int:
+    """Run the example in a child interpreter with `-X importtime` and report the breakdown."""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", __file__, "run", name],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    sys.stderr.write("".join(line + "\n" for line in process.stderr.splitlines() if not line.startswith("import time:")))
+    print(f"\n📦 Import time by package ({name}):\n{import_time_report(process.stderr)}")
+    return process.returncode
+
+
+# === Daemon ===
+
+_current_job: contextvars.ContextVar["_Job"] = contextvars.ContextVar("launcher_job")
+
+
+class _Job:
+    """One client connection; output written in its context is sent to that client."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self._reader = reader
+        self._writer = writer
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+    def send(self, **message: Any) -> None:
+        data = (json.dumps(message) + "\n").encode()
+        if threading.get_ident() == self._loop_thread:
+            self._writer.write(data)
+        else:
+            self._loop.call_soon_threadsafe(self._writer.write, data)
+
+    async def read_line(self, prompt: str) -> str:
+        self.send(input=prompt)
+        line = await self._reader.readline()
+        if not line:
+            raise EOFError("The client disconnected")
+        return str(json.loads(line)["line"])
+
+
+class _JobStream(io.TextIOBase):
+    """Stand-in for sys.stdout/sys.stderr that routes writes to the current job's client."""
+
+    def __init__(self, fallback: TextIO, kind: str) -> None:
+        self._fallback = fallback
+        self._kind = kind
+
+    def write(self, text: str) -> int:
+        job = _current_job.get(None)
+        if job is None:
+            return self._fallback.write(text)
+        job.send(**{self._kind: text})
+        return len(text)
+
+    def flush(self) -> None:
+        if _current_job.get(None) is None:
+            self._fallback.flush()
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, server: asyncio.Server) -> None:
+    from approvals import setup_session
+    from beeai_framework.utils.io import setup_io_context
+
+    request = json.loads(await reader.readline() or b"{}")
+    job = _Job(reader, writer)
+    if request.get("stop"):
+        job.send(exit=0)
+        server.close()
+    else:
+        _current_job.set(job)
+        setup_io_context(read=job.read_line)  # permission prompts are answered by the client
+        setup_session()  # and its approvals aren't remembered for the next one
+        code = 0
+        try:
+            await load_entry_point(request["run"])()
+        except Exception:
+            traceback.print_exc(file=sys.stderr)
+            code = 1
+        job.send(exit=code)
+    await writer.drain()
+    writer.close()
+
+
+async def serve(path: Path = DEFAULT_SOCKET_PATH) -> None:
+    start = time.perf_counter()
+    for name in EXAMPLES:
+        load_entry_point(name)
+    import model_registry  # noqa: F401  keeps model clients warm across jobs
+
+    print(f"Imported {len(EXAMPLES)} examples in {time.perf_counter() - start:.2f}s")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.unlink(missing_ok=True)
+    sys.stdout = _JobStream(sys.stdout, "out")
+    sys.stderr = _JobStream(sys.stderr, "err")
+
+    server: asyncio.Server
+    server = await asyncio.start_unix_server(lambda r, w: _handle(r, w, server), path=str(path))
+    os.chmod(path, 0o600)
+    print(f"Serving examples on {path}", file=sys.__stdout__, flush=True)
+    try:
+        async with server:
+            await server.wait_closed()
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def submit(request: dict[str, Any], path: Path = DEFAULT_SOCKET_PATH) -> int:
+    """Send a job to the daemon and relay its output and prompts; raises OSError if none is running."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(str(path))
+        client.sendall((json.dumps(request) + "\n").encode())
+        stream = client.makefile("r", encoding="utf-8")
+        for line in stream:
+            message = json.loads(line)
+            if "out" in message:
+                sys.stdout.write(message["out"])
+                sys.stdout.flush()
+            elif "err" in message:
+                sys.stderr.write(message["err"])
+            elif "input" in message:
+                client.sendall((json.dumps({"line": input(message["input"])}) + "\n").encode())
+            elif "exit" in message:
+                return int(message["exit"])
+    return 1
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the t2-t12 examples.")
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET_PATH, help="Daemon socket path.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run examples.")
+    run_parser.add_argument("examples", nargs="+", choices=EXAMPLES, metavar="example")
+    run_parser.add_argument("--daemon", action="store_true", help="Run in the warm daemon if one is running.")
+    run_parser.add_argument("--import-times", action="store_true", help="Report import time per package.")
+    commands.add_parser("daemon", help="Preload the examples and serve jobs on a local socket.")
+    commands.add_parser("stop", help="Stop the daemon.")
+    args = parser.parse_args()
+
+    if args.command == "daemon":
+        asyncio.run(serve(args.socket))
+    elif args.command == "stop":
+        sys.exit(submit({"stop": True}, args.socket))
+    else:
+        code = 0
+        for name in args.examples:
+            if args.import_times:
+                code = run_with_import_times(name) or code
+                continue
+            if args.daemon:
+                try:
+                    code = submit({"run": name}, args.socket) or code
+                    continue
+                except OSError:
+                    print("No launcher daemon is running, running locally.", file=sys.stderr)
+            code = run_local(name) or code
+        sys.exit(code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Process-wide registry of ChatModel instances sharing one pooled, keep-alive HTTP session.
+
+    llm = chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+    await shared_models.warmup()   # connect and authenticate before the first real request
+
+`chat_model()` takes the same arguments as `ChatModel.from_name()`, but returns the same
+instance for the same name, parameters and settings. All models created by a registry
+send their requests through a single aiohttp session, so TLS connections are reused across
+models and calls (up to `pool_size` at a time) instead of being set up per client. watsonx
+models also reuse the access token cached by `credential_cache`, so a new process doesn't
+exchange the API key again. Requests go through the registry's rate limiter (`shared_limiter`
+by default), which paces them per provider and retries them when the provider throttles.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any
+
+import aiohttp
+
+from beeai_framework.backend import ChatModel, ChatModelParameters, UserMessage
+from beeai_framework.logger import Logger
+from credential_cache import use_cached_watsonx_token
+from rate_limiter import RateLimitedChatModel, RateLimiter, shared_limiter
+
+logger = Logger(__name__)
+
+
+class ModelRegistry:
+    """Shared ChatModel instances keyed by name, parameters and settings."""
+
+    def __init__(
+        self,
+        *,
+        pool_size: int = 100,
+        pool_size_per_host: int = 0,
+        keepalive_timeout: float = 60.0,
+        limiter: RateLimiter | None = shared_limiter,
+    ) -> None:
+        self.pool_size = pool_size
+        self.pool_size_per_host = pool_size_per_host  # 0 means no limit besides `pool_size`
+        self.keepalive_timeout = keepalive_timeout
+        self.limiter = limiter  # None sends requests straight to the provider
+        self._models: dict[str, ChatModel] = {}
+        self._session: aiohttp.ClientSession | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    @property
+    def models(self) -> dict[str, ChatModel]:
+        return self._models
+
+    def _current_session(self) -> aiohttp.ClientSession | None:
+        """The pooled session of the running event loop, or None outside of one."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+        if loop is not self._loop:
+            # Sessions can't be shared between event loops (e.g. consecutive asyncio.run() calls)
+            self.reset()
+            self._loop = loop
+        if self._session is not None and self._session.closed:
+            self._models.clear()  # their clients still point at the closed session
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                limit_per_host=self.pool_size_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    def get(self, name: str, parameters: ChatModelParameters | None = None, /, **kwargs: Any) -> ChatModel:
+        session = self._current_session()
+        key = json.dumps(
+            [name, parameters.model_dump(exclude_none=True) if parameters else None, kwargs],
+            sort_keys=True,
+            default=repr,
+        )
+        model = self._models.get(key)
+        if model is None:
+            if name.startswith("watsonx:"):
+                use_cached_watsonx_token()
+            settings = dict(kwargs.pop("settings", {}))
+            if session is not None:
+                settings.setdefault("shared_session", session)
+            model = ChatModel.from_name(name, parameters, settings=settings, **kwargs)
+            if self.limiter is not None:
+                model = RateLimitedChatModel(model, limiter=self.limiter)
+            self._models[key] = model
+        return model
+
+    async def warmup(self, *, timeout: float = 30.0) -> dict[str, float]:
+        """Open connections and authenticate for every registered model with a one-token request.
+
+        Returns the seconds each model took; failures are logged rather than raised, so a
+        model that can't be warmed up fails (and reports its error) on first use instead.
+        """
+
+        async def warm(model: ChatModel) -> float:
+            start = time.perf_counter()
+            await asyncio.wait_for(
+                model.create(messages=[UserMessage("Hi")], max_tokens=1, stream=False),  # type: ignore[call-arg]
+                timeout,
+            )
+            return time.perf_counter() - start
+
+        models = list(self._models.values())
+        results = await asyncio.gather(*(warm(model) for model in models), return_exceptions=True)
+        timings: dict[str, float] = {}
+        for model, result in zip(models, results, strict=True):
+            name = f"{model.provider_id}:{model.model_id}"
+            if isinstance(result, BaseException):
+                logger.warning(f"Warming up {name} failed: {result}")
+            else:
+                timings[name] = result
+        return timings
+
+    def reset(self) -> None:
+        """Forget all models; the session is replaced on the next `get()`."""
+        self._models.clear()
+        self._session = None
+        self._loop = None
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+        self.reset()
+
+
+shared_models = ModelRegistry()
+
+
+def chat_model(name: str, parameters: ChatModelParameters | None = None, /, **kwargs: Any) -> ChatModel:
+    """Shared, pooled drop-in for `ChatModel.from_name()`."""
+    return shared_models.get(name, parameters, **kwargs)
@@ -0,0 +1,243 @@
+"""A ChatModel that answers with the cheapest adequate model and escalates when a check fails.
+
+    llm = CascadeChatModel([
+        chat_model("watsonx:ibm/granite-3-3-8b-instruct", ChatModelParameters(temperature=0)),
+        chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0)),
+    ])
+
+Each request goes to the first model (tier) that can take it: a tier with `max_prompt_tokens`
+is skipped for longer prompts. Its response is checked by the validators, which return why it
+isn't good enough (or None); a failed check or an error moves the request to the next tier.
+The last tier's response is returned as is. Built-in checks reject truncated or empty
+responses, tool calls the request's tools can't accept, and answers that hedge.
+
+Responses of all tiers but the last are only returned once they have been checked, so they
+aren't streamed; the last tier streams as requested.
+
+Every request emits a "route" event with the model that answered, the tiers it went through,
+why each escalation happened and how long each attempt took. TraceRecorder keeps them in the
+trace and summarizes them in its report, which is what `max_prompt_tokens` and the hedging
+patterns are tuned from.
+"""
+
+import json
+import re
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic import BaseModel, ValidationError
+
+from beeai_framework.backend import AnyMessage, ChatModel
+from beeai_framework.backend.constants import ProviderName
+from beeai_framework.backend.types import (
+    ChatModelInput,
+    ChatModelOutput,
+    ChatModelStructureInput,
+    ChatModelStructureOutput,
+)
+from beeai_framework.context import Run, RunContext
+from beeai_framework.errors import AbortError, FrameworkError
+from beeai_framework.logger import Logger
+from beeai_framework.tools import AnyTool
+from beeai_framework.utils import MaybeAsync
+from beeai_framework.utils.asynchronous import ensure_async
+from bounded_memory import estimate_tokens
+
+logger = Logger(__name__)
+
+# A validator gets the response and the request ({"messages": ..., "tools": ..., ...}) and
+# returns why the response should be escalated, or None to accept it
+Validator = MaybeAsync[[ChatModelOutput, dict[str, Any]], str | None]
+
+_HEDGING = re.compile(
+    r"\b(?:I(?:'m| am) not (?:sure|certain)|I (?:don't|do not) know|I(?: can't|cannot| am unable to|'m unable to)"
+    r" (?:answer|determine|help|provide)|(?:it is|it's) unclear)\b",
+    re.IGNORECASE,
+)
+
+
+def complete_response(output: ChatModelOutput, request: dict[str, Any]) -> str | None:
+    if output.finish_reason == "length":
+        return "truncated response"
+    if not output.get_tool_calls() and not output.get_text_content().strip():
+        return "empty response"
+    return None
+
+
+def valid_tool_calls(output: ChatModelOutput, request: dict[str, Any]) -> str | None:
+    """Tool calls must name one of the request's tools and match its input schema."""
+    tools: dict[str, AnyTool] = {tool.name: tool for tool in request.get("tools") or []}
+    for call in output.get_tool_calls():
+        tool = tools.get(call.tool_name)
+        if tool is None:
+            return f"unknown tool {call.tool_name!r}"
+        try:
+            tool.input_schema.model_validate(json.loads(call.args or "{}"))
+        except (ValueError, ValidationError):
+            return f"invalid {call.tool_name} arguments"
+    return None
+
+
+def confident_answer(output: ChatModelOutput, request: dict[str, Any]) -> str | None:
+    """The answer, as text or as the final_answer call's response, must not hedge."""
+    text = output.get_text_content()
+    for call in output.get_tool_calls():
+        if call.tool_name == "final_answer":
+            text += call.args
+    return "hedged answer" if _HEDGING.search(text) else None
+
+
+DEFAULT_VALIDATORS: tuple[Validator, ...] = (complete_response, valid_tool_calls, confident_answer)
+
+
+@dataclass(frozen=True)
+class Tier:
+    model: ChatModel
+    max_prompt_tokens: int | None = None  # longer prompts start at the next tier
+
+
+class RouteAttempt(BaseModel):
+    model: str
+    duration: float
+    prompt_tokens: int | None = None
+    completion_tokens: int | None = None
+    reason: str | None = None  # why the request moved on to the next tier; None for the answer
+
+
+class RouteEvent(BaseModel):
+    model: str  # the model that answered
+    tier: int
+    attempts: list[RouteAttempt]  # skipped tiers are listed with zero duration
+
+    @property
+    def duration(self) -> float:
+        return sum(attempt.duration for attempt in self.attempts)
+
+    @property
+    def escalated(self) -> bool:
+        return self.tier > 0
+
+
+def _model_name(model: ChatModel) -> str:
+    return f"{model.provider_id}:{model.model_id}"
+
+
+class CascadeChatModel(ChatModel):
+    """ChatModel that tries its tiers from the cheapest up until a response passes the validators."""
+
+    def __init__(
+        self,
+        tiers: Sequence[ChatModel | Tier],
+        *,
+        validators: Sequence[Validator] = DEFAULT_VALIDATORS,
+    ) -> None:
+        if not tiers:
+            raise ValueError("CascadeChatModel needs at least one model")
+        self._tiers = [tier if isinstance(tier, Tier) else Tier(tier) for tier in tiers]
+        first = self._tiers[0].model
+        super().__init__(parameters=first.parameters)
+        self._validators = list(validators)
+        self._checks = [ensure_async(validator) for validator in validators]
+        self.tool_call_fallback_via_response_format = first.tool_call_fallback_via_response_format
+        self.model_supports_tool_calling = all(tier.model.model_supports_tool_calling for tier in self._tiers)
+        self.use_strict_model_schema = first.use_strict_model_schema
+        self.use_strict_tool_schema = first.use_strict_tool_schema
+
+    @property
+    def model_id(self) -> str:
+        return " > ".join(tier.model.model_id for tier in self._tiers)
+
+    @property
+    def provider_id(self) -> ProviderName:
+        return self._tiers[0].model.provider_id
+
+    @property
+    def tiers(self) -> list[Tier]:
+        return self._tiers
+
+    async def _check(self, output: Any, request: dict[str, Any]) -> str | None:
+        if not isinstance(output, ChatModelOutput):
+            return None  # structured outputs are validated against their schema by the model
+        for check in self._checks:
+            reason = await check(output, request)
+            if reason is not None:
+                return reason
+        return None
+
+    def _routed_run(self, kind: str, messages: list[AnyMessage], options: dict[str, Any]) -> Run[Any]:
+        async def handler(context: RunContext) -> Any:
+            request = {"messages": messages, **options}
+            prompt_tokens = sum(estimate_tokens(message) for message in messages)
+            attempts: list[RouteAttempt] = []
+            for tier, candidate in enumerate(self._tiers):
+                model, last = candidate.model, tier == len(self._tiers) - 1
+                name = _model_name(model)
+                if not last and candidate.max_prompt_tokens is not None and prompt_tokens > candidate.max_prompt_tokens:
+                    attempts.append(RouteAttempt(model=name, duration=0.0, reason="prompt too long"))
+                    continue
+
+                start = time.perf_counter()
+                try:
+                    if kind == "create":
+                        # Only the last tier's response is returned unchecked, so it is the only one streamed
+                        kwargs = options if last else {**options, "stream": False}
+                        output = await model.create(messages=messages, **kwargs)
+                    else:
+                        output = await model.create_structure(messages=messages, **options)
+                    reason = None if last else await self._check(output, request)
+                except FrameworkError as e:
+                    # The model's own failures come wrapped by its run; anything else is a bug to surface
+                    if last or e.fatal or isinstance(e, AbortError):
+                        raise
+                    output, reason = None, f"{type(e).__name__}: {e}".splitlines()[0][:200]
+
+                usage = getattr(output, "usage", None)
+                attempts.append(
+                    RouteAttempt(
+                        model=name,
+                        duration=time.perf_counter() - start,
+                        prompt_tokens=usage.prompt_tokens if usage else None,
+                        completion_tokens=usage.completion_tokens if usage else None,
+                        reason=reason,
+                    )
+                )
+                if reason is None:
+                    await context.emitter.emit("route", RouteEvent(model=name, tier=tier, attempts=attempts))
+                    return output
+                logger.debug(f"Escalating from {name}: {reason}")
+            raise AssertionError("the last tier always answers")
+
+        return RunContext.enter(
+            self,
+            handler,
+            signal=options.get("abort_signal"),
+            run_params={"messages": messages, **options},
+        ).middleware(*self.middlewares)
+
+    def create(self, *, messages: list[AnyMessage], **kwargs: Any) -> Run[ChatModelOutput]:
+        return self._routed_run("create", messages, kwargs)
+
+    def create_structure(
+        self, *, schema: type[BaseModel] | dict[str, Any], messages: list[AnyMessage], **kwargs: Any
+    ) -> Run[ChatModelStructureOutput]:
+        return self._routed_run("create_structure", messages, {"schema": schema, **kwargs})
+
+    # Requests never reach these: create() and create_structure() hand them to a tier's model
+    async def _create(self, input: ChatModelInput, run: RunContext) -> ChatModelOutput:
+        return await self._tiers[-1].model._create(input, run)
+
+    def _create_stream(self, input: ChatModelInput, run: RunContext) -> Any:
+        return self._tiers[-1].model._create_stream(input, run)
+
+    async def _create_structure(
+        self, input: ChatModelStructureInput[Any], run: RunContext
+    ) -> ChatModelStructureOutput:
+        return await self._tiers[-1].model._create_structure(input, run)
+
+    async def clone(self) -> "CascadeChatModel":
+        tiers = [Tier(await tier.model.clone(), tier.max_prompt_tokens) for tier in self._tiers]
+        cloned = CascadeChatModel(tiers, validators=self._validators)
+        cloned.middlewares = self.middlewares.copy()
+        return cloned
@@ -0,0 +1,148 @@
+"""Fan-out handoff tool that consults several independent expert agents at the same time.
+
+    consult = ParallelHandoffTool([handoff_to_a, handoff_to_b], timeout=90)
+
+The coordinator sends all independent questions in a single tool call; the experts run
+concurrently, each under its own timeout, and their answers are joined into one result.
+"""
+
+import asyncio
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Literal
+
+from pydantic import BaseModel, Field, create_model
+
+from beeai_framework.context import RunContext
+from beeai_framework.emitter import Emitter
+from beeai_framework.tools import StringToolOutput, Tool, ToolError, ToolRunOptions
+from beeai_framework.tools.handoff import HandoffSchema, HandoffTool
+
+
+@dataclass
+class ExpertResult:
+    """Outcome of one delegated task; exactly one of `text` and `error` is set."""
+
+    expert: str
+    task: str
+    text: str | None = None
+    error: str | None = None
+    elapsed: float = 0.0
+
+
+class ParallelHandoffTool(Tool[BaseModel, ToolRunOptions, StringToolOutput]):
+    """Delegates independent tasks to several expert agents concurrently and joins their answers"""
+
+    def __init__(
+        self,
+        handoffs: Sequence[HandoffTool],
+        *,
+        name: str = "ConsultExperts",
+        description: str | None = None,
+        timeout: float | None = 120.0,
+        timeouts: dict[str, float] | None = None,
+        min_successful: int | None = 1,
+    ) -> None:
+        """Fans out tasks to the given handoff tools.
+
+        Args:
+            handoffs: The handoff tools (one per expert) that can be called in parallel.
+            name: Tool name shown to the coordinator.
+            description: Tool description. Defaults to a summary of the available experts.
+            timeout: Default time limit in seconds for each expert; None disables it.
+            timeouts: Per-expert overrides of `timeout`, keyed by handoff tool name.
+            min_successful: How many experts must answer for the result to be returned;
+                None requires all of them. Missing answers are reported inline.
+        """
+        super().__init__()
+        if not handoffs:
+            raise ValueError("At least one handoff tool is required")
+
+        self._handoffs = {handoff.name: handoff for handoff in handoffs}
+        if len(self._handoffs) != len(handoffs):
+            raise ValueError("Handoff tool names must be unique")
+        unknown = set(timeouts or {}) - self._handoffs.keys()
+        if unknown:
+            raise ValueError(f"Timeouts given for unknown experts: {', '.join(sorted(unknown))}")
+
+        self._name = name
+        self._description = description or (
+            "Consult several experts at once with independent tasks; they work in parallel. Available experts:\n"
+            + "\n".join(f"- {handoff.name}: {handoff.description}" for handoff in handoffs)
+        )
+        self._timeout = timeout
+        self._timeouts = timeouts or {}
+        self._min_successful = min_successful
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return self._description
+
+    @cached_property
+    def input_schema(self) -> type[BaseModel]:
+        expert_task = create_model(
+            "ExpertTask",
+            expert=(Literal[tuple(self._handoffs)], Field(description="Name of the expert to consult.")),
+            task=(str, HandoffSchema.model_fields["task"]),
+        )
+        return create_model(
+            "ParallelHandoffSchema",
+            tasks=(
+                list[expert_task],  # type: ignore[valid-type]
+                Field(min_length=1, description="Independent tasks, at most one per expert."),
+            ),
+        )
+
+    def _timeout_for(self, expert: str) -> float | None:
+        return self._timeouts.get(expert, self._timeout)
+
+    async def _consult(self, expert: str, task: str, context: RunContext) -> ExpertResult:
+        result = ExpertResult(expert=expert, task=task)
+        timeout = self._timeout_for(expert)
+        start = time.perf_counter()
+        try:
+            output = await asyncio.wait_for(
+                self._handoffs[expert].run(HandoffSchema(task=task)).context(context.context),
+                timeout,
+            )
+            result.text = output.get_text_content()
+        except TimeoutError:
+            result.error = f"timed out after {timeout:g}s"
+        except Exception as e:
+            result.error = str(e) or type(e).__name__
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    async def _run(self, input: BaseModel, options: ToolRunOptions | None, context: RunContext) -> StringToolOutput:
+        tasks = input.tasks  # type: ignore[attr-defined]
+        duplicates = {t.expert for t in tasks if sum(other.expert == t.expert for other in tasks) > 1}
+        if duplicates:
+            raise ToolError(f"Send one combined task per expert (repeated: {', '.join(sorted(duplicates))}).")
+
+        results = await asyncio.gather(*(self._consult(t.expert, t.task, context) for t in tasks))
+
+        answered = sum(result.error is None for result in results)
+        required = len(results) if self._min_successful is None else min(self._min_successful, len(results))
+        if answered < required:
+            failures = "; ".join(f"{r.expert}: {r.error}" for r in results if r.error is not None)
+            raise ToolError(f"Only {answered} of {len(results)} experts answered ({failures}).")
+
+        sections = []
+        for result in results:
+            if result.error is None:
+                sections.append(f"## {result.expert}\n{result.text}")
+            else:
+                sections.append(f"## {result.expert}\n(No answer: {result.error}. Proceed without this expert.)")
+        return StringToolOutput("\n\n".join(sections))
+
+    def _create_emitter(self) -> Emitter:
+        return Emitter.root().child(
+            namespace=["tool", "handoff", "parallel"],
+            creator=self,
+        )
@@ -0,0 +1,413 @@
+"""Process-wide rate limiting, adaptive concurrency and retries for LLM and tool backends.
+
+    result = await shared_limiter.call("wikipedia", lambda: asyncio.to_thread(fetch, query))
+
+Every backend (a model provider such as "watsonx", "wikipedia", "open-meteo") has:
+
+- a token bucket (`rate` requests per second, bursts of up to `burst`);
+- an AIMD concurrency limit: it grows by one per `limit` successful requests, and is cut by
+  `decrease_factor` when the backend throttles (429/503), times out, or answers slower than
+  `latency_target`. Only requests started after the previous cut can cut it again, so a burst
+  of 429s for requests sent together counts once;
+- retries of throttled requests with full-jitter exponential backoff, at least as long as the
+  backend's Retry-After, within a `deadline` for all attempts. While a Retry-After is pending
+  no request is sent to the backend, not just the one that was throttled.
+
+Requests waiting for a slot are served by priority class, then in order: "interactive" runs go
+before "batch" ones (prefetches, queued server jobs). The class is taken from the current
+context, see `setup_priority()`, unless it is passed explicitly.
+
+Models from model_registry go through `shared_limiter` (see RateLimitedChatModel), as do the
+Wikipedia and Open-Meteo lookups. throttling_server.py runs it against a local stand-in that
+throttles like a real API.
+"""
+
+import asyncio
+import heapq
+import itertools
+import random
+from collections.abc import Awaitable, Callable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from email.utils import parsedate_to_datetime
+from typing import Any, Literal, TypeVar
+
+from pydantic import BaseModel
+
+from beeai_framework.backend import AnyMessage, ChatModel
+from beeai_framework.backend.constants import ProviderName
+from beeai_framework.backend.types import (
+    ChatModelInput,
+    ChatModelOutput,
+    ChatModelStructureInput,
+    ChatModelStructureOutput,
+)
+from beeai_framework.context import Run, RunContext
+from beeai_framework.logger import Logger
+
+T = TypeVar("T")
+
+logger = Logger(__name__)
+
+Priority = Literal["interactive", "batch"]
+
+_PRIORITY_ORDER: dict[Priority, int] = {"interactive": 0, "batch": 1}
+
+_THROTTLING_STATUSES = frozenset({429, 503})
+
+
+@dataclass(frozen=True)
+class BackendConfig:
+    rate: float | None = 10.0  # requests per second; None for no token bucket
+    burst: int = 10
+    initial_limit: float = 8.0  # concurrent requests
+    min_limit: float = 1.0
+    max_limit: float = 64.0
+    decrease_factor: float = 0.5
+    latency_target: float | None = None  # seconds; slower successful requests count as congestion
+    max_retries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    deadline: float = 120.0  # seconds for all attempts of a call, including waiting for a slot
+
+
+DEFAULT_BACKENDS: dict[str, BackendConfig] = {
+    "watsonx": BackendConfig(rate=8.0, burst=8, initial_limit=8.0, max_limit=32.0),
+    "wikipedia": BackendConfig(rate=10.0, burst=10, initial_limit=4.0, max_limit=16.0, latency_target=3.0),
+    "open-meteo": BackendConfig(rate=5.0, burst=5, initial_limit=4.0, max_limit=16.0, latency_target=3.0),
+}
+
+
+@dataclass
+class BackendStats:
+    requests: int = 0  # attempts sent to the backend
+    throttled: int = 0  # attempts the backend throttled or that timed out
+    retries: int = 0
+    gave_up: int = 0  # calls that failed because the retries or the deadline ran out
+    decreases: int = 0  # times the concurrency limit was cut
+    waited: float = 0.0  # seconds spent waiting for a slot
+    waited_by_priority: dict[str, float] = field(default_factory=dict)
+
+
+def _retry_after(headers: Any) -> float | None:
+    value = headers.get("Retry-After") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        try:
+            return max((parsedate_to_datetime(value) - datetime.now(tz=UTC)).total_seconds(), 0.0)
+        except (TypeError, ValueError):
+            return None
+
+
+def classify_error(error: BaseException) -> tuple[bool, float | None]:
+    """Whether the error means the backend is overloaded (throttling or a timeout), and its Retry-After.
+
+    Looks through the causes of wrapped errors (e.g. ChatModelError) for an HTTP status.
+    """
+    seen: set[int] = set()
+    current: BaseException | None = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, TimeoutError) or type(current).__name__ in ("Timeout", "TimeoutException"):
+            return True, None
+        response = getattr(current, "response", None)
+        status = getattr(current, "status_code", None) or getattr(current, "status", None)
+        if status is None and response is not None:
+            status = getattr(response, "status_code", None) or getattr(response, "status", None)
+        if status in _THROTTLING_STATUSES or type(current).__name__ == "RateLimitError":
+            headers = getattr(response, "headers", None) or getattr(current, "headers", None)
+            return True, _retry_after(headers)
+        current = current.__cause__ or current.__context__
+    return False, None
+
+
+_current_priority: ContextVar[Priority] = ContextVar("rate_limit_priority", default="interactive")
+
+
+def current_priority() -> Priority:
+    return _current_priority.get()
+
+
+def setup_priority(priority: Priority) -> Callable[[], None]:
+    """Use `priority` for the requests made in the current context; returns a function restoring the previous one."""
+    if priority not in _PRIORITY_ORDER:
+        raise ValueError(f"Unknown priority class '{priority}', use one of: {', '.join(_PRIORITY_ORDER)}")
+    token = _current_priority.set(priority)
+    return lambda: _current_priority.reset(token)
+
+
+class Backend:
+    """Token bucket, adaptive concurrency limit and priority queue of one backend."""
+
+    def __init__(self, name: str, config: BackendConfig) -> None:
+        self.name = name
+        self.config = config
+        self.stats = BackendStats()
+        self._limit = config.initial_limit
+        self._last_decrease = float("-inf")
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reset_loop_state()
+
+    def _reset_loop_state(self) -> None:
+        self._tokens = float(self.config.burst)
+        self._refilled_at: float | None = None
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._waiters: list[tuple[int, int, asyncio.Future[None]]] = []
+        self._order = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+    @property
+    def limit(self) -> float:
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _current_loop(self) -> asyncio.AbstractEventLoop:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Slots and timers belong to one event loop (e.g. consecutive asyncio.run() calls)
+            self._loop = loop
+            self._reset_loop_state()
+        return loop
+
+    def _refill(self, now: float) -> None:
+        if self.config.rate is None:
+            return
+        if self._refilled_at is not None:
+            self._tokens = min(float(self.config.burst), self._tokens + (now - self._refilled_at) * self.config.rate)
+        self._refilled_at = now
+
+    def _wake_at(self, when: float) -> None:
+        assert self._loop is not None
+        if self._timer is not None:
+            if self._timer.when() <= when:
+                return
+            self._timer.cancel()
+        self._timer = self._loop.call_at(when, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Hand out slots to the waiters, highest priority first, while the limit and the bucket allow."""
+        assert self._loop is not None
+        now = self._loop.time()
+        self._refill(now)
+        while self._waiters:
+            if self._waiters[0][2].done():
+                heapq.heappop(self._waiters)  # gave up waiting
+                continue
+            if now < self._paused_until:
+                self._wake_at(self._paused_until)
+                return
+            if self._in_flight >= max(int(self._limit), 1):
+                return  # the next release dispatches again
+            if self.config.rate is not None and self._tokens < 1:
+                self._wake_at(now + (1 - self._tokens) / self.config.rate)
+                return
+            _, _, future = heapq.heappop(self._waiters)
+            if self.config.rate is not None:
+                self._tokens -= 1
+            self._in_flight += 1
+            future.set_result(None)
+
+    async def acquire(self, priority: Priority, give_up_at: float) -> float:
+        """Wait for a slot until `give_up_at` (loop time); returns when the request may start."""
+        loop = self._current_loop()
+        requested = loop.time()
+        future: asyncio.Future[None] = loop.create_future()
+        heapq.heappush(self._waiters, (_PRIORITY_ORDER[priority], next(self._order), future))
+        self._dispatch()
+        try:
+            async with asyncio.timeout_at(give_up_at):
+                await future
+        except BaseException as e:
+            if future.done() and not future.cancelled():
+                self._release()  # the slot arrived as we gave up
+            if isinstance(e, TimeoutError):
+                raise TimeoutError(f"No capacity for a {self.name} request within the deadline") from None
+            raise
+        started = loop.time()
+        waited = self.stats.waited_by_priority
+        waited[priority] = waited.get(priority, 0.0) + started - requested
+        self.stats.waited += started - requested
+        return started
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        self._dispatch()
+
+    def release(self, started: float, *, congested: bool = False, retry_after: float | None = None) -> None:
+        """Return the slot of a request that started at `started`, adapting the limit to how it went."""
+        assert self._loop is not None
+        now = self._loop.time()
+        if not congested and self.config.latency_target is not None and now - started > self.config.latency_target:
+            congested = True
+        if congested:
+            if started >= self._last_decrease:
+                self._limit = max(self.config.min_limit, self._limit * self.config.decrease_factor)
+                self._last_decrease = now
+                self.stats.decreases += 1
+                logger.debug(f"{self.name}: concurrency limit cut to {self._limit:.1f}")
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+        else:
+            self._limit = min(self.config.max_limit, self._limit + 1 / self._limit)
+        self._release()
+
+    def _backoff(self, attempt: int, retry_after: float | None) -> float:
+        ceiling = min(self.config.max_delay, self.config.base_delay * 2**attempt)
+        return max(retry_after or 0.0, random.uniform(0, ceiling))
+
+    async def call(
+        self, fn: Callable[[], Awaitable[T]], *, priority: Priority | None = None, deadline: float | None = None
+    ) -> T:
+        """Run `fn` in a slot, retrying it while the backend is throttling, until the deadline."""
+        priority = priority or current_priority()
+        loop = self._current_loop()
+        give_up_at = loop.time() + (deadline if deadline is not None else self.config.deadline)
+        attempt = 0
+        while True:
+            started = await self.acquire(priority, give_up_at)
+            self.stats.requests += 1
+            try:
+                result = await fn()
+            except Exception as e:
+                congested, retry_after = classify_error(e)
+                if not congested:
+                    self._release()
+                    raise
+                self.stats.throttled += 1
+                self.release(started, congested=True, retry_after=retry_after)
+                delay = self._backoff(attempt, retry_after)
+                if attempt >= self.config.max_retries or loop.time() + delay >= give_up_at:
+                    self.stats.gave_up += 1
+                    raise
+                attempt += 1
+                self.stats.retries += 1
+                logger.debug(f"{self.name} is throttling ({e}), retry {attempt} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+            except BaseException:
+                self._release()  # cancelled
+                raise
+            else:
+                self.release(started)
+                return result
+
+
+class RateLimiter:
+    """The backends of a process, created on first use from `configs` (or `default`)."""
+
+    def __init__(
+        self, configs: dict[str, BackendConfig] | None = None, *, default: BackendConfig | None = None
+    ) -> None:
+        self._configs = dict(configs or {})
+        self._default = default or BackendConfig()
+        self._backends: dict[str, Backend] = {}
+
+    def backend(self, name: str) -> Backend:
+        backend = self._backends.get(name)
+        if backend is None:
+            backend = self._backends[name] = Backend(name, self._configs.get(name, self._default))
+        return backend
+
+    def configure(self, name: str, config: BackendConfig) -> None:
+        """Replace the configuration of a backend, starting it over."""
+        self._configs[name] = config
+        self._backends.pop(name, None)
+
+    async def call(
+        self,
+        backend: str,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        priority: Priority | None = None,
+        deadline: float | None = None,
+    ) -> T:
+        return await self.backend(backend).call(fn, priority=priority, deadline=deadline)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            name: {"limit": round(backend.limit, 2), "in_flight": backend.in_flight, **backend.stats.__dict__}
+            for name, backend in self._backends.items()
+        }
+
+
+shared_limiter = RateLimiter(DEFAULT_BACKENDS)
+
+
+class RateLimitedChatModel(ChatModel):
+    """ChatModel wrapper whose requests go through a RateLimiter backend (the provider by default).
+
+    Only throttling errors are retried, and providers throttle before they stream anything,
+    so streamed responses aren't repeated.
+    """
+
+    def __init__(self, model: ChatModel, *, limiter: RateLimiter | None = None, backend: str | None = None) -> None:
+        super().__init__(parameters=model.parameters)
+        self._model = model
+        self._limiter = limiter if limiter is not None else shared_limiter
+        self._backend = backend or model.provider_id
+        self.tool_call_fallback_via_response_format = model.tool_call_fallback_via_response_format
+        self.model_supports_tool_calling = model.model_supports_tool_calling
+        self.use_strict_model_schema = model.use_strict_model_schema
+        self.use_strict_tool_schema = model.use_strict_tool_schema
+
+    @property
+    def model_id(self) -> str:
+        return self._model.model_id
+
+    @property
+    def provider_id(self) -> ProviderName:
+        return self._model.provider_id
+
+    @property
+    def model(self) -> ChatModel:
+        return self._model
+
+    def _limited_run(self, messages: list[AnyMessage], options: dict[str, Any], execute: Any) -> Run[Any]:
+        async def handler(context: RunContext) -> Any:
+            return await self._limiter.call(self._backend, execute)
+
+        return RunContext.enter(
+            self,
+            handler,
+            signal=options.get("abort_signal"),
+            run_params={"messages": messages, **options},
+        ).middleware(*self.middlewares)
+
+    def create(self, *, messages: list[AnyMessage], **kwargs: Any) -> Run[ChatModelOutput]:
+        return self._limited_run(messages, kwargs, lambda: self._model.create(messages=messages, **kwargs))
+
+    def create_structure(
+        self, *, schema: type[BaseModel] | dict[str, Any], messages: list[AnyMessage], **kwargs: Any
+    ) -> Run[ChatModelStructureOutput]:
+        return self._limited_run(
+            messages,
+            {"schema": schema, **kwargs},
+            lambda: self._model.create_structure(schema=schema, messages=messages, **kwargs),
+        )
+
+    async def _create(self, input: ChatModelInput, run: RunContext) -> ChatModelOutput:
+        return await self._model._create(input, run)
+
+    def _create_stream(self, input: ChatModelInput, run: RunContext) -> Any:
+        return self._model._create_stream(input, run)
+
+    async def _create_structure(
+        self, input: ChatModelStructureInput[Any], run: RunContext
+    ) -> ChatModelStructureOutput:
+        return await self._model._create_structure(input, run)
+
+    async def clone(self) -> "RateLimitedChatModel":
+        cloned = RateLimitedChatModel(await self._model.clone(), limiter=self._limiter, backend=self._backend)
+        cloned.middlewares = self.middlewares.copy()
+        return cloned
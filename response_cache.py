@@ -0,0 +1,288 @@
+"""Persistent exact-match cache for deterministic (temperature 0) ChatModel calls.
+
+Turning it on only requires wrapping the model:
+
+    llm = CachedChatModel(ChatModel.from_name("watsonx:...", ChatModelParameters(temperature=0)))
+
+Responses are stored in a local SQLite file keyed by model, parameters, messages,
+tools and output schema, so repeated questions are answered from disk across runs.
+"""
+
+import hashlib
+import json
+import pickle
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Generic, TypeVar
+
+from pydantic import BaseModel
+
+from beeai_framework.backend import AnyMessage, ChatModel
+from beeai_framework.backend.constants import ProviderName
+from beeai_framework.backend.types import (
+    ChatModelInput,
+    ChatModelOutput,
+    ChatModelStructureInput,
+    ChatModelStructureOutput,
+)
+from beeai_framework.cache.base import BaseCache
+from beeai_framework.context import Run, RunContext
+from beeai_framework.tools import Tool
+
+T = TypeVar("T")
+
+DEFAULT_CACHE_PATH = Path(".cache") / "llm_responses.sqlite3"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0  # hits that waited on a request already in flight
+    prefetched: int = 0  # hits served by a speculative prefetch
+    discarded: int = 0  # speculative prefetches nobody asked for
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SQLiteCache(BaseCache[T], Generic[T]):
+    """Disk-backed cache with LRU eviction (by entry count and total bytes) and TTL expiry.
+
+    Values are pickled into a single SQLite table, so the cache can be shared by
+    several processes running at the same time.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_CACHE_PATH,
+        *,
+        max_entries: int | None = 10_000,
+        max_bytes: int | None = 256 * 1024 * 1024,
+        ttl: float | None = 7 * 24 * 3600,
+    ) -> None:
+        super().__init__()
+        self._path = Path(path)
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self.stats = CacheStats()
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self._ttl is not None and now - created_at > self._ttl
+
+    async def size(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        return int(count)
+
+    async def set(self, key: str, value: T) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict(now)
+
+    async def get(self, key: str) -> T | None:
+        now = time.time()
+        with self._lock:
+            row = self._db.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None and self._is_expired(row[1], now):
+                self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self.stats.misses += 1
+                return None
+
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.hits += 1
+        return pickle.loads(row[0])  # type: ignore[no-any-return]
+
+    async def has(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT created_at FROM entries WHERE key = ?", (key,)).fetchone()
+        return row is not None and not self._is_expired(row[0], time.time())
+
+    async def delete(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    async def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM entries")
+
+    async def clone(self) -> "SQLiteCache[T]":
+        return type(self)(self._path, max_entries=self._max_entries, max_bytes=self._max_bytes, ttl=self._ttl)
+
+    def _evict(self, now: float) -> None:
+        if self._ttl is not None:
+            self._db.execute("DELETE FROM entries WHERE created_at < ?", (now - self._ttl,))
+
+        # Least recently used entries go first
+        if self._max_entries is not None:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN"
+                " (SELECT key FROM entries ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self._max_entries,),
+            )
+        if self._max_bytes is not None:
+            self._db.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM"
+                " (SELECT key, SUM(size) OVER (ORDER BY accessed_at DESC, key) AS total FROM entries)"
+                " WHERE total > ?)",
+                (self._max_bytes,),
+            )
+
+
+def _to_key_data(value: Any) -> Any:
+    """Convert call arguments into plain JSON data that is stable across processes."""
+    if isinstance(value, Tool):
+        return value.to_json_safe()
+    if isinstance(value, type) and issubclass(value, BaseModel):
+        return value.model_json_schema()
+    if isinstance(value, BaseModel):
+        return value.model_dump(exclude_none=True)
+    if isinstance(value, dict):
+        return {str(k): _to_key_data(v) for k, v in value.items()}
+    if isinstance(value, list | tuple):
+        return [_to_key_data(v) for v in value]
+    if value is None or isinstance(value, str | int | float | bool):
+        return value
+    return str(value)
+
+
+class CachedChatModel(ChatModel):
+    """ChatModel wrapper that answers repeated deterministic requests from a persistent cache.
+
+    Only temperature 0 calls are cached; everything else is passed straight through.
+    """
+
+    def __init__(self, model: ChatModel, cache: BaseCache[Any] | None = None) -> None:
+        super().__init__(parameters=model.parameters)
+        self._model = model
+        self._response_cache: BaseCache[Any] = cache if cache is not None else SQLiteCache()
+        self.tool_call_fallback_via_response_format = model.tool_call_fallback_via_response_format
+        self.model_supports_tool_calling = model.model_supports_tool_calling
+        self.use_strict_model_schema = model.use_strict_model_schema
+        self.use_strict_tool_schema = model.use_strict_tool_schema
+
+    @property
+    def model_id(self) -> str:
+        return self._model.model_id
+
+    @property
+    def provider_id(self) -> ProviderName:
+        return self._model.provider_id
+
+    @property
+    def model(self) -> ChatModel:
+        return self._model
+
+    @property
+    def response_cache(self) -> BaseCache[Any]:
+        return self._response_cache
+
+    @property
+    def stats(self) -> CacheStats | None:
+        return getattr(self._response_cache, "stats", None)
+
+    def _cache_key(self, kind: str, messages: list[AnyMessage], options: dict[str, Any]) -> str:
+        options = {k: v for k, v in options.items() if k != "abort_signal" and v is not None}
+        payload = {
+            "kind": kind,
+            "model": f"{self._model.provider_id}:{self._model.model_id}",
+            "parameters": self._model.parameters.model_dump(exclude_none=True),
+            "messages": [message.to_plain() for message in messages],
+            "options": _to_key_data(options),
+        }
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+    def _is_cacheable(self, options: dict[str, Any]) -> bool:
+        temperature = options.get("temperature")
+        if temperature is None:
+            temperature = self._model.parameters.temperature
+        return self._response_cache.enabled and temperature == 0
+
+    def _cached_run(
+        self,
+        kind: str,
+        messages: list[AnyMessage],
+        options: dict[str, Any],
+        execute: Any,
+    ) -> Run[Any]:
+        async def handler(context: RunContext) -> Any:
+            if not self._is_cacheable(options):
+                return await execute()
+
+            key = self._cache_key(kind, messages, options)
+            cached = await self._response_cache.get(key)
+            if cached is not None:
+                return cached
+
+            result = await execute()
+            await self._response_cache.set(key, result)
+            return result
+
+        return RunContext.enter(
+            self,
+            handler,
+            signal=options.get("abort_signal"),
+            run_params={"messages": messages, **options},
+        ).middleware(*self.middlewares)
+
+    def create(self, *, messages: list[AnyMessage], **kwargs: Any) -> Run[ChatModelOutput]:
+        return self._cached_run(
+            "create", messages, kwargs, lambda: self._model.create(messages=messages, **kwargs)
+        )
+
+    def create_structure(
+        self, *, schema: type[BaseModel] | dict[str, Any], messages: list[AnyMessage], **kwargs: Any
+    ) -> Run[ChatModelStructureOutput]:
+        return self._cached_run(
+            "create_structure",
+            messages,
+            {"schema": schema, **kwargs},
+            lambda: self._model.create_structure(schema=schema, messages=messages, **kwargs),
+        )
+
+    async def _create(self, input: ChatModelInput, run: RunContext) -> ChatModelOutput:
+        return await self._model._create(input, run)
+
+    def _create_stream(self, input: ChatModelInput, run: RunContext) -> Any:
+        return self._model._create_stream(input, run)
+
+    async def _create_structure(
+        self, input: ChatModelStructureInput[Any], run: RunContext
+    ) -> ChatModelStructureOutput:
+        return await self._model._create_structure(input, run)
+
+    async def clone(self) -> "CachedChatModel":
+        cloned = CachedChatModel(await self._model.clone(), self._response_cache)
+        cloned.middlewares = self.middlewares.copy()
+        return cloned
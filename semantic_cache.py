@@ -0,0 +1,525 @@
+"""Semantic cache in front of agent runs, so reworded questions are answered without running the agent.
+
+    agent = RequirementAgent(..., middlewares=[trace_recorder, SemanticCache(namespace="t6-research")])
+
+When a run starts, its prompt is embedded on the CPU and looked up in a persistent index of the
+prompts the namespace has answered before. If one of them is at least `threshold` similar (cosine),
+its answer is returned and the agent makes no model or tool calls. Otherwise the agent runs and its
+answer is added to the index.
+
+A stored prompt must also have the same numbers and arithmetic operators ("15 + 27" vs "15 - 27",
+"10% of 50" vs "10 % 50"), which embeddings barely tell apart. By default (`match_words=True`) it
+must moreover have the same content words in the same order: the words left once stop words,
+filler like "tell me about" and operator words are removed, stemmed. In a long prompt one changed
+word ("financial" -> "healthcare") or two swapped ones ("Tokyo before Osaka") barely move the
+embedding, so similarity alone can't be trusted to tell such questions apart.
+
+With the defaults this is therefore a cache of normalized prompts: it matches rewordings that
+only differ in stop words, filler, word forms and punctuation ("What's 15 plus 27?" and
+"Calculate 15 + 27"), but not paraphrases in other words ("Add 15 and 27"). Matching real
+paraphrases takes a ModelEmbedder with `match_words=False`, relying on the model and the
+threshold to tell questions apart; that is when the index below earns its keep.
+
+- Embeddings come from an Embedder. HashingEmbedder (the default) hashes words, word pairs and
+  character trigrams into a fixed-size vector with NumPy, with no model to download. ModelEmbedder
+  uses an EmbeddingModel instead, e.g. a local "ollama:nomic-embed-text".
+- The index is random-hyperplane LSH in SQLite: `tables` hash tables of `bits`-bit signatures.
+  A lookup reads each table's bucket and the buckets one bit away, and ranks what it finds by
+  exact cosine similarity.
+- Each namespace keeps at most `max_entries` answers, evicting the least recently used, and
+  answers expire after `ttl`.
+- Answers are stored with a fingerprint of the agent (instructions, tools, model, requirements)
+  and the embedder. When the fingerprint changes, the namespace's older answers are dropped.
+
+Only standalone runs are cached: a prompt, no structured `expected_output`, and an empty agent
+memory, as earlier turns change what a question means. Agents whose questions don't depend on
+each other (the t11 calculator) can set `ignore_history`. Lookups are emitted as "cache" events,
+which TraceRecorder adds to the trace.
+"""
+
+import hashlib
+import json
+import pickle
+import re
+import sqlite3
+import threading
+import time
+import weakref
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Protocol
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the embeddings and the index; without it nothing is cached
+    np = None
+
+from beeai_framework.agents.experimental import RequirementAgent
+from beeai_framework.agents.experimental.types import RequirementAgentRunOutput, RequirementAgentRunState
+from beeai_framework.backend import AssistantMessage, EmbeddingModel, UserMessage
+from beeai_framework.context import RunContext, RunContextFinishEvent, RunContextStartEvent, RunMiddlewareProtocol
+from beeai_framework.emitter import EmitterOptions, EventMeta
+from beeai_framework.logger import Logger
+from beeai_framework.memory import UnconstrainedMemory
+from response_cache import CacheStats, _to_key_data
+from wikipedia_cache import CacheLookupEvent
+
+logger = Logger(__name__)
+
+DEFAULT_SEMANTIC_CACHE_PATH = Path(".cache") / "semantic_cache.sqlite3"
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+_STOP_WORDS = frozenset(
+    "a also an and any are as at be been by can could do does for from had has have how i i'm in into is it its"
+    " just me my of on or our please should so some than that the their them then there these they this those"
+    " to us was we what what's when where which who why will with would you your".split()
+)
+# Words that ask for an answer without saying what about
+_FILLER_WORDS = frozenset(
+    "about answer calculate compute equal equals explain give know let like need result show tell want".split()
+)
+
+# Numbers, arithmetic operators and the brackets around them, the part of a prompt that embeddings
+# blur; "10% of 50" is a percentage, "10 % 50" a remainder
+_KEY_TERMS = re.compile(
+    r"\d+(?:,\d{3})*(?:\.\d+)?|(?<=\d)\s*%\s*of\b|\bpercent\s+of\b"
+    r"|(?<=[\d\s()])[-+*/×÷^%](?=[\s\d(?.]|$)|\((?=\s*[-\d(])|(?<=[\d)])\s*\)"
+    r"|\b(?:plus|minus|times|multiplied|divided|percent|squared|cubed|power)\b",
+    re.IGNORECASE,
+)
+_OPERATOR_SYNONYMS = {
+    "plus": "+",
+    "minus": "-",
+    "times": "*",
+    "multiplied": "*",
+    "×": "*",
+    "divided": "/",
+    "÷": "/",
+    "percent": "%",
+    "power": "^",
+}
+
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise ModuleNotFoundError("Optional module [numpy] not found.\nRun 'pip install numpy' to install.")
+    return np
+
+
+def key_terms(text: str) -> tuple[str, ...]:
+    """The numbers, operators and brackets of a prompt, in order; "144 divided by 12" gives ("144.0", "/", "12.0")."""
+    terms: list[str] = []
+    for match in _KEY_TERMS.finditer(text):
+        term = match.group(0).casefold().strip()
+        if term.endswith("of"):
+            term = "% of"
+        elif term[0].isdigit():
+            term = repr(float(term.replace(",", "")))
+        terms.append(_OPERATOR_SYNONYMS.get(term, term))
+    return tuple(terms)
+
+
+class Embedder(Protocol):
+    name: str  # part of the cache fingerprint, so a different embedder starts a fresh cache
+
+    async def embed(self, texts: list[str]) -> Any:
+        """One L2-normalized float32 row per text."""
+        ...
+
+
+def _normalize(vectors: Any) -> Any:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _stem(word: str) -> str:
+    for suffix, replacement in (("ies", "y"), ("ing", ""), ("ed", ""), ("es", ""), ("s", "")):
+        if len(word) > len(suffix) + 3 and word.endswith(suffix):
+            word = word[: -len(suffix)] + replacement
+            break
+    # "summarize", "summarizes" and "summarizing" share a stem
+    return word[:-1] if len(word) > 4 and word.endswith("e") else word
+
+
+def _words(text: str) -> list[str]:
+    """Stemmed words of a prompt, in order, without stop words, filler and operator words."""
+    return [
+        _stem(word.removesuffix("'s"))
+        for word in _WORD.findall(text.casefold())
+        if word not in _STOP_WORDS and word not in _FILLER_WORDS and word not in _OPERATOR_SYNONYMS
+    ]
+
+
+def content_words(text: str) -> tuple[str, ...]:
+    """The words a prompt is about, in order; "Tell me about the states of AI agents" gives ("stat", "ai", "agent")."""
+    return tuple(_words(text))
+
+
+class HashingEmbedder:
+    """Feature-hashing embedder: content words, word pairs and character trigrams, hashed into `dimensions`.
+
+    Filler and operator words are left out, as the cache compares a prompt's numbers and operators exactly.
+    """
+
+    def __init__(self, dimensions: int = 1024) -> None:
+        _require_numpy()
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def _features(self, text: str) -> list[tuple[str, float]]:
+        words = _words(text)
+        features = [(word, 1.0) for word in words]
+        features.extend((f"{first} {second}", 0.5) for first, second in zip(words, words[1:], strict=False))
+        for word in words:
+            padded = f"<{word}>"
+            features.extend((padded[i : i + 3], 0.2) for i in range(len(padded) - 2))
+        return features
+
+    async def embed(self, texts: list[str]) -> Any:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                vectors[row, h % self.dimensions] += weight if h & 0x80000000 else -weight
+        return _normalize(vectors)
+
+
+class ModelEmbedder:
+    """Embedder backed by an EmbeddingModel, e.g. EmbeddingModel.from_name("ollama:nomic-embed-text")."""
+
+    def __init__(self, model: EmbeddingModel) -> None:
+        _require_numpy()
+        self._model = model
+        self.name = f"{model.provider_id}:{model.model_id}"
+
+    async def embed(self, texts: list[str]) -> Any:
+        output = await self._model.create(texts)
+        return _normalize(np.asarray(output.embeddings, dtype=np.float32))
+
+
+@dataclass
+class SemanticHit:
+    query: str  # the stored prompt that matched
+    similarity: float
+    answer: str
+    answer_structured: Any
+
+
+class SemanticIndex:
+    """Persistent LSH index of prompt embeddings and their answers, in one SQLite file.
+
+    Answers are stored per scope (a namespace and the fingerprint of the agent it was filled by);
+    several processes can share the file.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = DEFAULT_SEMANTIC_CACHE_PATH,
+        *,
+        tables: int = 8,
+        bits: int = 8,
+        max_entries: int | None = 1000,
+        ttl: float | None = 30 * 24 * 3600,
+        seed: int = 0,
+    ) -> None:
+        _require_numpy()
+        if not 1 <= bits <= 16:
+            raise ValueError("'bits' must be between 1 and 16")
+        self._path = Path(path)
+        self._tables = tables
+        self._bits = bits
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._seed = seed
+        self._planes: dict[int, Any] = {}  # per embedding size
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, scope TEXT NOT NULL, conditions TEXT NOT NULL,"
+            " query TEXT NOT NULL, vector BLOB NOT NULL, answer BLOB NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_namespace ON entries (namespace, accessed_at)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS buckets ("
+            " scope TEXT NOT NULL, bucket INTEGER NOT NULL,"
+            " entry_id INTEGER NOT NULL REFERENCES entries (id) ON DELETE CASCADE,"
+            " PRIMARY KEY (scope, bucket, entry_id)) WITHOUT ROWID"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS buckets_entry ON buckets (entry_id)")
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def _signatures(self, vector: Any) -> list[int]:
+        dimensions = vector.shape[0]
+        planes = self._planes.get(dimensions)
+        if planes is None:
+            # Derived from the seed, so every process hashes the same way
+            rng = np.random.default_rng(self._seed)
+            planes = self._planes[dimensions] = rng.standard_normal((self._tables * self._bits, dimensions))
+        signs = (planes @ vector > 0).reshape(self._tables, self._bits)
+        weights = 1 << np.arange(self._bits)
+        return [int(signature) for signature in signs @ weights]
+
+    def _buckets(self, vector: Any, *, probe: bool) -> list[int]:
+        """Bucket keys (table and signature) of a vector; with `probe`, also those one bit away."""
+        keys: list[int] = []
+        for table, signature in enumerate(self._signatures(vector)):
+            keys.append(table << self._bits | signature)
+            if probe:
+                keys.extend(table << self._bits | signature ^ (1 << bit) for bit in range(self._bits))
+        return keys
+
+    def search(self, scope: str, vector: Any, conditions: str, threshold: float) -> SemanticHit | None:
+        buckets = self._buckets(vector, probe=True)
+        now = time.time()
+        oldest = now - self._ttl if self._ttl is not None else 0.0
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT id, query, vector, answer FROM entries WHERE id IN"
+                f" (SELECT entry_id FROM buckets WHERE scope = ? AND bucket IN ({','.join('?' * len(buckets))}))"
+                " AND conditions = ? AND created_at >= ?",
+                (scope, *buckets, conditions, oldest),
+            ).fetchall()
+            if not rows:
+                return None
+
+            similarities = np.stack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) @ vector
+            best = int(np.argmax(similarities))
+            if similarities[best] < threshold:
+                return None
+            entry_id, query, _, answer = rows[best]
+            self._db.execute("UPDATE entries SET accessed_at = ? WHERE id = ?", (now, entry_id))
+        text, structured = pickle.loads(answer)
+        return SemanticHit(query=query, similarity=float(similarities[best]), answer=text, answer_structured=structured)
+
+    def add(
+        self, namespace: str, scope: str, query: str, vector: Any, conditions: str, answer: str, structured: Any
+    ) -> None:
+        blob = pickle.dumps((answer, structured), protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO entries (namespace, scope, conditions, query, vector, answer, created_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (namespace, scope, conditions, query, np.asarray(vector, dtype=np.float32).tobytes(), blob, now, now),
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO buckets (scope, bucket, entry_id) VALUES (?, ?, ?)",
+                [(scope, bucket, cursor.lastrowid) for bucket in self._buckets(vector, probe=False)],
+            )
+            self._evict(namespace, now)
+
+    def invalidate(self, namespace: str, scope: str) -> int:
+        """Drop the namespace's answers that were stored under another scope (an older agent fingerprint)."""
+        with self._lock:
+            cursor = self._db.execute("DELETE FROM entries WHERE namespace = ? AND scope != ?", (namespace, scope))
+        return cursor.rowcount
+
+    def size(self, namespace: str | None = None) -> int:
+        with self._lock:
+            if namespace is None:
+                (count,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            else:
+                (count,) = self._db.execute("SELECT COUNT(*) FROM entries WHERE namespace = ?", (namespace,)).fetchone()
+        return int(count)
+
+    def clear(self, namespace: str | None = None) -> None:
+        with self._lock:
+            if namespace is None:
+                self._db.execute("DELETE FROM entries")
+            else:
+                self._db.execute("DELETE FROM entries WHERE namespace = ?", (namespace,))
+
+    def _evict(self, namespace: str, now: float) -> None:
+        if self._ttl is not None:
+            self._db.execute("DELETE FROM entries WHERE created_at < ?", (now - self._ttl,))
+        # Least recently used answers go first
+        if self._max_entries is not None:
+            self._db.execute(
+                "DELETE FROM entries WHERE id IN (SELECT id FROM entries WHERE namespace = ?"
+                " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (namespace, self._max_entries),
+            )
+
+
+def agent_fingerprint(agent: RequirementAgent, embedder: Embedder) -> str:
+    """Hash of what an agent's answers depend on besides the prompt."""
+    # RequirementAgent keeps its configuration private
+    templates = getattr(agent, "_templates", None)
+    system = getattr(templates, "system", None)
+    config = getattr(system, "_config", None)
+    llm = getattr(agent, "_llm", None)
+    payload = {
+        "instructions": [getattr(config, "template", None), _to_key_data(getattr(config, "defaults", None))],
+        "tools": [
+            {"name": tool.name, "description": tool.description, "input": tool.input_schema.model_json_schema()}
+            for tool in agent.meta.tools
+        ],
+        "model": f"{llm.provider_id}:{llm.model_id}" if llm is not None else None,
+        "requirements": [
+            [type(requirement).__name__, requirement.name] for requirement in getattr(agent, "_requirements", [])
+        ],
+        "embedder": embedder.name,
+    }
+    serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _conditions(prompt: str, run_params: dict[str, Any], *, match_words: bool) -> str:
+    """What must match exactly besides the embedding."""
+    payload = {
+        "words": content_words(prompt) if match_words else None,
+        "terms": key_terms(prompt),
+        "context": run_params.get("context"),
+        "expected_output": run_params.get("expected_output"),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class SemanticCache(RunMiddlewareProtocol):
+    """Middleware that answers an agent's run from earlier answers to similar prompts."""
+
+    def __init__(
+        self,
+        *,
+        namespace: str | None = None,
+        embedder: Embedder | None = None,
+        index: SemanticIndex | None = None,
+        threshold: float = 0.8,
+        match_words: bool = True,
+        ignore_history: bool = False,
+    ) -> None:
+        """Caches the answers of the agents it is added to.
+
+        Args:
+            namespace: Name of the agent's part of the index. Defaults to the agent's name, so
+                agents configured differently but named alike should be given one each.
+            embedder: Embeds the prompts. Defaults to a HashingEmbedder.
+            index: Where the answers are stored. Defaults to .cache/semantic_cache.sqlite3.
+            threshold: Minimum cosine similarity of a stored prompt for its answer to be used.
+            match_words: Also require the stored prompt to have the same content words in the same
+                order. Turn this off with a ModelEmbedder to match paraphrases in other words.
+            ignore_history: Also cache runs of an agent whose memory holds earlier turns.
+        """
+        super().__init__()
+        self._namespace = namespace
+        self._embedder = embedder
+        self._index = index
+        self._threshold = threshold
+        self._match_words = match_words
+        self._ignore_history = ignore_history
+        self._scopes: weakref.WeakKeyDictionary[Any, tuple[str, str]] = weakref.WeakKeyDictionary()
+        self.stats = CacheStats()
+        if np is None:
+            logger.warning("NumPy is not installed, so the semantic cache is disabled")
+
+    @property
+    def embedder(self) -> Embedder:
+        if self._embedder is None:
+            self._embedder = HashingEmbedder()
+        return self._embedder
+
+    @property
+    def index(self) -> SemanticIndex:
+        if self._index is None:
+            self._index = SemanticIndex()  # opened on first use, in the directory the agent runs in
+        return self._index
+
+    def _scope(self, agent: RequirementAgent) -> tuple[str, str]:
+        # Per agent object: clones made for jobs and handoffs are fingerprinted on their first run
+        scope = self._scopes.get(agent)
+        if scope is None:
+            namespace = self._namespace or agent.meta.name
+            scope = (namespace, f"{namespace}:{agent_fingerprint(agent, self.embedder)}")
+            dropped = self.index.invalidate(*scope)
+            if dropped:
+                logger.info(f"Dropped {dropped} cached answers of '{namespace}', whose agent has changed")
+            self._scopes[agent] = scope
+        return scope
+
+    def _is_cacheable(self, agent: Any, ctx: RunContext) -> bool:
+        prompt = ctx.run_params.get("prompt")
+        expected_output = ctx.run_params.get("expected_output")
+        return (
+            np is not None
+            and isinstance(agent, RequirementAgent)
+            and isinstance(prompt, str)
+            and bool(prompt.strip())
+            and (expected_output is None or isinstance(expected_output, str))
+            and (self._ignore_history or agent.memory.is_empty())
+        )
+
+    async def _answer(self, agent: RequirementAgent, prompt: str, hit: SemanticHit) -> RequirementAgentRunOutput:
+        """The output of a run answered from the cache, with the exchange added to the agent's memory."""
+        question = UserMessage(prompt)
+        answer = AssistantMessage(hit.answer, {"semantic_cache": {"query": hit.query, "similarity": hit.similarity}})
+        await agent.memory.add_many([question, answer])
+        memory = UnconstrainedMemory()
+        await memory.add_many([question, answer])
+        state = RequirementAgentRunState(answer=answer, result=hit.answer_structured, memory=memory, iteration=0)
+        return RequirementAgentRunOutput(
+            answer=answer, answer_structured=hit.answer_structured, memory=memory, state=state
+        )
+
+    def bind(self, ctx: RunContext) -> None:
+        agent = ctx.instance
+        if not self._is_cacheable(agent, ctx):
+            return
+        prompt: str = ctx.run_params["prompt"]
+        lookup: dict[str, Any] = {}  # what the run was looked up with, unless it was answered from the cache
+
+        async def on_start(data: Any, meta: EventMeta) -> None:
+            if not isinstance(data, RunContextStartEvent):
+                return
+            namespace, scope = self._scope(agent)
+            vector = (await self.embedder.embed([prompt]))[0]
+            conditions = _conditions(prompt, ctx.run_params, match_words=self._match_words)
+            hit = self.index.search(scope, vector, conditions, self._threshold)
+            if hit is None:
+                self.stats.misses += 1
+                lookup.update(namespace=namespace, scope=scope, vector=vector, conditions=conditions)
+            else:
+                self.stats.hits += 1
+                data.output = await self._answer(agent, prompt, hit)
+                logger.debug(f"Answered {prompt!r} with the answer to {hit.query!r} ({hit.similarity:.2f})")
+            await ctx.emitter.emit(
+                "cache",
+                CacheLookupEvent(
+                    query=prompt[:200],
+                    outcome="miss" if hit is None else "hit",
+                    hits=self.stats.hits,
+                    misses=self.stats.misses,
+                    hit_rate=self.stats.hit_rate,
+                ),
+            )
+
+        async def on_finish(data: Any, meta: EventMeta) -> None:
+            if not lookup or not isinstance(data, RunContextFinishEvent) or data.error is not None:
+                return
+            output = data.output
+            if isinstance(output, RequirementAgentRunOutput):
+                self.index.add(
+                    lookup["namespace"],
+                    lookup["scope"],
+                    prompt,
+                    lookup["vector"],
+                    lookup["conditions"],
+                    output.answer.text,
+                    output.answer_structured,
+                )
+
+        ctx.emitter.match(
+            lambda event: event.name == "start" and event.creator is ctx, on_start, EmitterOptions(match_nested=True)
+        )
+        ctx.emitter.match(
+            lambda event: event.name == "finish" and event.creator is ctx, on_finish, EmitterOptions(match_nested=True)
+        )
@@ -0,0 +1,141 @@
+"""Speculative Wikipedia lookups that run while an agent's mandatory first step waits on the model.
+
+    wikipedia = wikipedia_tool()
+    agent = RequirementAgent(
+        tools=[ThinkTool(), wikipedia],
+        requirements=[ConditionalRequirement(WikipediaTool, only_after=[ThinkTool]), ...],
+        middlewares=[SpeculativePrefetch(wikipedia)],
+    )
+
+When the requirements keep the agent from using Wikipedia in its first step (a forced
+ThinkTool step, an `only_after` rule), that step is pure model latency. SpeculativePrefetch
+predicts the lookups the agent will make from its prompt, mostly named entities, and starts
+them at that point. If the agent then asks for one of them, the lookup is served from the
+prefetch (reported as "prefetched" in cache events). Predictions it never asks for are
+discarded when the run ends, so wrong guesses don't end up in the cache.
+"""
+
+import re
+from collections.abc import Callable
+from typing import Any
+
+from beeai_framework.agents.experimental.events import RequirementAgentStartEvent
+from beeai_framework.context import RunContext
+from beeai_framework.emitter import EmitterOptions, EventMeta
+from beeai_framework.logger import Logger
+from wikipedia_cache import CachedWikipediaTool
+
+logger = Logger(__name__)
+
+# Capitalized words that start requests rather than name things
+_COMMON_WORDS = frozenset(
+    "a an analyze and are as can compare could describe do does explain find for give how i i'm if in is it"
+    " list my please should tell the this we what when where which who why will would you".split()
+)
+
+# Words that end a lowercase noun phrase
+_PHRASE_BREAKS = frozenset(
+    "a an and are as at be by for from how in into is of on or that the their to what when which while with".split()
+)
+
+_QUOTED = re.compile(r"[\"“]([^\"”]{3,80})[\"”]")
+_CAPITALIZED = re.compile(r"\b[A-Z][\w'-]*(?:\s+(?:of|the|de|and\s+the)?\s*[A-Z][\w'-]*)*")
+_AFTER_TOPIC_WORD = re.compile(r"\b(?:of|about|on|regarding)\s+([a-z][a-z-]*(?:\s+[a-z][a-z-]*){0,3})")
+
+
+def _starts_sentence(text: str, position: int) -> bool:
+    before = text[:position].rstrip()
+    return not before or before[-1] in ".!?:\n"
+
+
+def predict_queries(prompt: str, *, limit: int = 3) -> list[str]:
+    """Likely Wikipedia lookups for a request: quoted titles, capitalized names, then topics after "of"/"about".
+
+    Capitalized words that start a sentence come last, unless they also appear mid-sentence.
+    """
+    candidates: list[str] = [match.group(1).strip() for match in _QUOTED.finditer(prompt)]
+
+    names = list(_CAPITALIZED.finditer(prompt))
+    # A capitalized word that starts a sentence only names something if it also appears mid-sentence
+    mid_sentence = {
+        word for match in names if not _starts_sentence(prompt, match.start()) for word in match.group(0).split()
+    }
+    unsure: list[str] = []  # sentence-initial words, tried last
+    for match in names:
+        words = match.group(0).split()
+        if words[0].casefold() in _COMMON_WORDS:
+            words = words[1:]  # "What Tokyo ..." -> "Tokyo"
+        elif _starts_sentence(prompt, match.start()) and words[0] not in mid_sentence:
+            unsure.append(words[0])
+            words = words[1:]
+        if words and len(" ".join(words)) > 1:
+            candidates.append(" ".join(words))
+
+    for match in _AFTER_TOPIC_WORD.finditer(prompt):
+        phrase: list[str] = []
+        for word in match.group(1).split():
+            if word in _PHRASE_BREAKS:
+                break
+            phrase.append(word)
+        if phrase:
+            candidates.append(" ".join(phrase))
+    candidates.extend(unsure)
+
+    queries: list[str] = []
+    seen: set[str] = set()
+    for candidate in candidates:
+        if candidate.casefold() not in seen:
+            seen.add(candidate.casefold())
+            queries.append(candidate)
+    return queries[:limit]
+
+
+class SpeculativePrefetch:
+    """Middleware that prefetches predicted lookups while the agent's first step can't use `tool`."""
+
+    def __init__(
+        self,
+        tool: CachedWikipediaTool,
+        *,
+        predict: Callable[[str], list[str]] = predict_queries,
+        max_queries: int = 3,
+    ) -> None:
+        self._tool = tool
+        self._predict = predict
+        self._max_queries = max_queries
+
+    def _must_wait(self, event: RequirementAgentStartEvent) -> bool:
+        """Whether the requirements keep the first step from using the tool."""
+        request = event.request
+        if not any(tool.name == self._tool.name for tool in request.allowed_tools):
+            return True
+        forced = request.tool_choice
+        return not isinstance(forced, str) and getattr(forced, "name", None) != self._tool.name
+
+    def bind(self, ctx: RunContext) -> None:
+        keys: list[str] = []
+
+        async def on_start(data: Any, meta: EventMeta) -> None:
+            if not isinstance(data, RequirementAgentStartEvent) or data.state.iteration != 1:
+                return
+            prompt = ctx.run_params.get("prompt")
+            if not isinstance(prompt, str) or not self._must_wait(data):
+                return
+            for query in self._predict(prompt)[: self._max_queries]:
+                key = await self._tool.prefetch(query)
+                if key is not None:
+                    keys.append(key)
+            if keys:
+                logger.debug(f"Prefetching {len(keys)} Wikipedia lookup(s) for {ctx.run_id}")
+
+        async def on_finish(data: Any, meta: EventMeta) -> None:
+            for key in keys:
+                self._tool.discard_prefetch(key)  # no-op for the ones the agent used
+            keys.clear()
+
+        ctx.emitter.on("start", on_start)
+        ctx.emitter.match(
+            lambda event: event.name == "finish" and event.creator is ctx,
+            on_finish,
+            EmitterOptions(match_nested=True),
+        )
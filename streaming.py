@@ -0,0 +1,252 @@
+"""Stream chat and agent runs instead of waiting for the complete answer.
+
+    llm = ChatModel.from_name("watsonx:...", ChatModelParameters(temperature=0, stream=True))
+
+    async for text in stream_chat(llm, messages):
+        print(text, end="", flush=True)
+
+    async for event in stream_run(agent.run(query)):
+        if event.type == "token":
+            print(event.text, end="", flush=True)
+
+Tokens are taken from the model's "new_token" events, so the first one is printed as soon
+as the model sends its first chunk. For agents this means the text of the final answer,
+which arrives either as plain assistant text or as the streamed `response` argument of the
+final_answer tool call. Tool calls (including those of handoff experts) are reported as
+"tool_start" and "tool_end" events, and every stream ends with one "answer" event holding
+the complete result, which also covers answers that were never streamed (e.g. cache hits).
+"""
+
+import asyncio
+import json
+import re
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from beeai_framework.agents import BaseAgent
+from beeai_framework.backend import AnyMessage, AssistantMessage, ChatModel, MessageToolCallContent
+from beeai_framework.backend.events import ChatModelNewTokenEvent
+from beeai_framework.context import Run, RunContext, RunContextFinishEvent, RunContextStartEvent
+from beeai_framework.emitter import Emitter, EventMeta
+from beeai_framework.tools import Tool, ToolOutput
+
+StreamEventType = Literal["token", "tool_start", "tool_end", "answer"]
+
+_STREAM_ID_KEY = "stream_id"
+
+
+@dataclass
+class StreamEvent:
+    type: StreamEventType
+    text: str = ""
+    tool: str | None = None
+    agent: str | None = None  # the agent that called the tool
+    input: Any = None
+    error: str | None = None
+    result: Any = None  # the run's output, set on the "answer" event
+
+
+class PartialJsonField:
+    """Incrementally decodes one string field of a JSON object that arrives in pieces.
+
+    `feed` returns the part of the field's value that became available with the new
+    piece, so `{"response": "Hel` followed by `lo"}` yields "Hel" and then "lo".
+    """
+
+    _ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+    def __init__(self, field: str = "response") -> None:
+        self._key_pattern = re.compile(rf'"{re.escape(field)}"\s*:\s*"')
+        self._buffer = ""
+        self._position: int | None = None  # start of the undecoded part of the value
+        self.done = False
+
+    def feed(self, piece: str) -> str:
+        self._buffer += piece
+        if self.done:
+            return ""
+        if self._position is None:
+            match = self._key_pattern.search(self._buffer)
+            if match is None:
+                return ""
+            self._position = match.end()
+
+        decoded: list[str] = []
+        buffer, position = self._buffer, self._position
+        while position < len(buffer):
+            char = buffer[position]
+            if char == '"':
+                self.done = True
+                break
+            if char != "\\":
+                decoded.append(char)
+                position += 1
+                continue
+
+            if position + 1 >= len(buffer):
+                break  # the escape is split across pieces
+            escape = buffer[position + 1]
+            if escape != "u":
+                decoded.append(self._ESCAPES.get(escape, escape))
+                position += 2
+                continue
+
+            length = 6
+            if len(buffer) >= position + 6 and 0xD800 <= int(buffer[position + 2 : position + 6], 16) < 0xDC00:
+                length = 12  # a surrogate pair is only decodable as a whole
+            if len(buffer) < position + length:
+                break
+            decoded.append(json.loads(f'"{buffer[position : position + length]}"'))
+            position += length
+
+        self._position = position
+        return "".join(decoded)
+
+
+def _answer_text(result: Any) -> str:
+    answer = getattr(result, "answer", None)
+    if answer is not None:
+        return str(answer.text)
+    if hasattr(result, "get_text_content"):
+        return str(result.get_text_content())
+    return str(result)
+
+
+async def stream_run(run: Run[Any]) -> AsyncIterator[StreamEvent]:
+    """Execute an agent or chat model run and yield its tokens and tool steps as they happen.
+
+    The model has to be created with `ChatModelParameters(stream=True)` (or the run started
+    with `stream=True`) for tokens to arrive before the answer is complete. Only tokens of
+    the top-level agent are yielded; nested (handoff) agents contribute tool events only.
+    """
+    queue: asyncio.Queue[StreamEvent | None] = asyncio.Queue()
+    parents: dict[str, str | None] = {}
+    agent_runs: dict[str, str] = {}  # run id -> agent name
+    tool_runs: dict[str, str] = {}  # run id -> tool name
+    root_agent_run: str | None = None
+    final_answers: dict[str, PartialJsonField] = {}  # per model run
+    current_tool: dict[str, str] = {}  # per model run, the tool whose arguments are streaming
+    streamed = False
+
+    def owning_agent(run_id: str | None) -> str | None:
+        while run_id is not None and run_id not in agent_runs:
+            run_id = parents.get(run_id)
+        return run_id
+
+    def put_token(text: str) -> None:
+        nonlocal streamed
+        if text:
+            streamed = True
+            queue.put_nowait(StreamEvent("token", text=text))
+
+    # Handlers are coroutines so the emitter runs them inline, in event order
+    async def on_run_event(data: Any, meta: EventMeta) -> None:
+        nonlocal root_agent_run
+        assert meta.trace is not None and isinstance(meta.creator, RunContext)
+        run_id, instance = meta.trace.run_id, meta.creator.instance
+        if meta.name == "start":
+            parents[run_id] = meta.trace.parent_run_id
+            if isinstance(instance, BaseAgent):
+                # Handoff experts are named after the tool that consulted them
+                agent_runs[run_id] = tool_runs.get(meta.trace.parent_run_id or "", instance.meta.name)
+                root_agent_run = root_agent_run or run_id
+            elif isinstance(instance, Tool):
+                tool_runs[run_id] = instance.name
+
+        if not isinstance(instance, Tool) or instance.name == "final_answer":
+            return
+        agent_run = owning_agent(meta.trace.parent_run_id)
+        agent = agent_runs.get(agent_run) if agent_run else None
+        if meta.name == "start" and isinstance(data, RunContextStartEvent):
+            queue.put_nowait(StreamEvent("tool_start", tool=instance.name, agent=agent, input=data.input.get("input")))
+        elif meta.name == "finish" and isinstance(data, RunContextFinishEvent):
+            output = data.output.get_text_content() if isinstance(data.output, ToolOutput) else ""
+            error = data.error.explain() if data.error is not None else None
+            queue.put_nowait(StreamEvent("tool_end", text=output, tool=instance.name, agent=agent, error=error))
+
+    async def on_new_token(data: Any, meta: EventMeta) -> None:
+        if not isinstance(data, ChatModelNewTokenEvent) or meta.trace is None:
+            return
+        run_id = meta.trace.run_id
+        if root_agent_run is not None and owning_agent(run_id) != root_agent_run:
+            return
+
+        for message in data.value.messages:
+            if not isinstance(message, AssistantMessage):
+                continue
+            for content in message.content:
+                if not isinstance(content, MessageToolCallContent):
+                    put_token(getattr(content, "text", ""))
+                    continue
+                if content.tool_name:
+                    current_tool[run_id] = content.tool_name
+                if current_tool.get(run_id) == "final_answer":
+                    put_token(final_answers.setdefault(run_id, PartialJsonField()).feed(content.args or ""))
+
+    async def execute() -> Any:
+        try:
+            return await run
+        finally:
+            queue.put_nowait(None)
+
+    # A run's emitter only sees its direct children, so events of nested (handoff) agents are
+    # picked up from the root emitter, by a context key that every nested run inherits
+    stream_id = str(uuid.uuid4())
+    run.context({_STREAM_ID_KEY: stream_id})
+    cleanups = [
+        Emitter.root().match(
+            lambda event: event.name in ("start", "finish")
+            and bool(event.context.get("internal"))
+            and isinstance(event.creator, RunContext)
+            and event.context.get(_STREAM_ID_KEY) == stream_id,
+            on_run_event,
+        ),
+        Emitter.root().match(
+            lambda event: event.name == "new_token" and event.context.get(_STREAM_ID_KEY) == stream_id,
+            on_new_token,
+        ),
+    ]
+
+    task = asyncio.create_task(execute())
+    try:
+        while (event := await queue.get()) is not None:
+            yield event
+        result = await task
+    finally:
+        # The consumer may stop early; don't leave the run going in the background
+        task.cancel()
+        for cleanup in cleanups:
+            cleanup()
+
+    text = _answer_text(result)
+    if not streamed:
+        yield StreamEvent("token", text=text)
+    yield StreamEvent("answer", text=text, result=result)
+
+
+async def stream_chat(llm: ChatModel, messages: list[AnyMessage], **kwargs: Any) -> AsyncIterator[str]:
+    """Yield the text of a chat completion piece by piece."""
+    async for event in stream_run(llm.create(messages=messages, stream=True, **kwargs)):
+        if event.type == "token":
+            yield event.text
+
+
+async def print_stream(run: Run[Any], *, title: str | None = None, show_tools: bool = True) -> Any:
+    """Print a run's answer as it streams in, with a line per tool step; returns the run's output."""
+    if title is not None:
+        print(title)
+    result = None
+    async for event in stream_run(run):
+        if event.type == "token":
+            print(event.text, end="", flush=True)
+        elif event.type == "tool_start" and show_tools:
+            caller = f"{event.agent} → " if event.agent else ""
+            print(f"🛠️ {caller}{event.tool} ...", flush=True)
+        elif event.type == "tool_end" and show_tools and event.error is not None:
+            print(f"⚠️ {event.tool} failed: {event.error.splitlines()[0]}", flush=True)
+        elif event.type == "answer":
+            print()
+            result = event.result
+    return result
@@ -0,0 +1,220 @@
+"""Stream structured (Pydantic) outputs field by field instead of waiting for the whole object.
+
+    stream = stream_structure(llm, schema=BusinessPlan, messages=messages)
+    async for field in stream:
+        print(field.name, field.index, field.value)   # e.g. "revenue_streams", 0, "Commissions"
+    plan = stream.result                              # the validated BusinessPlan
+
+Each top-level field is yielded, and validated against its annotation, as soon as its JSON
+value is complete; items of list fields are yielded one by one before the list itself. The
+JSON schema and the per-field validators are built once per model class and reused.
+"""
+
+import functools
+import json
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import Annotated, Any, Generic, TypeVar, get_args, get_origin
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from beeai_framework.adapters.litellm.utils import to_strict_json_schema
+from beeai_framework.backend import AnyMessage, ChatModel
+from beeai_framework.backend.utils import parse_broken_json
+from streaming import stream_chat
+
+T = TypeVar("T", bound=BaseModel)
+
+
+@dataclass
+class FieldEvent:
+    name: str
+    value: Any
+    index: int | None = None  # position within a list field, None for the complete field
+    error: str | None = None  # validation error; `value` is then the raw JSON value
+
+
+@dataclass(frozen=True)
+class CompiledSchema(Generic[T]):
+    """Response format and validators derived from a model class, see `compile_schema`."""
+
+    model: type[T]
+    response_format: dict[str, Any]
+    fields: dict[str, TypeAdapter[Any]] = field(default_factory=dict)
+    items: dict[str, TypeAdapter[Any]] = field(default_factory=dict)
+
+    def validate_field(self, name: str, value: Any, index: int | None = None) -> FieldEvent:
+        adapter = self.fields.get(name) if index is None else self.items.get(name)
+        if adapter is None:
+            if name in self.fields:
+                return FieldEvent(name, value, index)  # items of a non-list field, validated with the field
+            return FieldEvent(name, value, index, error=f"'{name}' is not a field of {self.model.__name__}")
+        try:
+            return FieldEvent(name, adapter.validate_python(value), index)
+        except ValidationError as e:
+            return FieldEvent(name, value, index, error=str(e))
+
+
+@functools.lru_cache(maxsize=128)
+def compile_schema(model: type[T], *, strict_schema: bool = True, strict: bool = True) -> CompiledSchema[T]:
+    """Build (once per model class and options) the response format and field validators."""
+    json_schema = to_strict_json_schema(model) if strict_schema else model.model_json_schema()
+    fields: dict[str, TypeAdapter[Any]] = {}
+    items: dict[str, TypeAdapter[Any]] = {}
+    for name, info in model.model_fields.items():
+        key = info.alias or name
+        annotation = Annotated[info.annotation, *info.metadata] if info.metadata else info.annotation
+        fields[key] = TypeAdapter(annotation)
+        if get_origin(info.annotation) is list and get_args(info.annotation):
+            items[key] = TypeAdapter(get_args(info.annotation)[0])
+
+    return CompiledSchema(
+        model=model,
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"schema": json_schema, "name": model.__name__, "strict": strict},
+        },
+        fields=fields,
+        items=items,
+    )
+
+
+class IncrementalJsonParser:
+    """Scans a JSON object as it arrives and reports each completed top-level value.
+
+    `feed` returns `(key, index, value)` tuples: `index` is None for a complete top-level
+    field and the item position for each completed item of a top-level array. Every
+    character is scanned once, however the text is split.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = ""
+        self._position = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = False
+        self._awaiting_value = False
+        self._awaiting_item = False
+        self._key: str | None = None
+        self._value_start: int | None = None
+        self._item_start: int | None = None
+        self._item_index = 0
+
+    @property
+    def _in_top_array(self) -> bool:
+        return self._stack == ["{", "["]
+
+    def _complete_value(self, end: int, completed: list[tuple[str, int | None, Any]]) -> None:
+        assert self._key is not None and self._value_start is not None
+        completed.append((self._key, None, json.loads(self._buffer[self._value_start : end])))
+        self._value_start = None
+
+    def _complete_item(self, end: int, completed: list[tuple[str, int | None, Any]]) -> None:
+        assert self._key is not None and self._item_start is not None
+        completed.append((self._key, self._item_index, json.loads(self._buffer[self._item_start : end])))
+        self._item_start = None
+        self._item_index += 1
+
+    def feed(self, text: str) -> list[tuple[str, int | None, Any]]:
+        self._buffer += text
+        completed: list[tuple[str, int | None, Any]] = []
+        buffer = self._buffer
+
+        for position in range(self._position, len(buffer)):
+            char = buffer[position]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    depth = len(self._stack)
+                    if depth == 1 and self._expect_key:
+                        self._key = json.loads(buffer[self._string_start : position + 1])
+                        self._expect_key = False
+                    elif depth == 1 and self._value_start == self._string_start:
+                        self._complete_value(position + 1, completed)
+                    elif self._in_top_array and self._item_start == self._string_start:
+                        self._complete_item(position + 1, completed)
+                continue
+            if char.isspace():
+                continue
+
+            depth = len(self._stack)
+            if depth == 1 and self._awaiting_value:
+                self._value_start, self._awaiting_value = position, False
+            elif self._in_top_array and self._awaiting_item and char != "]":
+                self._item_start, self._awaiting_item = position, False
+
+            if char == '"':
+                self._in_string, self._string_start = True, position
+            elif char in "{[":
+                self._stack.append(char)
+                if len(self._stack) == 1:
+                    self._expect_key = char == "{"
+                elif self._in_top_array:
+                    self._awaiting_item, self._item_index = True, 0
+            elif char in "}]":
+                # A number or literal is terminated by the bracket that closes its container
+                if self._in_top_array and self._item_start is not None:
+                    self._complete_item(position, completed)
+                elif depth == 1 and self._value_start is not None:
+                    self._complete_value(position, completed)
+                self._stack.pop()
+                if self._in_top_array and self._item_start is not None:
+                    self._complete_item(position + 1, completed)
+                elif len(self._stack) == 1 and self._value_start is not None:
+                    self._complete_value(position + 1, completed)
+            elif char == ",":
+                if depth == 1:
+                    if self._value_start is not None:
+                        self._complete_value(position, completed)
+                    self._expect_key = True
+                elif self._in_top_array:
+                    if self._item_start is not None:
+                        self._complete_item(position, completed)
+                    self._awaiting_item = True
+            elif char == ":" and depth == 1:
+                self._awaiting_value = True
+
+        self._position = len(buffer)
+        return completed
+
+    @property
+    def text(self) -> str:
+        return self._buffer
+
+
+class StructureStream(Generic[T]):
+    """Async iterator over the fields of a structured response; `result` holds the validated model afterwards."""
+
+    def __init__(self, llm: ChatModel, *, schema: type[T], messages: list[AnyMessage], **kwargs: Any) -> None:
+        self._llm = llm
+        self._schema = compile_schema(
+            schema, strict_schema=llm.use_strict_tool_schema, strict=llm.use_strict_model_schema
+        )
+        self._messages = messages
+        self._kwargs = kwargs
+        self.result: T | None = None
+        self.text = ""
+
+    async def __aiter__(self) -> AsyncIterator[FieldEvent]:
+        parser = IncrementalJsonParser()
+        async for text in stream_chat(
+            self._llm, self._messages, response_format=self._schema.response_format, **self._kwargs
+        ):
+            for name, index, value in parser.feed(text):
+                yield self._schema.validate_field(name, value, index)
+
+        self.text = parser.text
+        self.result = self._schema.model.model_validate(parse_broken_json(parser.text))
+
+
+def stream_structure(
+    llm: ChatModel, *, schema: type[T], messages: list[AnyMessage], **kwargs: Any
+) -> StructureStream[T]:
+    """Like `llm.create_structure(...)`, but the completed fields can be consumed while the rest is generated."""
+    return StructureStream(llm, schema=schema, messages=messages, **kwargs)
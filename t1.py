@@ -45,4 +45,27 @@ os.environ["WATSONX_PROJECT_ID"] = "skills-network"
 # OPENAI_API_KEY=your-openai-api-key
 # OPENAI_API_HEADERS="secret-header=1234"
 
-print("Environment configured successfully!")
\ No newline at end of file
+########################
+### Validate the configuration once, up front
+########################
+
+# Problems are reported here, once, instead of on the first model call.
+# The watsonx access token is fetched now and cached (with its expiry) in
+# .cache/credentials.json, so the example scripts, including ones running
+# at the same time, reuse it instead of each exchanging the API key again.
+
+from credential_cache import use_cached_watsonx_token, validate_watsonx_config
+
+problems = validate_watsonx_config()
+for problem in problems:
+    print(f"⚠️ {problem}")
+
+token_provider = use_cached_watsonx_token(refresh_in_background=False)
+if token_provider is not None and not token_provider.load():
+    try:
+        token_provider.refresh()
+    except Exception as e:
+        print(f"⚠️ Could not fetch a watsonx access token yet ({e}); it will be fetched on first use.")
+
+if not problems:
+    print("Environment configured successfully!")
\ No newline at end of file
@@ -2,22 +2,29 @@ import asyncio
 import logging
 from beeai_framework.agents.experimental import RequirementAgent
 from beeai_framework.agents.experimental.requirements.conditional import ConditionalRequirement
-from beeai_framework.agents.experimental.requirements.ask_permission import AskPermissionRequirement
 from beeai_framework.memory import UnconstrainedMemory
-from beeai_framework.backend import ChatModel, ChatModelParameters
+from beeai_framework.backend import ChatModelParameters
 from beeai_framework.tools.think import ThinkTool
 from beeai_framework.tools.search.wikipedia import WikipediaTool
-from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
-from beeai_framework.tools import Tool
+from approvals import ApprovalPolicy, ApprovalRequirement
+from compiled_requirements import compile_requirements
+from model_registry import chat_model
+from response_cache import CachedChatModel
+from semantic_cache import SemanticCache
+from streaming import print_stream
+from trace_recorder import TraceRecorder
+from wikipedia_index import wikipedia_tool
 
 async def production_security_example():
     """
     Production-Ready RequirementAgent with Security Approval
     
-    AskPermissionRequirement adds human-in-the-loop security controls.
+    ApprovalRequirement adds human-in-the-loop security controls,
+    decided by approvals.toml where it can be.
     Same query, same tracking - but now with approval workflow.
     """
-    llm = ChatModel.from_name("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+    # SAME cached model as previous examples
+    llm = CachedChatModel(chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True)))
     
     # SAME SYSTEM PROMPT as all previous examples
     SYSTEM_INSTRUCTIONS = """You are an expert cybersecurity analyst specializing in threat assessment and risk analysis.
@@ -28,15 +35,19 @@ Your methodology:
 3. Provide comprehensive risk assessment with actionable recommendations
 4. Focus on practical, implementable security measures"""
     
+    # SAME trace recorder setup as previous examples
+    trace_recorder = TraceRecorder()
+    
     # Production-grade RequirementAgent with security approval
+    tools = [ThinkTool(), wikipedia_tool()]
     secure_agent = RequirementAgent(
         llm=llm,
-        tools=[ThinkTool(), WikipediaTool()],
+        tools=tools,
         memory=UnconstrainedMemory(),
         instructions=SYSTEM_INSTRUCTIONS,
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
+        middlewares=[trace_recorder, SemanticCache(namespace="t10-secure")],
         
-        requirements=[
+        requirements=compile_requirements(tools, [
             # Same systematic thinking requirement
             ConditionalRequirement(
                 ThinkTool,
@@ -45,9 +56,11 @@ Your methodology:
                 max_invocations=2,
                 consecutive_allowed=False
             ),
-            # SECURITY: Permission required for external access
-            AskPermissionRequirement(
+            # SECURITY: Permission required for external access, unless approvals.toml
+            # allows it; the user is asked once per session
+            ApprovalRequirement(
                 WikipediaTool,
+                policy=ApprovalPolicy.load(),
             ),
             # Same control after permission granted
             ConditionalRequirement(
@@ -56,15 +69,15 @@ Your methodology:
                 min_invocations=0,  # Optional after approval
                 max_invocations=1  # Limited even after approval
             )
-        ]
+        ])
     )
     
     # SAME QUERY as all previous examples
     ANALYSIS_QUERY = """Analyze the cybersecurity risks of quantum computing for financial institutions. 
     What are the main threats, timeline for concern, and recommended preparation strategies?"""
     
-    result = await secure_agent.run(ANALYSIS_QUERY)
-    print(f"\n🛡️ Security-Approved Analysis:\n{result.answer.text}")
+    await print_stream(secure_agent.run(ANALYSIS_QUERY), title="\n🛡️ Security-Approved Analysis:")
+    print(f"\n⏱️ Latency summary:\n{trace_recorder.report()}")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
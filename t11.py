@@ -1,14 +1,186 @@
 import asyncio
 import logging
 from beeai_framework.agents.experimental import RequirementAgent
-from beeai_framework.memory import UnconstrainedMemory
 from beeai_framework.tools import StringToolOutput, Tool, ToolRunOptions
 from beeai_framework.context import RunContext
 from beeai_framework.emitter import Emitter
-from beeai_framework.backend import ChatModel, ChatModelParameters
-from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
+from beeai_framework.backend import ChatModelParameters
 from pydantic import BaseModel, Field
-from typing import Any
+from bounded_memory import TokenBudgetMemory
+from concurrent_tools import ConcurrentToolCalls
+from model_registry import chat_model, shared_models
+from model_router import CascadeChatModel
+from semantic_cache import SemanticCache
+from streaming import print_stream
+from trace_recorder import TraceRecorder
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from types import CodeType
+from typing import Any, Iterable
+import ast
+import re
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for the batch calculator API
+    np = None
+
+# === ARITHMETIC ENGINE ===
+
+_OPERATION_NAMES = {ast.Add: "Addition", ast.Sub: "Subtraction", ast.Mult: "Multiplication", ast.Div: "Division"}
+_NO_BUILTINS = {"__builtins__": {}}
+_NUMBER_PATTERN = re.compile(r"(?<![\w.])(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+_PLACEHOLDER_PATTERN = re.compile(r"_c\d+")
+_RESERVED_NAME_PATTERN = re.compile(r"(?<!\w)_\w*")
+_NOT_ALLOWED = "Only numbers and basic operators (+, -, *, /, parentheses) are allowed"
+
+class _ArithmeticValidator(ast.NodeVisitor):
+    """Rejects every syntax node that is not plain arithmetic on operands; collects named operands."""
+
+    def __init__(self) -> None:
+        self.names: set[str] = set()
+
+    def visit_Expression(self, node: ast.Expression) -> None:
+        self.visit(node.body)
+
+    def visit_BinOp(self, node: ast.BinOp) -> None:
+        if type(node.op) not in _OPERATION_NAMES:
+            raise ValueError(_NOT_ALLOWED)
+        self.visit(node.left)
+        self.visit(node.right)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> None:
+        if not isinstance(node.op, (ast.UAdd, ast.USub)):
+            raise ValueError(_NOT_ALLOWED)
+        self.visit(node.operand)
+
+    def visit_Name(self, node: ast.Name) -> None:
+        if _PLACEHOLDER_PATTERN.fullmatch(node.id):
+            return
+        if node.id.startswith("_"):
+            raise ValueError(f"Unknown name '{node.id}' in arithmetic expression")
+        self.names.add(node.id)
+
+    def generic_visit(self, node: ast.AST) -> None:
+        raise ValueError(_NOT_ALLOWED)
+
+@dataclass(frozen=True)
+class _ExpressionShape:
+    code: CodeType
+    variables: tuple[str, ...]
+    operation: str
+
+def _split_constants(expression: str) -> tuple[str, list[float]]:
+    """Replace numeric literals with positional operands, e.g. "15 + 27" -> ("_c0+_c1", [15.0, 27.0])."""
+    reserved = _RESERVED_NAME_PATTERN.search(expression)
+    if reserved:
+        raise ValueError(f"Unknown name '{reserved.group()}' in arithmetic expression")
+    constants: list[float] = []
+
+    def to_operand(match: re.Match) -> str:
+        constants.append(float(match.group()))
+        return f"_c{len(constants) - 1}"
+
+    return _NUMBER_PATTERN.sub(to_operand, "".join(expression.split())), constants
+
+@lru_cache(maxsize=1024)
+def _compile_shape(shape: str) -> _ExpressionShape:
+    """Parse, validate and compile an expression shape; expressions differing only in numbers share it."""
+    try:
+        tree = ast.parse(shape, mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid arithmetic expression: {e.msg}")
+    validator = _ArithmeticValidator()
+    validator.visit(tree)
+
+    # The outermost operator is the one evaluated last, so it names the operation
+    root = tree.body
+    operation = _OPERATION_NAMES[type(root.op)] if isinstance(root, ast.BinOp) else "Basic Arithmetic"
+    return _ExpressionShape(compile(tree, "<calculator>", "eval"), tuple(sorted(validator.names)), operation)
+
+def _require_numpy() -> Any:
+    if np is None:
+        raise ModuleNotFoundError("Optional module [numpy] not found.\nRun 'pip install numpy' to install.")
+    return np
+
+@dataclass(frozen=True)
+class CompiledExpression:
+    """An arithmetic expression parsed and validated once, ready to be evaluated repeatedly."""
+    source: str
+    code: CodeType
+    constants: dict[str, float]
+    variables: tuple[str, ...]
+    operation: str
+    value: float | None = None  # precomputed result for expressions without variables
+
+    def evaluate(self, **operands: Any) -> Any:
+        if self.value is not None:
+            return self.value
+        missing = [name for name in self.variables if name not in operands]
+        if missing:
+            raise ValueError(f"Missing operands: {', '.join(missing)}")
+        try:
+            return eval(self.code, _NO_BUILTINS, {**self.constants, **{name: operands[name] for name in self.variables}})
+        except ZeroDivisionError:
+            raise ValueError("Division by zero is not allowed")
+
+@lru_cache(maxsize=1024)
+def compile_expression(expression: str) -> CompiledExpression:
+    """Compile an arithmetic expression (memoized per expression, with code shared per shape)."""
+    shape_key, constants = _split_constants(expression)
+    shape = _compile_shape(shape_key)
+    compiled = CompiledExpression(
+        source=expression,
+        code=shape.code,
+        constants={f"_c{i}": value for i, value in enumerate(constants)},
+        variables=shape.variables,
+        operation=shape.operation,
+    )
+    if shape.variables:
+        return compiled
+
+    # Constant expressions are pure, so the result itself is memoized along with the code
+    return replace(compiled, value=float(compiled.evaluate()))
+
+def evaluate_many(expressions: Iterable[str]) -> Any:
+    """Evaluate many constant expressions with NumPy, one vectorized call per expression shape.
+
+    Expressions that differ only in their numbers (e.g. "15 + 27" and "8 + 9") are parsed and
+    compiled once and evaluated together over arrays of operands. Divisions by zero yield NaN.
+    """
+    numpy = _require_numpy()
+    expressions = list(expressions)
+    results = numpy.empty(len(expressions), dtype=float)
+
+    groups: dict[str, tuple[list[int], list[list[float]]]] = {}
+    for index, expression in enumerate(expressions):
+        shape_key, constants = _split_constants(expression)
+        indices, rows = groups.setdefault(shape_key, ([], []))
+        indices.append(index)
+        rows.append(constants)
+
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        for shape_key, (indices, rows) in groups.items():
+            try:
+                shape = _compile_shape(shape_key)
+                if shape.variables:
+                    raise ValueError(f"Unknown name '{shape.variables[0]}' in arithmetic expression")
+            except ValueError as e:
+                raise ValueError(f"{e} (in {expressions[indices[0]]!r})")
+            columns = numpy.array(rows, dtype=float).T
+            operands = {f"_c{i}": column for i, column in enumerate(columns)}
+            results[indices] = eval(shape.code, _NO_BUILTINS, operands)
+
+    results[numpy.isinf(results)] = numpy.nan
+    return results
+
+def evaluate_vectorized(expression: str, **operands: Any) -> Any:
+    """Evaluate one expression with named operands over whole NumPy arrays, e.g. ("a * b + 1", a=..., b=...)."""
+    numpy = _require_numpy()
+    compiled = compile_expression(expression)
+    arrays = {name: numpy.asarray(value, dtype=float) for name, value in operands.items()}
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        return numpy.asarray(compiled.evaluate(**arrays), dtype=float)
 
 # === REAL TOOL CREATION WITH OFFICIAL BEEAI TOOLS ===
 
@@ -31,24 +203,20 @@ class SimpleCalculatorTool(Tool[CalculatorInput, ToolRunOptions, StringToolOutpu
             creator=self,
         )
 
-    def _safe_calculate(self, expression: str) -> float:
-        """Safely evaluate basic arithmetic expressions."""
-        # Remove spaces for processing
-        expr = expression.replace(' ', '')
-        
-        # Only allow numbers, basic operators, parentheses, and decimal points
-        allowed_chars = set('0123456789+-*/().')
-        if not all(c in allowed_chars for c in expr):
-            raise ValueError("Only numbers and basic operators (+, -, *, /, parentheses) are allowed")
-        
-        try:
-            # Use eval with restricted environment for basic arithmetic only
-            result = eval(expr, {"__builtins__": {}}, {})
-            return float(result)
-        except ZeroDivisionError:
-            raise ValueError("Division by zero is not allowed")
-        except Exception as e:
-            raise ValueError(f"Invalid arithmetic expression: {str(e)}")
+    def _safe_calculate(self, expression: str) -> CompiledExpression:
+        """Safely compile (or fetch from cache) a basic arithmetic expression."""
+        compiled = compile_expression(expression.strip())
+        if compiled.variables:
+            raise ValueError(f"Unknown name '{compiled.variables[0]}' in arithmetic expression")
+        return compiled
+
+    def calculate_many(self, expressions: Iterable[str]) -> Any:
+        """Evaluate many expressions in one batch (requires NumPy)."""
+        return evaluate_many(expressions)
+
+    def calculate_vectorized(self, expression: str, **operands: Any) -> Any:
+        """Evaluate one expression over arrays of operands (requires NumPy)."""
+        return evaluate_vectorized(expression, **operands)
 
     async def _run(
         self, input: CalculatorInput, options: ToolRunOptions | None, context: RunContext
@@ -58,24 +226,15 @@ class SimpleCalculatorTool(Tool[CalculatorInput, ToolRunOptions, StringToolOutpu
             expression = input.expression.strip()
             
             # Perform calculation
-            result = self._safe_calculate(expression)
+            compiled = self._safe_calculate(expression)
             
             # Format result
             output = f"🧮 Simple Calculator\n"
             output += f"Expression: {expression}\n"
-            output += f"Result: {result}\n"
+            output += f"Result: {compiled.value}\n"
             
-            # Add operation type hint
-            if '+' in expression:
-                output += "Operation: Addition"
-            elif '-' in expression:
-                output += "Operation: Subtraction"
-            elif '*' in expression:
-                output += "Operation: Multiplication"
-            elif '/' in expression:
-                output += "Operation: Division"
-            else:
-                output += "Operation: Basic Arithmetic"
+            # Operation type comes from the outermost operator in the parse tree
+            output += f"Operation: {compiled.operation}"
             
             return StringToolOutput(output)
             
@@ -87,19 +246,35 @@ class SimpleCalculatorTool(Tool[CalculatorInput, ToolRunOptions, StringToolOutpu
 async def calculator_agent_example():
     """RequirementAgent with SimpleCalculatorTool - Interactive Math Assistant"""
     
-    llm = ChatModel.from_name("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+    # Several expressions in one question become parallel calls, evaluated concurrently by ConcurrentToolCalls
+    # Simple arithmetic doesn't need the large model: Granite answers first, and Llama 4 Maverick
+    # only takes over when Granite's response fails a check (e.g. an invalid calculator call)
+    llm = CascadeChatModel([
+        chat_model("watsonx:ibm/granite-3-3-8b-instruct", ChatModelParameters(temperature=0, stream=True), allow_parallel_tool_calls=True),
+        chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True), allow_parallel_tool_calls=True),
+    ])
+    
+    trace_recorder = TraceRecorder()
     
     # Create calculator agent with our custom tool
+    # The agent answers query after query, so its memory keeps a fixed token budget instead of growing forever.
+    # The questions don't build on each other, so repeated ones are answered from the semantic cache even
+    # with earlier turns in memory. With the default hashing embedder that covers rewordings such as
+    # "What's 15 plus 27?" for "What is 15 + 27?", not paraphrases like "Add 15 and 27"; those need
+    # SemanticCache(embedder=ModelEmbedder(EmbeddingModel.from_name("ollama:nomic-embed-text")), match_words=False)
     calculator_agent = RequirementAgent(
         llm=llm,
         tools=[SimpleCalculatorTool()],
-        memory=UnconstrainedMemory(),
+        memory=TokenBudgetMemory(max_tokens=4000),
         instructions="""You are a helpful math assistant. When users ask for calculations, 
         use the SimpleCalculator tool to provide accurate results. 
         Always show both the expression and the calculated result.""",
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
+        middlewares=[trace_recorder, SemanticCache(namespace="t11-calculator", ignore_history=True), ConcurrentToolCalls()],
     )
     
+    # Open the connection and authenticate up front, so the first question doesn't pay for it
+    await shared_models.warmup()
+    
     # Interactive examples - simulating human input
     math_queries = [
         "What is 15 + 27?",
@@ -110,8 +285,9 @@ async def calculator_agent_example():
     
     for query in math_queries:
         print(f"\n👤 Human: {query}")
-        result = await calculator_agent.run(query)
-        print(f"🤖 Agent: {result.answer.text}")
+        await print_stream(calculator_agent.run(query), title="🤖 Agent:")
+    
+    print(f"\n⏱️ Latency summary:\n{trace_recorder.report()}")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
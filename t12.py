@@ -2,39 +2,44 @@ import asyncio
 import logging
 from beeai_framework.agents.experimental import RequirementAgent
 from beeai_framework.agents.experimental.requirements.conditional import ConditionalRequirement
-from beeai_framework.agents.experimental.requirements.ask_permission import AskPermissionRequirement
-from beeai_framework.memory import UnconstrainedMemory
 from beeai_framework.backend import ChatModel, ChatModelParameters
 from beeai_framework.tools.search.wikipedia import WikipediaTool
 from beeai_framework.tools.weather import OpenMeteoTool
 from beeai_framework.tools.think import ThinkTool
 from beeai_framework.tools.handoff import HandoffTool
-from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
-from beeai_framework.tools import Tool
+from approvals import ApprovalPolicy, ApprovalRequirement
+from bounded_memory import TokenBudgetMemory
+from checkpoints import setup_checkpoint, shared_checkpointer
+from compiled_requirements import compile_requirements
+from model_registry import chat_model, shared_models
+from parallel_handoff import ParallelHandoffTool
+from speculative_prefetch import SpeculativePrefetch
+from streaming import print_stream
+from trace_recorder import TraceRecorder
+from wikipedia_index import wikipedia_tool
+from weather_cache import CachedOpenMeteoTool
 
-async def multi_agent_travel_planner_with_language():
-    """
-    Advanced Multi-Agent Travel Planning System with Language Expert
+def create_travel_coordinator(
+    llm: ChatModel, trace_recorder: TraceRecorder, weather_tool: CachedOpenMeteoTool
+) -> RequirementAgent:
+    """The travel coordinator with its three expert agents, also served by agent_server.py."""
+    # Every agent below keeps a bounded memory: long Wikipedia and weather results are
+    # compacted once they fall out of the recent turns, so handoffs stay within budget
     
-    This system demonstrates:
-    1. Specialized agent roles and coordination
-    2. Tool-based inter-agent communication
-    3. Requirements-based execution control
-    4. Language and cultural expertise integration
-    5. Comprehensive travel planning workflow
-    """
-    
-    # Initialize the language model
-    llm = ChatModel.from_name(
-        "watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", 
-        ChatModelParameters(temperature=0)
-    )
+    # Each agent's requirements are compiled when it is built, so contradictory rules fail
+    # here instead of after the first LLM calls. The experts' first step is forced thinking,
+    # during which their likely Wikipedia lookups are prefetched
+
+    # All four agents are checkpointed after every step while a checkpoint id is set, so a
+    # plan interrupted halfway resumes with the experts' finished work
     
     # === AGENT 1: DESTINATION RESEARCH EXPERT ===
+    destination_wikipedia = wikipedia_tool()
+    destination_tools = [destination_wikipedia, ThinkTool()]
     destination_expert = RequirementAgent(
         llm=llm,
-        tools=[WikipediaTool(), ThinkTool()],
-        memory=UnconstrainedMemory(),
+        tools=destination_tools,
+        memory=TokenBudgetMemory(max_tokens=8000),
         instructions="""You are a Destination Research Expert specializing in comprehensive travel destination analysis.
 
         Your expertise:
@@ -44,8 +49,8 @@ async def multi_agent_travel_planner_with_language():
         - Safety considerations and travel advisories
 
         Always provide detailed, factual information with clear source attribution.""",
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
-        requirements=[
+        middlewares=[trace_recorder, shared_checkpointer, SpeculativePrefetch(destination_wikipedia)],
+        requirements=compile_requirements(destination_tools, [
             ConditionalRequirement(
                 ThinkTool,
                 force_at_step=1,
@@ -60,14 +65,15 @@ async def multi_agent_travel_planner_with_language():
                 max_invocations=4,
                 consecutive_allowed=False
             ),
-        ]
+        ])
     )
     
     # === AGENT 2: TRAVEL METEOROLOGIST ===
+    weather_tools = [weather_tool, ThinkTool()]
     travel_meteorologist = RequirementAgent(
         llm=llm,
-        tools=[OpenMeteoTool(), ThinkTool()],
-        memory=UnconstrainedMemory(),
+        tools=weather_tools,
+        memory=TokenBudgetMemory(max_tokens=8000),
         instructions="""You are a Travel Meteorologist specializing in weather analysis for travel planning.
 
         Your expertise:
@@ -79,8 +85,8 @@ async def multi_agent_travel_planner_with_language():
         - Weather-related travel risks and precautions
 
         Focus on actionable weather guidance for travelers.""",
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
-        requirements=[
+        middlewares=[trace_recorder, shared_checkpointer],
+        requirements=compile_requirements(weather_tools, [
             ConditionalRequirement(
                 ThinkTool,
                 force_at_step=1,
@@ -93,14 +99,16 @@ async def multi_agent_travel_planner_with_language():
                 min_invocations=1,
                 max_invocations=1
             )
-        ]
+        ])
     )
     
     # === AGENT 3: LANGUAGE & CULTURAL EXPERT ===
+    language_wikipedia = wikipedia_tool()  # Reuses pages the destination expert already looked up
+    language_tools = [language_wikipedia, ThinkTool()]
     language_and_culture_expert = RequirementAgent(
         llm=llm,
-        tools=[WikipediaTool(), ThinkTool()],
-        memory=UnconstrainedMemory(),
+        tools=language_tools,
+        memory=TokenBudgetMemory(max_tokens=8000),
         instructions="""You are a Language & Cultural Expert specializing in linguistic and cultural guidance for travelers.
 
         Your expertise:
@@ -113,8 +121,8 @@ async def multi_agent_travel_planner_with_language():
         - Dining customs, tipping practices, and social interactions
 
         Always emphasize cultural sensitivity and respectful travel practices.""",
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
-        requirements=[
+        middlewares=[trace_recorder, shared_checkpointer, SpeculativePrefetch(language_wikipedia)],
+        requirements=compile_requirements(language_tools, [
             ConditionalRequirement(
                 ThinkTool,
                 force_at_step=1,
@@ -122,7 +130,7 @@ async def multi_agent_travel_planner_with_language():
                 max_invocations=3,
                 consecutive_allowed=False
             ),
-        ]
+        ])
     )
     
     # === AGENT 4: TRAVEL COORDINATOR (MAIN INTERFACE) ===
@@ -143,10 +151,21 @@ async def multi_agent_travel_planner_with_language():
         description="Consult our Language & Cultural Expert for essential phrases, cultural etiquette, and communication guidance for respectful travel."
     )
     
-    travel_coordinator = RequirementAgent(
+    # The three experts don't depend on each other, so the coordinator can consult them
+    # all at once; a slow expert times out instead of holding up the whole plan
+    consult_experts = ParallelHandoffTool(
+        [handoff_to_destination, handoff_to_weather, handoff_to_language],
+        name="ConsultExperts",
+        timeout=120,
+        timeouts={"WeatherPlanning": 60},
+        min_successful=2,
+    )
+    
+    coordinator_tools = [consult_experts, handoff_to_destination, handoff_to_weather, handoff_to_language, ThinkTool()]
+    return RequirementAgent(
         llm=llm,
-        tools=[handoff_to_destination, handoff_to_weather, handoff_to_language, ThinkTool()],
-        memory=UnconstrainedMemory(),
+        tools=coordinator_tools,
+        memory=TokenBudgetMemory(max_tokens=8000),
         instructions="""You are the Travel Coordinator, the main interface for comprehensive travel planning.
 
         Your role:
@@ -163,27 +182,76 @@ async def multi_agent_travel_planner_with_language():
 
         Coordination Process:
         1. Think about what information is needed for comprehensive travel planning
-        2. Delegate specific queries to appropriate expert agents using handoff tools
+        2. Delegate specific queries to appropriate expert agents - send independent queries together in a single ConsultExperts call, use the individual handoff tools only for follow-up questions
         3. Gather insights from multiple specialists
         4. Synthesize information into cohesive travel recommendations
         5. Provide a complete travel planning summary
 
         Always ensure travelers receive well-rounded guidance covering destinations and landmarks, weather, and cultural considerations.""",
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
-        requirements=[
+        middlewares=[trace_recorder, shared_checkpointer],
+        requirements=compile_requirements(coordinator_tools, [
             ConditionalRequirement(ThinkTool, consecutive_allowed=False),
-            AskPermissionRequirement(["DestinationResearch", "WeatherPlanning", "LanguageCulturalGuidance"])
-        ]
+            # Handoffs need approval unless approvals.toml decides; one prompt covers the calls waiting
+            # at the same time, and the coordinator keeps working while the user hasn't answered
+            ApprovalRequirement(
+                ["ConsultExperts", "DestinationResearch", "WeatherPlanning", "LanguageCulturalGuidance"],
+                policy=ApprovalPolicy.load(),
+            )
+        ])
     )
+
+async def multi_agent_travel_planner_with_language():
+    """
+    Advanced Multi-Agent Travel Planning System with Language Expert
+    
+    This system demonstrates:
+    1. Specialized agent roles and coordination
+    2. Tool-based inter-agent communication
+    3. Requirements-based execution control
+    4. Language and cultural expertise integration
+    5. Comprehensive travel planning workflow
+    """
+    
+    # Initialize the language model (one pooled client shared by all four agents)
+    llm = chat_model(
+        "watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", 
+        ChatModelParameters(temperature=0, stream=True)
+    )
+    # Connect and authenticate while the agents are being set up, not on the first query
+    warmup = asyncio.create_task(shared_models.warmup())
+    
+    # One recorder shared by all agents, so handoffs land in the same trace
+    trace_recorder = TraceRecorder(path=".cache/traces.jsonl")
+    
+    # Forecasts are cached per ~11 km bucket until Open-Meteo's next update; the cities we
+    # plan for most often are refreshed in the background so lookups are memory hits
+    weather_tool = CachedOpenMeteoTool()
+    weather_tool.start_prefetching(["Tokyo", "Osaka"])
     
+    travel_coordinator = create_travel_coordinator(llm, trace_recorder, weather_tool)
 
     query = """I'm planning a 2-week cultural immersion trip to Japan (Tokyo and Osaka) as a first-time visitor. 
     I want to experience traditional culture, visit historical sites, and interact with locals. 
     I speak only English and want to be respectful of Japanese customs. 
     What should I know about the destination, weather expectations, and language/cultural tips?"""
     
-    result = await travel_coordinator.run(query)
-    print(f"\n📋 Comprehensive Travel Plan:\n{result.answer.text}")
+    await warmup
+    # If an earlier run of this plan died, it resumes from its last checkpointed steps
+    reset_checkpoint = setup_checkpoint("t12-travel-plan")
+    try:
+        # Expert consultations are listed as they start; the plan is printed as it is written
+        await print_stream(travel_coordinator.run(query), title="\n📋 Comprehensive Travel Plan:")
+    except Exception:
+        trace_recorder.dump_jsonl(".cache/failed_trace.jsonl")
+        raise
+    finally:
+        reset_checkpoint()
+        weather_tool.stop_prefetching()
+        await trace_recorder.close()
+    replayed = shared_checkpointer.replayed
+    if replayed:
+        print(f"\n♻️ Resumed from a checkpoint: {replayed['llm']} model and {replayed['tool']} tool calls replayed")
+    print(f"\n⏱️ Latency summary:\n{trace_recorder.report()}")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
@@ -1,10 +1,13 @@
 import asyncio
 import logging
-from beeai_framework.backend import ChatModel, ChatModelParameters, UserMessage, SystemMessage
+from beeai_framework.backend import ChatModelParameters, UserMessage, SystemMessage
+from model_registry import chat_model
+from streaming import stream_run
 # Initialize the chat model
 async def basic_chat_example():
     # Create a chat model instance (works with OpenAI, WatsonX, etc.)
-    llm = ChatModel.from_name("watsonx:ibm/granite-3-3-8b-instruct", ChatModelParameters(temperature=0))
+    # stream=True makes the model emit tokens as they are generated
+    llm = chat_model("watsonx:ibm/granite-3-3-8b-instruct", ChatModelParameters(temperature=0, stream=True))
     
     # Create a conversation about something everyone finds interesting
     messages = [
@@ -12,11 +15,17 @@ async def basic_chat_example():
         UserMessage(content="Help me brainstorm a unique business idea for a food delivery service that doesn't exist yet.")
     ]
     
-    # Generate response using create() method
-    response = await llm.create(messages=messages)
-    
     print("User: Help me brainstorm a unique business idea for a food delivery service that doesn't exist yet.")
-    print(f"Assistant: {response.get_text_content()}")
+    print("Assistant: ", end="", flush=True)
+    
+    # Generate response using create() method, printing it as it arrives
+    response = None
+    async for event in stream_run(llm.create(messages=messages)):
+        if event.type == "token":
+            print(event.text, end="", flush=True)
+        elif event.type == "answer":
+            print()
+            response = event.result
     
     return response
 
@@ -1,7 +1,14 @@
 import asyncio
 import logging
+import re
 import string
+import sys
+import time
+import timeit
+from dataclasses import dataclass
+from typing import AsyncIterator, Iterable, Iterator
 from beeai_framework.backend import ChatModel, ChatModelParameters, UserMessage
+from model_registry import chat_model
 
 class SimplePromptTemplate:
     """Simple prompt template using Python string formatting."""
@@ -19,11 +26,59 @@ class SimplePromptTemplate:
         # Format the template with the variables
         return formatted_template.format(**variables)
 
-async def prompt_template_example():
-    llm = ChatModel.from_name("watsonx:ibm/granite-3-3-8b-instruct", ChatModelParameters(temperature=0))
-    
-    # Create a prompt template for data science project evaluation
-    template_content = """
+class CompiledPromptTemplate:
+    """Prompt template that parses mustache-style {{variable}} slots once, up front."""
+
+    _SLOT_PATTERN = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+    def __init__(self, template: str, variables: Iterable[str] | None = None):
+        self.template = template
+
+        # Split the template into a flat segment list: literal text stays as-is,
+        # each slot becomes a placeholder whose position we remember for rendering
+        self._segments: list[str] = []
+        self._slots: list[tuple[int, str]] = []
+        position = 0
+        for match in self._SLOT_PATTERN.finditer(template):
+            self._segments.append(template[position:match.start()])
+            self._slots.append((len(self._segments), match.group(1)))
+            self._segments.append("")
+            position = match.end()
+        self._segments.append(template[position:])
+        self.variables = frozenset(name for _, name in self._slots)
+
+        # Validate the declared variables against the slots found in the template
+        if variables is not None:
+            self._check_variables(set(variables), "declared")
+
+    def _check_variables(self, names: set, source: str) -> None:
+        missing = self.variables - names
+        extra = names - self.variables
+        if missing or extra:
+            problems = []
+            if missing:
+                problems.append(f"missing variables: {', '.join(sorted(missing))}")
+            if extra:
+                problems.append(f"extra variables: {', '.join(sorted(extra))}")
+            raise ValueError(f"Template does not match {source} variables ({'; '.join(problems)})")
+
+    def render(self, variables: dict) -> str:
+        """Render the template with provided variables."""
+        if variables.keys() != self.variables:
+            self._check_variables(set(variables), "provided")
+
+        parts = self._segments.copy()
+        for index, name in self._slots:
+            parts[index] = str(variables[name])
+        return "".join(parts)
+
+    def render_many(self, rows: Iterable[dict]) -> Iterator[str]:
+        """Lazily render the template once per row of variables."""
+        for row in rows:
+            yield self.render(row)
+
+# Prompt template for data science project evaluation
+TEMPLATE_CONTENT = """
     You are a senior data scientist evaluating a machine learning project proposal.
     
     Project Details:
@@ -42,46 +97,128 @@ async def prompt_template_example():
     
     Be specific and actionable in your recommendations.
     """
+
+# Project scenarios to evaluate with the template
+PROJECT_SCENARIOS = [
+    {
+        "project_name": "Smart Inventory Optimization",
+        "business_problem": "Reduce inventory costs while maintaining 95% product availability",
+        "data_description": "2 years of sales data, supplier lead times, seasonal patterns, 500K records",
+        "timeline": "3 months development, 1 month testing",
+        "success_metrics": "15% cost reduction, maintain 95% availability, <2% forecast error"
+    },
+    {
+        "project_name": "Fraud Detection System",
+        "business_problem": "Detect fraudulent transactions in real-time with minimal false positives",
+        "data_description": "1M transaction records, user behavior data, device fingerprints",
+        "timeline": "6 months development, 2 months validation",
+        "success_metrics": "95% fraud detection rate, <1% false positive rate, <100ms response time"
+    }
+]
+
+@dataclass
+class ScenarioEvaluation:
+    """Outcome of evaluating one scenario; exactly one of `text` and `error` is set."""
+    index: int
+    scenario: dict
+    prompt: str | None = None
+    text: str | None = None
+    error: Exception | None = None
+    elapsed: float = 0.0
+
+async def evaluate_scenarios(
+    llm: ChatModel,
+    prompt_template: CompiledPromptTemplate,
+    scenarios: Iterable[dict],
+    *,
+    concurrency: int = 4,
+    ordered: bool = True,
+) -> AsyncIterator[ScenarioEvaluation]:
+    """Evaluate scenarios concurrently, yielding each result as soon as it can be emitted.
+    
+    At most `concurrency` LLM calls are in flight at once. With `ordered=True` results are
+    yielded in input order (a finished result waits only for the ones before it); otherwise
+    they are yielded in completion order. A failing scenario is reported through its
+    `error` field instead of aborting the batch.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
     
-    # Create the prompt template
-    prompt_template = SimplePromptTemplate(template_content)
+    semaphore = asyncio.Semaphore(concurrency)
     
-    # Test with different project scenarios
-    project_scenarios = [
-        {
-            "project_name": "Smart Inventory Optimization",
-            "business_problem": "Reduce inventory costs while maintaining 95% product availability",
-            "data_description": "2 years of sales data, supplier lead times, seasonal patterns, 500K records",
-            "timeline": "3 months development, 1 month testing",
-            "success_metrics": "15% cost reduction, maintain 95% availability, <2% forecast error"
-        },
-        {
-            "project_name": "Fraud Detection System",
-            "business_problem": "Detect fraudulent transactions in real-time with minimal false positives",
-            "data_description": "1M transaction records, user behavior data, device fingerprints",
-            "timeline": "6 months development, 2 months validation",
-            "success_metrics": "95% fraud detection rate, <1% false positive rate, <100ms response time"
-        }
-    ]
+    async def evaluate(index: int, scenario: dict) -> ScenarioEvaluation:
+        evaluation = ScenarioEvaluation(index=index, scenario=scenario)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                evaluation.prompt = prompt_template.render(scenario)
+                response = await llm.create(messages=[UserMessage(content=evaluation.prompt)])
+                evaluation.text = response.get_text_content()
+            except Exception as e:
+                evaluation.error = e
+            evaluation.elapsed = time.perf_counter() - start
+        return evaluation
     
-    for i, scenario in enumerate(project_scenarios, 1):
-        print(f"\n=== Project Evaluation {i}: {scenario['project_name']} ===")
+    tasks = [asyncio.create_task(evaluate(i, scenario)) for i, scenario in enumerate(scenarios)]
+    pending: dict[int, ScenarioEvaluation] = {}
+    next_index = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            evaluation = await next_done
+            if not ordered:
+                yield evaluation
+                continue
+            
+            pending[evaluation.index] = evaluation
+            while next_index in pending:
+                yield pending.pop(next_index)
+                next_index += 1
+    finally:
+        # The consumer may stop early; don't leave LLM calls running in the background
+        for task in tasks:
+            task.cancel()
+
+async def prompt_template_example(concurrency: int = 4):
+    llm = chat_model("watsonx:ibm/granite-3-3-8b-instruct", ChatModelParameters(temperature=0))
+    
+    # Create the prompt template (slots are parsed and validated once, here)
+    prompt_template = CompiledPromptTemplate(TEMPLATE_CONTENT, variables=PROJECT_SCENARIOS[0].keys())
+    
+    # Evaluate all scenarios concurrently; results still arrive in scenario order
+    async for evaluation in evaluate_scenarios(llm, prompt_template, PROJECT_SCENARIOS, concurrency=concurrency):
+        print(f"\n=== Project Evaluation {evaluation.index + 1}: {evaluation.scenario['project_name']} ===")
         
-        # Render the template with scenario data
-        rendered_prompt = prompt_template.render(scenario)
         print("\n  Rendered prompt:")
-        print(rendered_prompt)
+        print(evaluation.prompt)
         
-        # Generate evaluation using create() method
-        messages = [UserMessage(content=rendered_prompt)]
-        response = await llm.create(messages=messages)
+        if evaluation.error is not None:
+            print(f"### LLM call failed after {evaluation.elapsed:.1f}s: {evaluation.error} ###")
+            continue
         
-        print("### LLM response: ###\n")
-        print(response.get_text_content())
+        print(f"### LLM response ({evaluation.elapsed:.1f}s): ###\n")
+        print(evaluation.text)
         
+def benchmark_prompt_templates(rows: int = 10_000, repeat: int = 5) -> None:
+    """Micro-benchmark SimplePromptTemplate against CompiledPromptTemplate (no LLM calls)."""
+    scenarios = [PROJECT_SCENARIOS[i % len(PROJECT_SCENARIOS)] for i in range(rows)]
+    simple = SimplePromptTemplate(TEMPLATE_CONTENT)
+    compiled = CompiledPromptTemplate(TEMPLATE_CONTENT, variables=PROJECT_SCENARIOS[0].keys())
+    assert all(simple.render(s) == compiled.render(s) for s in PROJECT_SCENARIOS)
+    
+    simple_time = min(timeit.repeat(lambda: [simple.render(s) for s in scenarios], number=1, repeat=repeat))
+    compiled_time = min(timeit.repeat(lambda: list(compiled.render_many(scenarios)), number=1, repeat=repeat))
+    
+    print(f"Rendering {rows} prompts (best of {repeat}):")
+    print(f"  SimplePromptTemplate.render:        {simple_time * 1e6 / rows:.2f} us/prompt")
+    print(f"  CompiledPromptTemplate.render_many: {compiled_time * 1e6 / rows:.2f} us/prompt")
+    print(f"  Speedup: {simple_time / compiled_time:.1f}x")
+
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL) # Suppress unwanted warnings
     await prompt_template_example()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if "--benchmark" in sys.argv:
+        benchmark_prompt_templates()
+    else:
+        asyncio.run(main())
\ No newline at end of file
@@ -2,7 +2,9 @@ import asyncio
 import logging
 from pydantic import BaseModel, Field
 from typing import List
-from beeai_framework.backend import ChatModel, ChatModelParameters, UserMessage, SystemMessage
+from beeai_framework.backend import ChatModelParameters, UserMessage, SystemMessage
+from model_registry import chat_model
+from structured_streaming import stream_structure
 
 # Define a structured output for business planning
 class BusinessPlan(BaseModel):
@@ -16,30 +18,38 @@ class BusinessPlan(BaseModel):
     key_success_factors: List[str] = Field(description="Critical elements for success")
 
 async def structured_output_example():
-    llm = ChatModel.from_name("openai:gpt-5-nano", ChatModelParameters(temperature=0))
+    llm = chat_model("openai:gpt-5-nano", ChatModelParameters(temperature=0, stream=True))
     
     messages = [
         SystemMessage(content="You are an expert business consultant and entrepreneur."),
         UserMessage(content="Create a business plan for a mobile app that helps people find and book unique local experiences in their city.")
     ]
     
-    # Generate structured response using create_structure() method
-    response = await llm.create_structure(
-        schema=BusinessPlan,
-        messages=messages
-    )
-    
     print("User: Create a business plan for a mobile app that helps people find and book unique local experiences in their city.")
     print("\n🚀 AI-Generated Business Plan:")
-    print(f"💡 Business Name: {response.object['business_name']}")
-    print(f"🎯 Elevator Pitch: {response.object['elevator_pitch']}")
-    print(f"👥 Target Market: {response.object['target_market']}")
-    print(f"⭐ Unique Value Proposition: {response.object['unique_value_proposition']}")
-    print(f"💰 Revenue Streams: {', '.join(response.object['revenue_streams'])}")
-    print(f"💵 Startup Costs: {response.object['startup_costs']}")
-    print(f"🔑 Key Success Factors:")
-    for factor in response.object['key_success_factors']:
-        print(f"  - {factor}")
+    
+    # Stream the structured response: each field is printed (and validated) as soon as it is complete
+    labels = {
+        "business_name": "💡 Business Name",
+        "elevator_pitch": "🎯 Elevator Pitch",
+        "target_market": "👥 Target Market",
+        "unique_value_proposition": "⭐ Unique Value Proposition",
+        "revenue_streams": "💰 Revenue Streams",
+        "startup_costs": "💵 Startup Costs",
+        "key_success_factors": "🔑 Key Success Factors",
+    }
+    response = stream_structure(llm, schema=BusinessPlan, messages=messages)
+    async for field in response:
+        if field.error is not None:
+            print(f"⚠️ {field.name}: {field.error}")
+        elif field.index is not None:
+            if field.index == 0:
+                print(f"{labels[field.name]}:")
+            print(f"  - {field.value}")
+        elif field.name in labels and not isinstance(field.value, list):
+            print(f"{labels[field.name]}: {field.value}")
+    
+    return response.result
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL) # Suppress unwanted warnings
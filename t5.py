@@ -2,13 +2,18 @@ import asyncio
 import logging
 from beeai_framework.agents.experimental import RequirementAgent
 from beeai_framework.memory import UnconstrainedMemory
-from beeai_framework.backend import ChatModel, ChatModelParameters
+from beeai_framework.backend import ChatModelParameters
+from model_registry import chat_model
+from response_cache import CachedChatModel
+from semantic_cache import SemanticCache
+from streaming import print_stream
 
 async def minimal_tracked_agent_example():
     """
     Minimal RequirementAgent
     """
-    llm = ChatModel.from_name("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+    # Wrapping the model serves repeated temperature-0 answers from the on-disk cache
+    llm = CachedChatModel(chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True)))
     
     # CONSISTENT SYSTEM PROMPT (used in all examples)
     SYSTEM_INSTRUCTIONS = """You are an expert cybersecurity analyst specializing in threat assessment and risk analysis.
@@ -24,15 +29,16 @@ Your methodology:
         llm=llm,
         tools=[],  # No tools yet
         memory=UnconstrainedMemory(),
-        instructions=SYSTEM_INSTRUCTIONS
+        instructions=SYSTEM_INSTRUCTIONS,
+        # Reworded versions of a question that was already answered are served from the local index
+        middlewares=[SemanticCache(namespace="t5-analyst")]
     )
     
     # CONSISTENT QUERY (used in all examples)
     ANALYSIS_QUERY = """Analyze the cybersecurity risks of quantum computing for financial institutions. 
     What are the main threats, timeline for concern, and recommended preparation strategies?"""
     
-    result = await minimal_agent.run(ANALYSIS_QUERY)
-    print(f"\n💬 Pure LLM Analysis:\n{result.answer.text}")
+    await print_stream(minimal_agent.run(ANALYSIS_QUERY), title="\n💬 Pure LLM Analysis:")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
@@ -3,10 +3,15 @@ import logging
 from beeai_framework.agents.experimental import RequirementAgent
 from beeai_framework.agents.experimental.requirements.conditional import ConditionalRequirement
 from beeai_framework.memory import UnconstrainedMemory
-from beeai_framework.backend import ChatModel, ChatModelParameters
+from beeai_framework.backend import ChatModelParameters
 from beeai_framework.tools.search.wikipedia import WikipediaTool
-from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
-from beeai_framework.tools import Tool
+from concurrent_tools import ConcurrentToolCalls
+from model_registry import chat_model
+from response_cache import CachedChatModel
+from semantic_cache import SemanticCache
+from streaming import print_stream
+from trace_recorder import TraceRecorder
+from wikipedia_index import wikipedia_tool
 
 async def wikipedia_enhanced_agent_example():
     """
@@ -16,7 +21,9 @@ async def wikipedia_enhanced_agent_example():
     Same query - but now with research capability.
     Moreover, middleware is used to track all tool usage.
     """
-    llm = ChatModel.from_name("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+    # SAME cached model as previous examples, with parallel tool calls: the model can request several
+    # lookups in one turn, and ConcurrentToolCalls (below) runs them concurrently
+    llm = CachedChatModel(chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True), allow_parallel_tool_calls=True))
     
     # SAME SYSTEM PROMPT as Example 1
     SYSTEM_INSTRUCTIONS = """You are an expert cybersecurity analyst specializing in threat assessment and risk analysis.
@@ -27,13 +34,16 @@ Your methodology:
 3. Provide comprehensive risk assessment with actionable recommendations
 4. Focus on practical, implementable security measures"""
     
+    # Records tool, agent and model timings quietly instead of printing every event
+    trace_recorder = TraceRecorder()
+    
     # RequirementAgent with Wikipedia research capability
     wikipedia_agent = RequirementAgent(
         llm=llm,
-        tools=[WikipediaTool()],  # Added research capability
+        tools=[wikipedia_tool()],  # Added research capability (served from the local index once it is built, see wikipedia_index.py)
         memory=UnconstrainedMemory(),
         instructions=SYSTEM_INSTRUCTIONS,
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
+        middlewares=[trace_recorder, SemanticCache(namespace="t6-wikipedia"), ConcurrentToolCalls(max_concurrency=4)],
         requirements=[ConditionalRequirement(WikipediaTool, max_invocations=2)]
     )
     
@@ -41,8 +51,8 @@ Your methodology:
     ANALYSIS_QUERY = """Analyze the cybersecurity risks of quantum computing for financial institutions. 
     What are the main threats, timeline for concern, and recommended preparation strategies?"""
     
-    result = await wikipedia_agent.run(ANALYSIS_QUERY)
-    print(f"\n📖 Research-Enhanced Analysis:\n{result.answer.text}")
+    await print_stream(wikipedia_agent.run(ANALYSIS_QUERY), title="\n📖 Research-Enhanced Analysis:")
+    print(f"\n⏱️ Latency summary:\n{trace_recorder.report()}")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
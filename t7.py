@@ -3,11 +3,16 @@ import logging
 from beeai_framework.agents.experimental import RequirementAgent
 from beeai_framework.agents.experimental.requirements.conditional import ConditionalRequirement
 from beeai_framework.memory import UnconstrainedMemory
-from beeai_framework.backend import ChatModel, ChatModelParameters
+from beeai_framework.backend import ChatModelParameters
 from beeai_framework.tools.think import ThinkTool
 from beeai_framework.tools.search.wikipedia import WikipediaTool
-from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
-from beeai_framework.tools import Tool
+from concurrent_tools import ConcurrentToolCalls
+from model_registry import chat_model
+from response_cache import CachedChatModel
+from semantic_cache import SemanticCache
+from streaming import print_stream
+from trace_recorder import TraceRecorder
+from wikipedia_index import wikipedia_tool
 
 async def reasoning_enhanced_agent_example():
     """
@@ -16,7 +21,9 @@ async def reasoning_enhanced_agent_example():
     Adding ThinkTool enables structured reasoning alongside research.
     Same query, same tracking - now with visible thinking process.
     """
-    llm = ChatModel.from_name("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+    # SAME cached model as previous examples, with parallel tool calls: the model can request several
+    # lookups in one turn, and ConcurrentToolCalls (below) runs them concurrently
+    llm = CachedChatModel(chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True), allow_parallel_tool_calls=True))
     
     # SAME SYSTEM PROMPT as previous examples
     SYSTEM_INSTRUCTIONS = """You are an expert cybersecurity analyst specializing in threat assessment and risk analysis.
@@ -27,13 +34,16 @@ Your methodology:
 3. Provide comprehensive risk assessment with actionable recommendations
 4. Focus on practical, implementable security measures"""
     
+    # SAME trace recorder setup as previous examples
+    trace_recorder = TraceRecorder()
+    
     # RequirementAgent with reasoning + research capability
     reasoning_agent = RequirementAgent(
         llm=llm,
-        tools=[ThinkTool(), WikipediaTool()],  # Thinking + Research
+        tools=[ThinkTool(), wikipedia_tool()],  # Thinking + Research
         memory=UnconstrainedMemory(),
         instructions=SYSTEM_INSTRUCTIONS,
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
+        middlewares=[trace_recorder, SemanticCache(namespace="t7-reasoning"), ConcurrentToolCalls(max_concurrency=4)],
         requirements=[
             ConditionalRequirement(ThinkTool, max_invocations=2),
             ConditionalRequirement(WikipediaTool, max_invocations=2)
@@ -44,8 +54,8 @@ Your methodology:
     ANALYSIS_QUERY = """Analyze the cybersecurity risks of quantum computing for financial institutions. 
     What are the main threats, timeline for concern, and recommended preparation strategies?"""
     
-    result = await reasoning_agent.run(ANALYSIS_QUERY)
-    print(f"\n🧠 Reasoning + Research Analysis:\n{result.answer.text}")
+    await print_stream(reasoning_agent.run(ANALYSIS_QUERY), title="\n🧠 Reasoning + Research Analysis:")
+    print(f"\n⏱️ Latency summary:\n{trace_recorder.report()}")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
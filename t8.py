@@ -3,20 +3,22 @@ import logging
 from beeai_framework.agents.experimental import RequirementAgent
 from beeai_framework.agents.experimental.requirements.conditional import ConditionalRequirement
 from beeai_framework.memory import UnconstrainedMemory
-from beeai_framework.backend import ChatModel, ChatModelParameters
+from beeai_framework.backend import ChatModelParameters
 from beeai_framework.tools.think import ThinkTool
 from beeai_framework.tools.search.wikipedia import WikipediaTool
-from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
-from beeai_framework.tools import Tool
+from compiled_requirements import compile_requirements
+from model_registry import chat_model
+from response_cache import CachedChatModel
+from semantic_cache import SemanticCache
+from speculative_prefetch import SpeculativePrefetch
+from streaming import print_stream
+from trace_recorder import TraceRecorder
+from wikipedia_index import wikipedia_tool
 
-async def controlled_execution_example():
-    """
-    RequirementAgent with Controlled Execution - Requirements System
-    
-    Requirements provide precise control over tool execution order and behavior.
-    Same query, same tracking - but now with strict execution rules.
-    """
-    llm = ChatModel.from_name("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+def create_controlled_agent(trace_recorder: TraceRecorder) -> RequirementAgent:
+    """The controlled analyst agent, also served by agent_server.py."""
+    # SAME cached model as previous examples
+    llm = CachedChatModel(chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True)))
     
     # SAME SYSTEM PROMPT as previous examples
     SYSTEM_INSTRUCTIONS = """You are an expert cybersecurity analyst specializing in threat assessment and risk analysis.
@@ -28,15 +30,19 @@ Your methodology:
 4. Focus on practical, implementable security measures"""
     
     # RequirementAgent with strict execution control
-    controlled_agent = RequirementAgent(
+    wikipedia = wikipedia_tool()
+    tools = [ThinkTool(), wikipedia]
+    return RequirementAgent(
         llm=llm,
-        tools=[ThinkTool(), WikipediaTool()],
+        tools=tools,
         memory=UnconstrainedMemory(),
         instructions=SYSTEM_INSTRUCTIONS,
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
+        # Wikipedia has to wait for the first thinking step, so the likely lookups start meanwhile
+        middlewares=[trace_recorder, SemanticCache(namespace="t8-controlled"), SpeculativePrefetch(wikipedia)],
         
-        # REQUIREMENTS: Declarative control over execution flow
-        requirements=[
+        # REQUIREMENTS: Declarative control over execution flow, compiled (and checked
+        # for contradictions) when the agent is built instead of evaluated rule by rule
+        requirements=compile_requirements(tools, [
             # MUST start with systematic thinking
             ConditionalRequirement(
                 ThinkTool,
@@ -52,15 +58,26 @@ Your methodology:
                 min_invocations=1,  # Must research at least once
                 max_invocations=2  # Max number of research calls
             )
-        ]
+        ])
     )
+
+async def controlled_execution_example():
+    """
+    RequirementAgent with Controlled Execution - Requirements System
+    
+    Requirements provide precise control over tool execution order and behavior.
+    Same query, same tracking - but now with strict execution rules.
+    """
+    # SAME trace recorder setup as previous examples
+    trace_recorder = TraceRecorder()
+    controlled_agent = create_controlled_agent(trace_recorder)
     
     # SAME QUERY as all previous examples
     ANALYSIS_QUERY = """Analyze the cybersecurity risks of quantum computing for financial institutions. 
     What are the main threats, timeline for concern, and recommended preparation strategies?"""
     
-    result = await controlled_agent.run(ANALYSIS_QUERY)
-    print(f"\n🔧 Controlled Execution Analysis:\n{result.answer.text}")
+    await print_stream(controlled_agent.run(ANALYSIS_QUERY), title="\n🔧 Controlled Execution Analysis:")
+    print(f"\n⏱️ Latency summary:\n{trace_recorder.report()}")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
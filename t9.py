@@ -3,14 +3,20 @@ import logging
 from beeai_framework.agents.experimental import RequirementAgent
 from beeai_framework.agents.experimental.requirements.conditional import ConditionalRequirement
 from beeai_framework.memory import UnconstrainedMemory
-from beeai_framework.backend import ChatModel, ChatModelParameters
+from beeai_framework.backend import ChatModelParameters
 from beeai_framework.tools.think import ThinkTool
 from beeai_framework.tools.search.wikipedia import WikipediaTool
-from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
 from beeai_framework.tools import Tool
+from compiled_requirements import compile_requirements
+from model_registry import chat_model
+from response_cache import CachedChatModel
+from streaming import print_stream
+from trace_recorder import TraceRecorder
+from wikipedia_index import wikipedia_tool
 
 async def reasoning_enhanced_agent_example():
-    llm = ChatModel.from_name("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0))
+    # SAME cached model as previous examples
+    llm = CachedChatModel(chat_model("watsonx:meta-llama/llama-4-maverick-17b-128e-instruct-fp8", ChatModelParameters(temperature=0, stream=True)))
     
     # SAME SYSTEM PROMPT as previous examples
     SYSTEM_INSTRUCTIONS = """You are an expert cybersecurity analyst specializing in threat assessment and risk analysis.
@@ -21,14 +27,18 @@ Your methodology:
 3. Provide comprehensive risk assessment with actionable recommendations
 4. Focus on practical, implementable security measures"""
     
+    # SAME trace recorder setup as previous examples
+    trace_recorder = TraceRecorder()
+    
     # RequirementAgent with reasoning + research capability
+    tools = [ThinkTool(), wikipedia_tool()]  # Thinking + Research
     reasoning_agent = RequirementAgent(
         llm=llm,
-        tools=[ThinkTool(), WikipediaTool()],  # Thinking + Research
+        tools=tools,
         memory=UnconstrainedMemory(),
         instructions=SYSTEM_INSTRUCTIONS,
-        middlewares=[GlobalTrajectoryMiddleware(included=[Tool])],
-        requirements=[
+        middlewares=[trace_recorder],
+        requirements=compile_requirements(tools, [
             ConditionalRequirement(
                 ThinkTool,
                 force_at_step=1,  # Thinking required first
@@ -38,15 +48,15 @@ Your methodology:
                 consecutive_allowed=False  # No repeated thinking
             ),
             #ConditionalRequirement(WikipediaTool, max_invocations=2)
-        ]
+        ])
     )
     
     # SAME QUERY as previous examples
     ANALYSIS_QUERY = """Analyze the cybersecurity risks of quantum computing for financial institutions. 
     What are the main threats, timeline for concern, and recommended preparation strategies?"""
     
-    result = await reasoning_agent.run(ANALYSIS_QUERY)
-    print(f"\n🧠 Reasoning + Research Analysis:\n{result.answer.text}")
+    await print_stream(reasoning_agent.run(ANALYSIS_QUERY), title="\n🧠 Reasoning + Research Analysis:")
+    print(f"\n⏱️ Latency summary:\n{trace_recorder.report()}")
 
 async def main() -> None:
     logging.getLogger('asyncio').setLevel(logging.CRITICAL)
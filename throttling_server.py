@@ -0,0 +1,201 @@
+"""Local stand-in for an API that throttles, and a load test of rate_limiter.py against it.
+
+    python throttling_server.py serve --port 8766 --capacity 4 --rate 20
+    python throttling_server.py compare --clients 40 --requests 400
+
+The stand-in answers GET / like an overloaded API would: with more than `capacity` requests
+in flight, or more than `rate` accepted in the last second, it responds 429 with a Retry-After,
+and its latency grows with the number of requests in flight.
+
+`compare` starts a stand-in and sends it the same load twice, from a mix of interactive and
+batch clients: first retrying throttled requests right away, as naive clients do, then through
+a RateLimiter that doesn't know the stand-in's limits. It prints how many requests succeeded,
+how many 429s the stand-in had to send, the latency per priority class and where the limiter's
+concurrency limit settled.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+import aiohttp
+from aiohttp import web
+
+from rate_limiter import BackendConfig, Priority, RateLimiter
+
+
+class ThrottlingServer:
+    """aiohttp app that throttles by concurrency and by rate, and slows down under load."""
+
+    def __init__(self, *, capacity: int = 4, rate: float = 20.0, latency: float = 0.05, retry_after: int = 1) -> None:
+        self.capacity = capacity
+        self.rate = rate
+        self.latency = latency
+        self.retry_after = retry_after
+        self.in_flight = 0
+        self.accepted = 0
+        self.throttled = 0
+        self._recent: deque[float] = deque()  # when the requests of the last second were accepted
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        now = time.monotonic()
+        while self._recent and now - self._recent[0] > 1.0:
+            self._recent.popleft()
+        if self.in_flight >= self.capacity or len(self._recent) >= self.rate:
+            self.throttled += 1
+            return web.json_response(
+                {"error": "Too many requests"}, status=429, headers={"Retry-After": str(self.retry_after)}
+            )
+
+        self.accepted += 1
+        self._recent.append(now)
+        self.in_flight += 1
+        try:
+            await asyncio.sleep(self.latency * (1 + self.in_flight / self.capacity))
+        finally:
+            self.in_flight -= 1
+        return web.json_response({"ok": True})
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response({"accepted": self.accepted, "throttled": self.throttled, "in_flight": self.in_flight})
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([web.get("/", self._handle), web.get("/stats", self._stats)])
+        return app
+
+
+@dataclass
+class LoadResult:
+    succeeded: int = 0
+    failed: int = 0
+    latencies: dict[str, list[float]] = field(default_factory=dict)  # per priority class, including retries
+
+    def record(self, priority: Priority, seconds: float) -> None:
+        self.latencies.setdefault(priority, []).append(seconds)
+
+
+async def run_load(
+    send: Callable[[Priority], Awaitable[None]], *, clients: int, requests: int, batch_share: float, seed: int
+) -> LoadResult:
+    """Spread `requests` over `clients` concurrent clients, a `batch_share` of them in the batch class."""
+    rng = random.Random(seed)
+    result = LoadResult()
+    queue: asyncio.Queue[Priority] = asyncio.Queue()
+    for _ in range(requests):
+        queue.put_nowait("batch" if rng.random() < batch_share else "interactive")
+
+    async def client() -> None:
+        while not queue.empty():
+            priority = queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                await send(priority)
+            except Exception:
+                result.failed += 1
+            else:
+                result.succeeded += 1
+                result.record(priority, time.perf_counter() - start)
+
+    await asyncio.gather(*(client() for _ in range(clients)))
+    return result
+
+
+def _percentiles(values: list[float]) -> str:
+    if len(values) < 2:
+        return "-"
+    quantiles = statistics.quantiles(values, n=20)
+    return f"p50 {statistics.median(values):.3f}s p95 {quantiles[18]:.3f}s"
+
+
+async def compare(args: argparse.Namespace) -> None:
+    server = ThrottlingServer(capacity=args.capacity, rate=args.rate, latency=args.latency)
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+    url = f"http://127.0.0.1:{port}/"
+
+    async with aiohttp.ClientSession() as session:
+
+        async def fetch() -> None:
+            async with session.get(url) as response:
+                response.raise_for_status()
+
+        async def naive(priority: Priority) -> None:
+            for attempt in range(args.retries + 1):
+                try:
+                    return await fetch()
+                except aiohttp.ClientResponseError as e:
+                    if e.status != 429 or attempt == args.retries:
+                        raise
+
+        # The limiter starts out allowing more than the stand-in can take, and has to find its limits
+        limiter = RateLimiter(
+            default=BackendConfig(
+                rate=args.rate * 2,
+                burst=args.clients,
+                initial_limit=args.clients / 2,
+                max_retries=args.retries,
+                base_delay=0.1,
+                deadline=30.0,
+            )
+        )
+
+        async def limited(priority: Priority) -> None:
+            await limiter.call("stand-in", fetch, priority=priority)
+
+        for name, send in (("naive retries", naive), ("rate limiter", limited)):
+            server.accepted = server.throttled = 0
+            start = time.perf_counter()
+            result = await run_load(
+                send, clients=args.clients, requests=args.requests, batch_share=args.batch_share, seed=args.seed
+            )
+            wall = time.perf_counter() - start
+            print(f"\n{name}: {result.succeeded}/{args.requests} succeeded in {wall:.2f}s, {server.throttled} 429s")
+            for priority in ("interactive", "batch"):
+                print(f"  {priority:<12} {_percentiles(result.latencies.get(priority, []))}")
+            if send is limited:
+                stats = limiter.stats()["stand-in"]
+                print(
+                    f"  limit {stats['limit']} (cut {stats['decreases']} times), {stats['retries']} retries,"
+                    f" {stats['gave_up']} gave up"
+                )
+
+    await runner.cleanup()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throttling stand-in API for testing rate_limiter.py.")
+    parser.add_argument("--capacity", type=int, default=4, help="Requests in flight before 429s.")
+    parser.add_argument("--rate", type=float, default=20.0, help="Requests per second before 429s.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per request when idle.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = commands.add_parser("serve", help="Serve the stand-in.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8766)
+
+    compare_parser = commands.add_parser("compare", help="Compare naive retries with the rate limiter.")
+    compare_parser.add_argument("--clients", type=int, default=40)
+    compare_parser.add_argument("--requests", type=int, default=400)
+    compare_parser.add_argument("--batch-share", type=float, default=0.5, help="Share of batch requests.")
+    compare_parser.add_argument("--retries", type=int, default=4, help="Retries per request.")
+    compare_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = ThrottlingServer(capacity=args.capacity, rate=args.rate, latency=args.latency)
+        web.run_app(server.app(), host=args.host, port=args.port)
+    else:
+        asyncio.run(compare(args))
+
+
+if __name__ == "__main__":
+    main()
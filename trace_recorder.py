@@ -0,0 +1,351 @@
+"""Low-overhead trajectory recorder, a quiet replacement for GlobalTrajectoryMiddleware.
+
+    recorder = TraceRecorder(path=".cache/traces.jsonl", sample_rate=0.1)
+    agent = RequirementAgent(..., middlewares=[recorder])
+    ...
+    print(recorder.report())              # latency percentiles per agent / tool / model
+    recorder.dump_jsonl("failed.jsonl")   # the last N traces, e.g. after an error
+
+Run start/finish, cache, tool batch and model route events are appended as small tuples to a bounded
+in-memory ring buffer; nothing is formatted or printed on the hot path. Latency histograms
+cover every run, while `sample_rate` decides (per trace) which traces are kept in the buffer
+and flushed to the JSONL file by a background task.
+"""
+
+import asyncio
+import json
+import time
+import zlib
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from beeai_framework.agents import BaseAgent
+from beeai_framework.agents.experimental.requirements.requirement import Requirement
+from beeai_framework.backend import ChatModel
+from beeai_framework.context import RunContext, RunContextFinishEvent, RunMiddlewareProtocol
+from beeai_framework.emitter import EmitterOptions, EventMeta
+from beeai_framework.tools import Tool
+from concurrent_tools import ToolBatchEvent
+from model_router import RouteEvent
+from wikipedia_cache import CacheLookupEvent
+
+
+class TraceEvent(NamedTuple):
+    timestamp: float
+    trace_id: str
+    run_id: str
+    parent_run_id: str | None
+    event: str  # "start", "finish", "cache", "call", "batch" or "route"
+    kind: str  # "agent", "tool", "llm", "requirement" or "other"
+    name: str
+    duration: float | None = None
+    error: str | None = None
+    detail: str | None = None
+
+    def to_json(self) -> str:
+        return json.dumps({k: v for k, v in self._asdict().items() if v is not None}, separators=(",", ":"))
+
+
+class LatencyHistogram:
+    """Log-scale latency histogram: 1 ms buckets doubling up to ~9 minutes."""
+
+    BOUNDS = tuple(0.001 * 2**i for i in range(20))
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        index = 0
+        while index < len(self.BOUNDS) and seconds > self.BOUNDS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (an overestimate by at most 2x)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return min(self.BOUNDS[index], self.max) if index < len(self.BOUNDS) else self.max
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+def _describe(instance: object) -> tuple[str, str]:
+    if isinstance(instance, BaseAgent):
+        return "agent", instance.meta.name
+    if isinstance(instance, Tool):
+        return "tool", instance.name
+    if isinstance(instance, ChatModel):
+        return "llm", f"{instance.provider_id}:{instance.model_id}"
+    if isinstance(instance, Requirement):
+        return "requirement", instance.name
+    return "other", type(instance).__name__
+
+
+class TraceRecorder(RunMiddlewareProtocol):
+    """Middleware that records run events into a ring buffer and keeps latency histograms.
+
+    A single instance can (and should) be shared by all agents, including handoff experts;
+    events seen through more than one agent are recorded once.
+    """
+
+    def __init__(
+        self,
+        *,
+        capacity: int = 10_000,
+        sample_rate: float = 1.0,
+        path: str | Path | None = None,
+        flush_interval: float = 1.0,
+    ) -> None:
+        super().__init__()
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("'sample_rate' must be between 0 and 1")
+
+        self._buffer: deque[TraceEvent] = deque(maxlen=capacity)
+        self._unflushed: deque[TraceEvent] = deque(maxlen=capacity)
+        self._sample_threshold = int(sample_rate * 0xFFFFFFFF)
+        self._open: dict[str, float] = {}
+        self._histograms: dict[tuple[str, str], LatencyHistogram] = {}
+        self._path = Path(path) if path is not None else None
+        self._flush_interval = flush_interval
+        self._flush_task: asyncio.Task[None] | None = None
+        self._seen_events: deque[str] = deque(maxlen=64)
+        self.dropped = 0  # events that fell off the buffer before they were flushed
+        self.batch_tool_time = 0.0  # summed tool time of the steps that ran several calls concurrently
+        self.batch_wall_time = 0.0  # ... and the wall time those steps spent on them
+        self.routed: dict[str, int] = {}  # requests answered per model of a CascadeChatModel
+        self.escalations: dict[str, int] = {}  # ... and the reasons they were passed on to the next tier
+        self.escalation_time = 0.0  # time spent on the attempts that were escalated
+
+    @property
+    def histograms(self) -> dict[tuple[str, str], LatencyHistogram]:
+        return self._histograms
+
+    def bind(self, ctx: RunContext) -> None:
+        ctx.emitter.match(
+            lambda event: event.name in ("start", "finish")
+            and bool(event.context.get("internal"))
+            and isinstance(event.creator, RunContext),
+            self._on_run_event,
+            EmitterOptions(match_nested=True),
+        )
+        ctx.emitter.match(lambda event: event.name == "cache", self._on_cache_event, EmitterOptions(match_nested=True))
+        ctx.emitter.match(
+            lambda event: event.name == "tool_batch", self._on_tool_batch_event, EmitterOptions(match_nested=True)
+        )
+        ctx.emitter.match(lambda event: event.name == "route", self._on_route_event, EmitterOptions(match_nested=True))
+
+    def _is_sampled(self, trace_id: str) -> bool:
+        return zlib.crc32(trace_id.encode()) <= self._sample_threshold
+
+    def _append(self, event: TraceEvent) -> None:
+        if not self._is_sampled(event.trace_id):
+            return
+        self._buffer.append(event)
+        if self._path is not None:
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.get_running_loop().create_task(self._flush_periodically())
+            if len(self._unflushed) == self._unflushed.maxlen:
+                self.dropped += 1
+            self._unflushed.append(event)
+
+    # Handlers are coroutines so the emitter runs them inline instead of in a worker thread
+    async def _on_run_event(self, data: Any, meta: EventMeta) -> None:
+        assert meta.trace is not None and isinstance(meta.creator, RunContext)
+        run_id = meta.trace.run_id
+        now = time.perf_counter()
+        kind, name = _describe(meta.creator.instance)
+
+        duration = error = None
+        if meta.name == "start":
+            if run_id in self._open:
+                return  # already recorded through another agent's binding
+            self._open[run_id] = now
+        else:
+            started = self._open.pop(run_id, None)
+            if started is None:
+                return
+            duration = now - started
+            self._histograms.setdefault((kind, name), LatencyHistogram()).record(duration)
+            if isinstance(data, RunContextFinishEvent) and data.error is not None:
+                error = type(data.error).__name__
+
+        self._append(
+            TraceEvent(
+                time.time(), meta.trace.id, run_id, meta.trace.parent_run_id, meta.name, kind, name, duration, error
+            )
+        )
+
+    async def _on_cache_event(self, data: Any, meta: EventMeta) -> None:
+        if not isinstance(data, CacheLookupEvent) or meta.trace is None or meta.id in self._seen_events:
+            return
+        self._seen_events.append(meta.id)
+        kind, name = _describe(meta.creator)
+        self._append(
+            TraceEvent(
+                time.time(),
+                meta.trace.id,
+                meta.trace.run_id,
+                meta.trace.parent_run_id,
+                "cache",
+                kind,
+                name,
+                detail=f"{data.outcome} {data.query!r} hit_rate={data.hit_rate:.2f}",
+            )
+        )
+
+    async def _on_tool_batch_event(self, data: Any, meta: EventMeta) -> None:
+        if not isinstance(data, ToolBatchEvent) or meta.trace is None or meta.id in self._seen_events:
+            return
+        self._seen_events.append(meta.id)  # piped on to the parent agents, which may share this recorder
+        trace = meta.trace
+        for call in data.calls:
+            self._append(
+                TraceEvent(
+                    time.time(),
+                    trace.id,
+                    trace.run_id,
+                    trace.parent_run_id,
+                    "call",
+                    "tool",
+                    call.tool,
+                    call.duration,
+                    call.error,
+                    detail=f"step={data.iteration} index={call.index} waited={call.waited:.3f}s",
+                )
+            )
+        if len(data.calls) > 1:
+            self.batch_tool_time += data.tool_time
+            self.batch_wall_time += data.wall_time
+        _, name = _describe(meta.creator)
+        self._append(
+            TraceEvent(
+                time.time(),
+                trace.id,
+                trace.run_id,
+                trace.parent_run_id,
+                "batch",
+                "agent",
+                name,
+                data.wall_time,
+                detail=f"step={data.iteration} calls={len(data.calls)} tool_time={data.tool_time:.3f}s",
+            )
+        )
+
+    async def _on_route_event(self, data: Any, meta: EventMeta) -> None:
+        if not isinstance(data, RouteEvent) or meta.trace is None or meta.id in self._seen_events:
+            return
+        self._seen_events.append(meta.id)
+        self.routed[data.model] = self.routed.get(data.model, 0) + 1
+        for attempt in data.attempts:
+            if attempt.duration:
+                # The tiers' own runs are nested too deep for this recorder, so they are timed from here
+                self._histograms.setdefault(("llm", attempt.model), LatencyHistogram()).record(attempt.duration)
+            if attempt.reason is not None:
+                self.escalations[attempt.reason] = self.escalations.get(attempt.reason, 0) + 1
+                self.escalation_time += attempt.duration
+        path = " > ".join(
+            f"{attempt.model} ({attempt.reason}, {attempt.duration:.3f}s)" for attempt in data.attempts[:-1]
+        )
+        self._append(
+            TraceEvent(
+                time.time(),
+                meta.trace.id,
+                meta.trace.run_id,
+                meta.trace.parent_run_id,
+                "route",
+                "llm",
+                data.model,
+                data.attempts[-1].duration,
+                detail=f"tier={data.tier}" + (f" escalated from {path}" if path else ""),
+            )
+        )
+
+    async def _flush_periodically(self) -> None:
+        try:
+            while True:
+                await asyncio.sleep(self._flush_interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            await self.flush()
+            raise
+
+    async def flush(self) -> None:
+        """Append the events recorded since the last flush to the JSONL file (in a worker thread)."""
+        if self._path is None or not self._unflushed:
+            return
+        events = list(self._unflushed)
+        self._unflushed.clear()
+        lines = "".join(f"{event.to_json()}\n" for event in events)
+
+        def write() -> None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)  # type: ignore[union-attr]
+            with open(self._path, "a", encoding="utf-8") as f:  # type: ignore[arg-type]
+                f.write(lines)
+
+        await asyncio.to_thread(write)
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    def last_traces(self, n: int = 1) -> list[list[TraceEvent]]:
+        """Events of the `n` most recent traces still in the buffer, oldest trace first."""
+        traces: OrderedDict[str, list[TraceEvent]] = OrderedDict()
+        for event in reversed(self._buffer):
+            if event.trace_id not in traces:
+                if len(traces) == n:
+                    continue
+                traces[event.trace_id] = []
+            traces[event.trace_id].append(event)
+        return [events[::-1] for events in reversed(traces.values())]
+
+    def dump_jsonl(self, path: str | Path, n: int = 1) -> int:
+        """Write the last `n` traces to `path`; returns the number of events written."""
+        events = [event for trace in self.last_traces(n) for event in trace]
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{event.to_json()}\n" for event in events)
+        return len(events)
+
+    def report(self) -> str:
+        """Latency percentiles per agent, tool and model."""
+        lines = [f"{'kind':<11} {'name':<40} {'count':>6} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"]
+        for (kind, name), histogram in sorted(self._histograms.items()):
+            lines.append(
+                f"{kind:<11} {name[:40]:<40} {histogram.count:>6}"
+                f" {histogram.mean:>7.3f}s {histogram.quantile(0.5):>7.3f}s {histogram.quantile(0.95):>7.3f}s"
+                f" {histogram.quantile(0.99):>7.3f}s {histogram.max:>7.3f}s"
+            )
+        if self.batch_wall_time:
+            lines.append(
+                f"Concurrent tool calls: {self.batch_tool_time:.3f}s of tool time in {self.batch_wall_time:.3f}s"
+                f" ({self.batch_tool_time / self.batch_wall_time:.1f}x)"
+            )
+        if self.routed:
+            answered = ", ".join(f"{model} {count}" for model, count in sorted(self.routed.items()))
+            lines.append(f"Model cascade: {sum(self.routed.values())} requests answered by {answered}")
+            if self.escalations:
+                reasons = ", ".join(f"{reason} {count}" for reason, count in sorted(self.escalations.items()))
+                lines.append(f"  escalated: {reasons} ({self.escalation_time:.3f}s on escalated attempts)")
+        return "\n".join(lines)
@@ -0,0 +1,236 @@
+"""Geo-bucketed forecast cache for OpenMeteoTool.
+
+    tools=[CachedOpenMeteoTool(), ThinkTool()],
+
+Forecasts are keyed by rounded coordinates, date window and unit, so nearby or differently
+spelled locations share an entry. Entries expire at the next forecast update boundary
+rather than a fixed time after they were stored, and popular locations can be refreshed in
+the background right after each update so lookups stay memory hits. Requests to Open-Meteo
+go through the shared rate limiter, with background refreshes in the "batch" class.
+"""
+
+import asyncio
+import time
+from collections import Counter, OrderedDict
+from collections.abc import Iterable
+from datetime import UTC, datetime
+from typing import Any, Generic, Self, TypeVar
+
+from beeai_framework.cache.base import BaseCache
+from beeai_framework.context import RunContext
+from beeai_framework.logger import Logger
+from beeai_framework.tools import JSONToolOutput, ToolRunOptions
+from beeai_framework.tools.weather import OpenMeteoTool
+from beeai_framework.tools.weather.openmeteo import OpenMeteoToolInput
+from rate_limiter import setup_priority, shared_limiter
+from wikipedia_cache import CacheLookupEvent, CacheOutcome, SingleFlightCache, normalize_query
+
+T = TypeVar("T")
+
+logger = Logger(__name__)
+
+# Open-Meteo refreshes "current" conditions every 15 minutes and its models at least hourly
+FORECAST_UPDATE_INTERVAL = 15 * 60
+
+
+class UpdateBoundaryCache(BaseCache[T], Generic[T]):
+    """In-memory LRU cache whose entries expire at the next multiple of `interval` seconds (UTC)."""
+
+    def __init__(self, interval: float = FORECAST_UPDATE_INTERVAL, *, size: int = 500) -> None:
+        super().__init__()
+        self._interval = interval
+        self._size = size
+        self._items: OrderedDict[str, tuple[float, T]] = OrderedDict()
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def next_boundary(self, now: float | None = None) -> float:
+        now = time.time() if now is None else now
+        return (now // self._interval + 1) * self._interval
+
+    def _entry(self, key: str) -> tuple[float, T] | None:
+        entry = self._items.get(key)
+        if entry is not None and entry[0] <= time.time():
+            del self._items[key]
+            return None
+        return entry
+
+    async def size(self) -> int:
+        return len(self._items)
+
+    async def set(self, key: str, value: T) -> None:
+        self._items[key] = (self.next_boundary(), value)
+        self._items.move_to_end(key)
+        while len(self._items) > self._size:
+            self._items.popitem(last=False)
+
+    async def get(self, key: str) -> T | None:
+        entry = self._entry(key)
+        if entry is None:
+            return None
+        self._items.move_to_end(key)
+        return entry[1]
+
+    async def has(self, key: str) -> bool:
+        return self._entry(key) is not None
+
+    async def delete(self, key: str) -> bool:
+        return self._items.pop(key, None) is not None
+
+    async def clear(self) -> None:
+        self._items.clear()
+
+    async def clone(self) -> Self:
+        cloned = type(self)(self._interval, size=self._size)
+        cloned._items = self._items.copy()
+        return cloned
+
+
+class ForecastCache:
+    """Geocoding and forecast caches plus request popularity, shared by all CachedOpenMeteoTools."""
+
+    def __init__(
+        self,
+        *,
+        update_interval: float = FORECAST_UPDATE_INTERVAL,
+        precision: int = 1,
+        size: int = 500,
+        geocode_ttl: float | None = 30 * 24 * 3600,
+    ) -> None:
+        # One decimal degree of latitude/longitude is roughly an 11 km bucket
+        self.precision = precision
+        self.forecasts = SingleFlightCache[JSONToolOutput[dict[str, Any]]](
+            UpdateBoundaryCache(update_interval, size=size)
+        )
+        self.geocodes = SingleFlightCache[dict[str, str]](size=size, ttl=geocode_ttl)
+        self.popularity: Counter[str] = Counter()
+        self.requests: dict[str, OpenMeteoToolInput] = {}
+
+    def record(self, input: OpenMeteoToolInput) -> None:
+        key = "|".join(
+            [
+                normalize_query(input.location_name),
+                normalize_query(input.country or ""),
+                str(input.start_date),
+                str(input.end_date),
+                input.temperature_unit,
+            ]
+        )
+        self.popularity[key] += 1
+        self.requests[key] = input
+
+    def most_popular(self, top: int) -> list[OpenMeteoToolInput]:
+        return [self.requests[key] for key, _ in self.popularity.most_common(top)]
+
+
+shared_forecast_cache = ForecastCache()
+
+
+class CachedOpenMeteoTool(OpenMeteoTool):
+    """OpenMeteoTool that serves forecasts from a shared, geo-bucketed ForecastCache."""
+
+    def __init__(self, options: dict[str, Any] | None = None, *, forecast_cache: ForecastCache | None = None) -> None:
+        super().__init__(options)
+        self._forecast_cache = forecast_cache if forecast_cache is not None else shared_forecast_cache
+        self._prefetch_task: asyncio.Task[None] | None = None
+
+    @property
+    def forecast_cache(self) -> ForecastCache:
+        return self._forecast_cache
+
+    async def _geocode(self, input: OpenMeteoToolInput) -> dict[str, str]:
+        key = f"{normalize_query(input.location_name)}|{normalize_query(input.country or '')}"
+        geocode, _ = await self._forecast_cache.geocodes.get_or_fetch(
+            key, lambda: shared_limiter.call("open-meteo", lambda: OpenMeteoTool._geocode(self, input))
+        )
+        return geocode
+
+    async def _forecast_key(self, input: OpenMeteoToolInput) -> str:
+        geocode = await self._geocode(input)
+        precision = self._forecast_cache.precision
+        latitude = round(float(geocode.get("latitude", 0)), precision)
+        longitude = round(float(geocode.get("longitude", 0)), precision)
+        today = datetime.now(tz=UTC).date()
+        return (
+            f"{latitude}:{longitude}:{input.start_date or today}:{input.end_date or today}:{input.temperature_unit}"
+        )
+
+    async def _lookup(
+        self, input: OpenMeteoToolInput, options: ToolRunOptions | None, context: RunContext | None
+    ) -> tuple[JSONToolOutput[dict[str, Any]], CacheOutcome]:
+        key = await self._forecast_key(input)
+        return await self._forecast_cache.forecasts.get_or_fetch(
+            key,
+            lambda: shared_limiter.call(
+                "open-meteo",
+                lambda: OpenMeteoTool._run(self, input, options, context),  # type: ignore[arg-type]
+            ),
+        )
+
+    async def _run(
+        self, input: OpenMeteoToolInput, options: ToolRunOptions | None, context: RunContext
+    ) -> JSONToolOutput[dict[str, Any]]:
+        self._forecast_cache.record(input)
+        output, outcome = await self._lookup(input, options, context)
+
+        stats = self._forecast_cache.forecasts.stats
+        await context.emitter.emit(
+            "cache",
+            CacheLookupEvent(
+                query=input.location_name,
+                outcome=outcome,
+                hits=stats.hits,
+                misses=stats.misses,
+                hit_rate=stats.hit_rate,
+            ),
+        )
+        return output
+
+    async def prefetch(self, locations: Iterable[str | OpenMeteoToolInput] = (), *, top: int = 5) -> None:
+        """Load forecasts for the given locations and the `top` most requested ones into the cache."""
+        inputs = [
+            location if isinstance(location, OpenMeteoToolInput) else OpenMeteoToolInput(location_name=location)
+            for location in locations
+        ]
+        inputs.extend(self._forecast_cache.most_popular(top))
+
+        reset_priority = setup_priority("batch")  # nobody is waiting for these yet
+        try:
+            lookups = [self._lookup(input, None, None) for input in inputs]
+            results = await asyncio.gather(*lookups, return_exceptions=True)
+        finally:
+            reset_priority()
+        for input, result in zip(inputs, results, strict=True):
+            if isinstance(result, Exception):
+                logger.warning(f"Prefetching the forecast for '{input.location_name}' failed: {result}")
+
+    def start_prefetching(self, locations: Iterable[str | OpenMeteoToolInput] = (), *, top: int = 5) -> None:
+        """Refresh the given and the most popular locations in the background after every forecast update."""
+        if self._prefetch_task is not None and not self._prefetch_task.done():
+            return
+
+        locations = list(locations)
+        forecasts_backend = self._forecast_cache.forecasts.backend
+        interval = forecasts_backend.interval if isinstance(forecasts_backend, UpdateBoundaryCache) else None
+
+        async def refresh() -> None:
+            while True:
+                await self.prefetch(locations, top=top)
+                if interval is None:
+                    return
+                # Wake up just after the next update, once the refreshed entries have expired
+                await asyncio.sleep(forecasts_backend.next_boundary() - time.time() + 1)
+
+        self._prefetch_task = asyncio.create_task(refresh())
+
+    def stop_prefetching(self) -> None:
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+
+    async def clone(self) -> Self:
+        cloned = await super().clone()
+        cloned._forecast_cache = self._forecast_cache
+        return cloned
@@ -0,0 +1,264 @@
+"""Process-wide, single-flight lookup cache shared by every CachedWikipediaTool.
+
+    tools=[CachedWikipediaTool(), ThinkTool()],
+    middlewares=[CacheTrajectoryMiddleware(included=[Tool])],
+
+Queries are normalized before they are used as keys, entries expire after a TTL, and
+concurrent identical lookups are coalesced so only one request per key goes to Wikipedia.
+Lookups can also be started speculatively (see speculative_prefetch.py); their results are
+only cached if a real lookup asks for them before they are discarded.
+Each lookup emits a "cache" event that CacheTrajectoryMiddleware prints with the running
+hit rate. Requests to Wikipedia go through the shared rate limiter, prefetches in the "batch"
+class.
+"""
+
+import asyncio
+import re
+from collections.abc import Awaitable, Callable
+from typing import Any, Generic, Literal, Self, TypeVar
+
+from pydantic import BaseModel
+
+from beeai_framework.cache.base import BaseCache
+from beeai_framework.cache.sliding_cache import SlidingCache
+from beeai_framework.context import RunContext
+from beeai_framework.emitter import Emitter, EmitterOptions, EventMeta
+from beeai_framework.middleware.trajectory import GlobalTrajectoryMiddleware
+from beeai_framework.tools import ToolRunOptions
+from beeai_framework.tools.search.wikipedia.wikipedia import (
+    WikipediaTool,
+    WikipediaToolInput,
+    WikipediaToolOutput,
+    WikipediaToolResult,
+)
+from rate_limiter import Priority, shared_limiter
+from response_cache import CacheStats
+
+T = TypeVar("T")
+
+CacheOutcome = Literal["hit", "miss", "coalesced", "prefetched"]
+
+
+class SingleFlightCache(BaseCache[T], Generic[T]):
+    """Cache that coalesces concurrent fetches of the same key into a single call.
+
+    Entries live in `backend` (an in-memory TTL cache by default). Cloning returns the
+    same instance, so the cache stays shared when agents and their tools are cloned.
+    """
+
+    def __init__(self, backend: BaseCache[T] | None = None, *, size: int = 1000, ttl: float | None = 3600) -> None:
+        super().__init__()
+        self._backend: BaseCache[T] = backend if backend is not None else SlidingCache(size, ttl)
+        self._in_flight: dict[str, asyncio.Task[T]] = {}
+        self._speculative: dict[str, asyncio.Task[T]] = {}
+        self.stats = CacheStats()
+
+    @property
+    def backend(self) -> BaseCache[T]:
+        return self._backend
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[T]]) -> tuple[T, CacheOutcome]:
+        """Return the cached value for `key`, calling `fetch` only if no one else is already fetching it."""
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.stats.hits += 1
+            self.stats.coalesced += 1
+            return await asyncio.shield(in_flight), "coalesced"
+
+        speculative = self._speculative.pop(key, None)
+        if speculative is None and await self._backend.has(key):
+            cached = await self._backend.get(key)
+            if cached is not None:
+                self.stats.hits += 1
+                return cached, "hit"
+
+        if speculative is not None:
+            self.stats.hits += 1
+            self.stats.prefetched += 1
+        else:
+            self.stats.misses += 1
+
+        async def fetch_and_store() -> T:
+            try:
+                if speculative is not None:
+                    try:
+                        value = await speculative
+                    except Exception:
+                        value = await fetch()  # a failed guess shouldn't fail the real lookup
+                else:
+                    value = await fetch()
+                await self._backend.set(key, value)
+                return value
+            finally:
+                self._in_flight.pop(key, None)
+
+        # Shielded, so a cancelled caller doesn't cancel the fetch other callers are waiting on
+        task = asyncio.create_task(fetch_and_store())
+        self._in_flight[key] = task
+        return await asyncio.shield(task), "miss" if speculative is None else "prefetched"
+
+    async def prefetch(self, key: str, fetch: Callable[[], Awaitable[T]]) -> bool:
+        """Start fetching `key` ahead of a likely lookup; False if it's already cached or being fetched.
+
+        The value is kept only if `get_or_fetch` asks for the key before `discard` is called.
+        """
+        if key in self._in_flight or key in self._speculative or await self._backend.has(key):
+            return False
+
+        async def run() -> T:
+            return await fetch()
+
+        task = asyncio.create_task(run())
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())  # failures surface on use
+        self._speculative[key] = task
+        return True
+
+    def discard(self, key: str) -> bool:
+        """Drop a speculative fetch that no lookup has asked for."""
+        task = self._speculative.pop(key, None)
+        if task is None:
+            return False
+        task.cancel()
+        self.stats.discarded += 1
+        return True
+
+    async def size(self) -> int:
+        return await self._backend.size()
+
+    async def set(self, key: str, value: T) -> None:
+        await self._backend.set(key, value)
+
+    async def get(self, key: str) -> T | None:
+        return await self._backend.get(key)
+
+    async def has(self, key: str) -> bool:
+        return await self._backend.has(key)
+
+    async def delete(self, key: str) -> bool:
+        return await self._backend.delete(key)
+
+    async def clear(self) -> None:
+        for key in list(self._speculative):
+            self.discard(key)
+        await self._backend.clear()
+        self.stats = CacheStats()
+
+    async def clone(self) -> Self:
+        return self
+
+
+shared_wikipedia_cache = SingleFlightCache[WikipediaToolOutput]()
+
+
+def normalize_query(query: str) -> str:
+    """Collapse the spelling differences that still name the same Wikipedia page."""
+    return re.sub(r"[\s_]+", " ", query).strip().casefold()
+
+
+class CacheLookupEvent(BaseModel):
+    query: str
+    outcome: CacheOutcome
+    hits: int
+    misses: int
+    hit_rate: float
+
+
+class CachedWikipediaTool(WikipediaTool):
+    """WikipediaTool whose page lookups go through a shared SingleFlightCache.
+
+    The page is fetched in a worker thread, so several agents can look up pages concurrently.
+    """
+
+    def __init__(
+        self,
+        options: dict[str, Any] | None = None,
+        *,
+        language: str = "en",
+        lookup_cache: SingleFlightCache[WikipediaToolOutput] | None = None,
+    ) -> None:
+        super().__init__(options, language=language)
+        self._lookup_cache = lookup_cache if lookup_cache is not None else shared_wikipedia_cache
+
+    @property
+    def lookup_cache(self) -> SingleFlightCache[WikipediaToolOutput]:
+        return self._lookup_cache
+
+    def _fetch(self, input: WikipediaToolInput) -> WikipediaToolOutput:
+        page_py = self.client.page(input.query)
+
+        if not page_py.exists():
+            return WikipediaToolOutput([])
+
+        if self._language in page_py.langlinks:
+            page_py = page_py.langlinks[self._language]
+
+        description_output = page_py.text if input.full_text else page_py.summary
+
+        return WikipediaToolOutput(
+            [
+                WikipediaToolResult(
+                    title=page_py.title or input.query,
+                    description=description_output or "",
+                    url=page_py.fullurl or "",
+                )
+            ]
+        )
+
+    async def _load(self, input: WikipediaToolInput, priority: Priority | None = None) -> WikipediaToolOutput:
+        """Fetch a page within Wikipedia's rate limits."""
+        return await shared_limiter.call("wikipedia", lambda: asyncio.to_thread(self._fetch, input), priority=priority)
+
+    def _cache_key(self, input: WikipediaToolInput) -> str:
+        return f"{self._language}:{int(input.full_text)}:{normalize_query(input.query)}"
+
+    async def prefetch(self, query: str, *, full_text: bool = False) -> str | None:
+        """Start looking up `query` before the agent asks for it; returns the key to discard it with."""
+        input = WikipediaToolInput(query=query, full_text=full_text)
+        key = self._cache_key(input)
+        started = await self._lookup_cache.prefetch(key, lambda: self._load(input, priority="batch"))
+        return key if started else None
+
+    def discard_prefetch(self, key: str) -> bool:
+        return self._lookup_cache.discard(key)
+
+    async def _run(
+        self, input: WikipediaToolInput, options: ToolRunOptions | None, context: RunContext
+    ) -> WikipediaToolOutput:
+        key = self._cache_key(input)
+        output, outcome = await self._lookup_cache.get_or_fetch(key, lambda: self._load(input))
+
+        stats = self._lookup_cache.stats
+        await context.emitter.emit(
+            "cache",
+            CacheLookupEvent(
+                query=input.query, outcome=outcome, hits=stats.hits, misses=stats.misses, hit_rate=stats.hit_rate
+            ),
+        )
+        return output
+
+    async def clone(self) -> Self:
+        cloned = await super().clone()
+        cloned._lookup_cache = self._lookup_cache
+        return cloned
+
+
+class CacheTrajectoryMiddleware(GlobalTrajectoryMiddleware):
+    """GlobalTrajectoryMiddleware that also prints the "cache" events emitted by cached tools."""
+
+    def _bind_emitter(self, emitter: Emitter) -> None:
+        super()._bind_emitter(emitter)
+        self._cleanups.append(
+            emitter.match(
+                lambda event: event.name == "cache",
+                self.on_cache,
+                EmitterOptions(match_nested=False),
+            )
+        )
+
+    def on_cache(self, data: Any, meta: EventMeta) -> None:
+        if not isinstance(data, CacheLookupEvent):
+            return
+        self._write(
+            f"{data.outcome} for {data.query!r} (hit rate {data.hit_rate:.0%}, {data.hits} hits / {data.misses} misses)",
+            meta,
+        )
@@ -0,0 +1,331 @@
+"""Local full-text Wikipedia index (SQLite FTS5) usable in place of live Wikipedia lookups.
+
+Build or extend the index from an article corpus in JSON Lines format, one article per
+line with "title" and "text" (and optionally "url"). This is what WikiExtractor
+(`wikiextractor --json`) produces from the official XML dumps:
+
+    python wikipedia_index.py add articles.jsonl [more.jsonl ...]
+    python wikipedia_index.py search "Tokyo"
+
+Adding articles is incremental: new titles are inserted, changed ones are updated and
+unchanged ones are skipped, so a corpus can be extended without a rebuild. Agents use
+the index through IndexedWikipediaTool, or wikipedia_tool() which picks it automatically
+when an index exists.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Self
+from urllib.parse import quote
+
+from beeai_framework.tools.search.wikipedia.wikipedia import (
+    WikipediaToolInput,
+    WikipediaToolOutput,
+    WikipediaToolResult,
+)
+from rate_limiter import Priority
+from wikipedia_cache import CachedWikipediaTool, SingleFlightCache
+
+DEFAULT_INDEX_PATH = Path(os.environ.get("WIKIPEDIA_INDEX_PATH", Path(".cache") / "wikipedia_index.sqlite3"))
+
+# Kept apart from the live lookup cache, so an index miss is never served to live lookups
+indexed_lookup_cache = SingleFlightCache[WikipediaToolOutput]()
+
+
+@dataclass
+class Article:
+    title: str
+    text: str
+    url: str = ""
+
+    @property
+    def summary(self) -> str:
+        """The lead section, i.e. everything before the first blank line or section heading."""
+        lines: list[str] = []
+        body = self.text.strip().splitlines()
+        if body and body[0].strip() == self.title:
+            body = body[1:]  # some extractors repeat the title as the first line
+        for line in body:
+            if lines and (not line.strip() or line.lstrip().startswith("==")):
+                break
+            if line.strip():
+                lines.append(line.strip())
+        return "\n".join(lines)
+
+
+def read_jsonl(path: str | Path) -> Iterator[Article]:
+    """Read articles from a JSON Lines corpus (WikiExtractor `--json` output or similar)."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get("title") and record.get("text"):
+                yield Article(title=record["title"], text=record["text"], url=record.get("url") or "")
+
+
+def normalize_title(title: str) -> str:
+    """Page name as Wikipedia would resolve it: "tokyo_tower " gives "Tokyo tower" (titles match case-insensitively)."""
+    title = " ".join(title.replace("_", " ").split()).strip(" .?!")
+    return title[:1].upper() + title[1:]
+
+
+class WikipediaIndex:
+    """SQLite FTS5 index of Wikipedia articles with exact-title and ranked full-text lookup.
+
+    Other names of an article (e.g. a query that live Wikipedia resolved to it) are kept as
+    redirects, so they are found without searching.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_INDEX_PATH) -> None:
+        self._path = Path(path)
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self._path, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        try:
+            self._db.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS articles (
+                    id INTEGER PRIMARY KEY,
+                    title TEXT NOT NULL UNIQUE COLLATE NOCASE,
+                    url TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    text TEXT NOT NULL,
+                    digest TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS redirects (
+                    alias TEXT PRIMARY KEY COLLATE NOCASE,
+                    title TEXT NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+                    title, summary, text, content='articles', content_rowid='id', tokenize='porter unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+                    INSERT INTO articles_fts (rowid, title, summary, text)
+                    VALUES (new.id, new.title, new.summary, new.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, title, summary, text)
+                    VALUES ('delete', old.id, old.title, old.summary, old.text);
+                END;
+                CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+                    INSERT INTO articles_fts (articles_fts, rowid, title, summary, text)
+                    VALUES ('delete', old.id, old.title, old.summary, old.text);
+                    INSERT INTO articles_fts (rowid, title, summary, text)
+                    VALUES (new.id, new.title, new.summary, new.text);
+                END;
+                """
+            )
+        except sqlite3.OperationalError as e:
+            raise RuntimeError("The local Wikipedia index requires SQLite with the FTS5 extension.") from e
+
+    @property
+    def path(self) -> Path:
+        return self._path
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM articles").fetchone()
+        return int(count)
+
+    def add(self, articles: Iterable[Article], *, batch_size: int = 1000) -> tuple[int, int]:
+        """Insert new and update changed articles; returns (added, updated)."""
+        added = updated = 0
+        batch: list[Article] = []
+
+        def flush() -> None:
+            nonlocal added, updated
+            now = time.time()
+            with self._lock:
+                self._db.execute("BEGIN")
+                try:
+                    for article in batch:
+                        digest = hashlib.sha1(article.text.encode("utf-8")).hexdigest()
+                        row = self._db.execute("SELECT digest FROM articles WHERE title = ?", (article.title,)).fetchone()
+                        if row is not None and row[0] == digest:
+                            continue
+
+                        url = article.url or f"https://en.wikipedia.org/wiki/{quote(article.title.replace(' ', '_'))}"
+                        values = (article.title, url, article.summary, article.text, digest, now)
+                        if row is None:
+                            self._db.execute(
+                                "INSERT INTO articles (title, url, summary, text, digest, updated_at)"
+                                " VALUES (?, ?, ?, ?, ?, ?)",
+                                values,
+                            )
+                            added += 1
+                        else:
+                            self._db.execute(
+                                "UPDATE articles SET title = ?, url = ?, summary = ?, text = ?, digest = ?,"
+                                " updated_at = ? WHERE title = ?",
+                                (*values, article.title),
+                            )
+                            updated += 1
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+            batch.clear()
+
+        for article in articles:
+            batch.append(article)
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return added, updated
+
+    def get(self, title: str) -> Article | None:
+        """Exact (case-insensitive) title match."""
+        with self._lock:
+            row = self._db.execute("SELECT title, text, url FROM articles WHERE title = ?", (title.strip(),)).fetchone()
+        return Article(*row) if row else None
+
+    def add_redirect(self, alias: str, title: str) -> None:
+        """Make `alias` resolve to the article titled `title`."""
+        alias = normalize_title(alias)
+        if alias.casefold() != title.casefold():
+            with self._lock:
+                self._db.execute("INSERT OR REPLACE INTO redirects (alias, title) VALUES (?, ?)", (alias, title))
+
+    def search(self, query: str, *, limit: int = 5) -> list[Article]:
+        """Rank articles by BM25, weighting title matches above summary and body matches."""
+        terms = " ".join(f'"{term}"' for term in query.replace('"', " ").split())
+        if not terms:
+            return []
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT a.title, a.text, a.url FROM articles_fts f JOIN articles a ON a.id = f.rowid"
+                " WHERE articles_fts MATCH ? ORDER BY bm25(articles_fts, 10.0, 3.0, 1.0) LIMIT ?",
+                (terms, limit),
+            ).fetchall()
+        return [Article(*row) for row in rows]
+
+    def lookup(self, query: str) -> Article | None:
+        """The article a page-name style query names: its title, normalized title or a redirect to it.
+
+        Articles that merely mention the query are not returned (see search()), so a page missing
+        from the index is reported as missing and can be fetched instead.
+        """
+        article = self.get(query) or self.get(normalize_title(query))
+        if article is None:
+            with self._lock:
+                row = self._db.execute(
+                    "SELECT title FROM redirects WHERE alias = ?", (normalize_title(query),)
+                ).fetchone()
+            article = self.get(row[0]) if row else None
+        return article
+
+
+class IndexedWikipediaTool(CachedWikipediaTool):
+    """WikipediaTool that answers from a local WikipediaIndex, with the same name, input and output.
+
+    With `fallback_to_live=True`, pages missing from the index are fetched from Wikipedia
+    and added to it, so the index grows with use. Without it, a query naming no indexed page is
+    answered with the best full-text match, under that article's own title.
+    """
+
+    def __init__(
+        self,
+        options: dict[str, Any] | None = None,
+        *,
+        index: WikipediaIndex | None = None,
+        fallback_to_live: bool = False,
+        language: str = "en",
+        lookup_cache: SingleFlightCache[WikipediaToolOutput] | None = None,
+    ) -> None:
+        super().__init__(options, language=language, lookup_cache=lookup_cache or indexed_lookup_cache)
+        self._index = index if index is not None else WikipediaIndex()
+        self._fallback_to_live = fallback_to_live
+
+    @property
+    def index(self) -> WikipediaIndex:
+        return self._index
+
+    def _fetch(self, input: WikipediaToolInput) -> WikipediaToolOutput:
+        article = self._index.lookup(input.query)
+        if article is None and not self._fallback_to_live:
+            matches = self._index.search(input.query, limit=1)
+            article = matches[0] if matches else None
+        elif article is None:
+            output = super()._fetch(WikipediaToolInput(query=input.query, full_text=True))
+            if output.results:
+                page = output.results[0]
+                self._index.add([Article(title=page.title, text=page.description, url=page.url)])
+                self._index.add_redirect(input.query, page.title)
+                article = self._index.get(page.title)
+        if article is None:
+            return WikipediaToolOutput([])
+
+        return WikipediaToolOutput(
+            [
+                WikipediaToolResult(
+                    title=article.title,
+                    description=article.text if input.full_text else article.summary,
+                    url=article.url,
+                )
+            ]
+        )
+
+    async def _load(self, input: WikipediaToolInput, priority: Priority | None = None) -> WikipediaToolOutput:
+        # Pages in the index don't count against Wikipedia's rate limits, only live fallbacks do
+        if self._fallback_to_live and await asyncio.to_thread(self._index.lookup, input.query) is None:
+            return await super()._load(input, priority)
+        return await asyncio.to_thread(self._fetch, input)
+
+    async def clone(self) -> Self:
+        cloned = await super().clone()
+        cloned._index = self._index
+        cloned._fallback_to_live = self._fallback_to_live
+        return cloned
+
+
+def wikipedia_tool(path: str | Path = DEFAULT_INDEX_PATH) -> CachedWikipediaTool:
+    """Use the local index when one has been built, otherwise live (cached) Wikipedia."""
+    if Path(path).exists():
+        return IndexedWikipediaTool(index=WikipediaIndex(path), fallback_to_live=True)
+    return CachedWikipediaTool()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build and query the local Wikipedia index.")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH, type=Path, help="Index file path.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="Add or update articles from JSON Lines files.")
+    add_parser.add_argument("files", nargs="+", type=Path)
+    search_parser = commands.add_parser("search", help="Search the index.")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--limit", type=int, default=5)
+    args = parser.parse_args()
+
+    index = WikipediaIndex(args.index)
+    if args.command == "add":
+        for file in args.files:
+            start = time.perf_counter()
+            added, updated = index.add(read_jsonl(file))
+            print(f"{file}: {added} added, {updated} updated in {time.perf_counter() - start:.1f}s")
+        print(f"Index {index.path} now holds {len(index)} articles")
+    else:
+        start = time.perf_counter()
+        articles = index.search(args.query, limit=args.limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        for article in articles:
+            print(f"- {article.title} ({article.url})\n  {article.summary[:200]}")
+        print(f"{len(articles)} results in {elapsed_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()